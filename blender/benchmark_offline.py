@@ -0,0 +1,174 @@
+"""
+Offline Pipeline Benchmark
+==========================
+Runs the Python side of generate_cyclegan_data.py (FEN parsing, placement,
+camera math, the CSV job loop with --profile) against the bpy/mathutils
+stand-in in blender/offline, so it can be timed and regression-checked on a
+machine without Blender. Exits non-zero if a check fails.
+
+Usage (plain Python, no Blender):
+  python blender/benchmark_offline.py [--csv pgn_data/game9/game9_converted.csv] [--limit 500]
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import argparse
+import tempfile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "offline"))
+sys.path.append(HERE)
+
+import numpy as np
+import bpy
+import generate_cyclegan_data as gen
+from board_geometry import BOARD_Z, parse_fen
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+# A short game, used when no CSV is given
+DEFAULT_FENS = [
+    START_FEN,
+    "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2",
+    "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2",
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+    "r1bqkbnr/pppp1ppp/2n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 3 3",
+    "r1bqkbnr/1ppp1ppp/p1n5/1B2p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 4",
+    "r1bqkbnr/1ppp1ppp/p1B5/4p3/4P3/5N2/PPPP1PPP/RNBQK2R b KQkq - 0 4",
+    "r1bqkbnr/1pp2ppp/p1p5/4p3/4P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 0 5",
+    "r1bqkbnr/1pp2ppp/p1p5/4p3/4P3/5N2/PPPP1PPP/RNBQ1RK1 b kq - 1 5",
+]
+
+PIECE_HEIGHTS = {'P': 1.6, 'N': 2.2, 'B': 2.5, 'R': 1.9, 'Q': 2.9, 'K': 3.2}
+PIECE_NAMES = {'R': "rook", 'N': "knight", 'B': "bishop", 'Q': "queen", 'K': "king"}
+WHITE_PAWNS = ['A(texture)', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+BLACK_PAWNS = ['A(textures)', 'B.001', 'C.001', 'D.001', 'E.001', 'F.001', 'G.001', 'H.001']
+
+def build_scene():
+    """chess-set.blend as detect_pieces sees it: the board plus 32 named pieces"""
+    bpy.reset()
+    for name in ["Black & white", "Outer frame"]:
+        bpy.data.objects.new(name, bpy.data.meshes.new(name, size=(20, 20, 0.1)))
+    for names, ptype in [(WHITE_PAWNS, 'P'), (BLACK_PAWNS, 'p')]:
+        for name in names:
+            obj = bpy.data.objects.new(name, bpy.data.meshes.new(name, size=(1, 1, PIECE_HEIGHTS['P'])))
+            obj.location = (0, 0, BOARD_Z)
+    for ptype, word in PIECE_NAMES.items():
+        count = 1 if ptype in 'QK' else 2
+        for color in ["White", "Black"]:
+            for _ in range(count):
+                mesh = bpy.data.meshes.new(word, size=(1.2, 1.2, PIECE_HEIGHTS[ptype]))
+                obj = bpy.data.objects.new(f"{color} {word}", mesh)
+                obj.location = (0, 0, BOARD_Z)
+
+def placement(piece_map):
+    """{square: type} as the scene currently shows it"""
+    return {p['square']: p['type'] for p in piece_map.values() if p.get('square') is not None}
+
+def check(name, ok, failures):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    if not ok:
+        failures.append(name)
+
+def timed(fn, *args, repeat=1):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args)
+    return (time.perf_counter() - start) / repeat, result
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', type=str, default=None)
+    parser.add_argument('--limit', type=int, default=500)
+    args = parser.parse_args()
+
+    fens = DEFAULT_FENS
+    if args.csv:
+        with open(args.csv, 'r') as f:
+            fens = [row['fen'] for _, row in zip(range(args.limit), csv.DictReader(f))]
+
+    build_scene()
+    piece_map = gen.detect_pieces()
+    gen.setup_camera(False, piece_map)
+    failures = []
+
+    print("\nRegression checks")
+    check("detect_pieces finds 32 pieces", len(piece_map) == 32, failures)
+
+    ok = True
+    gen.apply_fen(fens[0], piece_map)
+    for fen in fens:
+        gen.apply_fen_incremental(fen, piece_map)
+        incremental = placement(piece_map)
+        gen.apply_fen(fen, piece_map)
+        ok &= incremental == placement(piece_map) == parse_fen(fen)
+    check("apply_fen_incremental == apply_fen == parse_fen", ok, failures)
+
+    promoted = "QQQ1k3/8/8/8/8/8/8/4K3 w - - 0 1"
+    gen.apply_fen(promoted, piece_map)
+    count = len(piece_map)
+    gen.apply_fen_incremental(START_FEN, piece_map)
+    gen.apply_fen_incremental(promoted, piece_map)
+    check("promotions use pooled linked duplicates",
+          placement(piece_map) == parse_fen(promoted) and len(piece_map) == count == 34, failures)
+
+    order = gen.reorder_fens(fens)
+    check("reorder_fens is a permutation", sorted(order) == list(range(len(fens))), failures)
+
+    from render_metadata import GeometryWriter
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = GeometryWriter(os.path.join(tmp, "geometry.npz"))
+        gen.apply_fen(START_FEN, piece_map)
+        gen.record_geometry(writer, "a.png", piece_map, 256)
+        quads = writer.rows['quads'][0]
+        a1, h8 = quads[0].mean(axis=0), quads[63].mean(axis=0)
+        check("a1 projects bottom-left, h8 top-right", a1[0] < 128 < h8[0] and a1[1] > 128 > h8[1], failures)
+        check("board fits inside the frame", bool(((quads >= 0) & (quads <= 256)).all()), failures)
+
+    print(f"\nTimings over {len(fens)} positions")
+    t, _ = timed(lambda: [parse_fen(f) for f in fens])
+    print(f"  parse_fen              {1e6 * t / len(fens):8.1f} us/position")
+    t, _ = timed(lambda: [gen.apply_fen(f, piece_map) for f in fens])
+    print(f"  apply_fen              {1e6 * t / len(fens):8.1f} us/position")
+    gen.apply_fen(fens[0], piece_map)
+    t, _ = timed(lambda: [gen.apply_fen_incremental(f, piece_map) for f in fens])
+    print(f"  apply_fen_incremental  {1e6 * t / len(fens):8.1f} us/position")
+    t, _ = timed(gen.reorder_fens, fens)
+    print(f"  reorder_fens           {1e3 * t:8.1f} ms total")
+
+    # The CSV job loop end to end, with the stage profiler on
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "fens.csv")
+        with open(csv_path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['fen'])
+            writer.writerows([fen] for fen in fens)
+        profile = os.path.join(tmp, "profile.jsonl")
+        build_scene()
+        sys.argv = ["blender", "--", "--csv", csv_path, "--output_dir", os.path.join(tmp, "out"),
+                    "--limit", str(len(fens)), "--incremental", "--profile", profile]
+        t, _ = timed(gen.main)
+        with open(profile, 'r') as f:
+            records = [json.loads(line) for line in f]
+        jobs = [r for r in records if r['job'] != "setup"]
+        check("one profile line per job plus setup", len(jobs) == len(set(fens)) and records[0]['job'] == "setup",
+              failures)
+        check("geometry.npz written", os.path.exists(os.path.join(tmp, "out", "geometry.npz")), failures)
+
+        print(f"  job loop               {1e3 * t / max(1, len(jobs)):8.2f} ms/job (no rendering)")
+        stages = sorted({s for r in jobs for s in r['stages']})
+        for stage in stages:
+            mean = np.mean([r['stages'].get(stage, 0.0) for r in jobs])
+            print(f"    {stage:<20} {1e3 * mean:8.3f} ms")
+
+    if failures:
+        print(f"\n{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("\nAll checks passed")
+
+if __name__ == "__main__":
+    main()
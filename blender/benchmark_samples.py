@@ -0,0 +1,159 @@
+"""
+Sample Budget Benchmark
+=======================
+Renders a fixed FEN set at several Cycles budgets (samples x adaptive noise
+threshold) and reports wall time per image against PSNR/SSIM relative to a
+high-sample reference render of the same position, so we can pick the
+cheapest budget that doesn't hurt training.
+
+Usage:
+  blender blender/chess-set.blend --background --python blender/benchmark_samples.py -- \
+      --samples 16 32 64 128 --noise_thresholds 0 0.05 0.01 --reference_samples 1024 \
+      [--csv pgn_data/game9/game9_converted.csv --num_fens 8] [--report renders/samples.jsonl]
+
+A noise threshold of 0 means adaptive sampling off (fixed sample count).
+"""
+
+import bpy
+import sys
+import os
+import csv
+import json
+import math
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import generate_cyclegan_data as gen
+from sampling import apply_sampling
+
+DEFAULT_FENS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+    "r1bq1rk1/pp2bppp/2n1pn2/3p4/2PP4/2N1PN2/PP3PPP/R2QKB1R w KQ - 0 9",
+    "2r2rk1/1b2qppp/p3pn2/1p6/3N4/P1B1P3/1P2QPPP/2R2RK1 b - - 0 20",
+    "8/5pk1/6p1/3K4/8/6P1/5P2/8 w - - 0 50",
+]
+
+def box_mean(img, k=7):
+    """Mean over a k x k window (reflect padding), via an integral image"""
+    pad = k // 2
+    padded = np.pad(img, pad, mode='reflect')
+    c = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+    return (c[k:, k:] - c[:-k, k:] - c[k:, :-k] + c[:-k, :-k]) / (k * k)
+
+def ssim(a, b, k=7):
+    """Mean SSIM of two grayscale images in [0, 1]"""
+    c1, c2 = 0.01 ** 2, 0.03 ** 2
+    mu_a, mu_b = box_mean(a, k), box_mean(b, k)
+    var_a = box_mean(a * a, k) - mu_a ** 2
+    var_b = box_mean(b * b, k) - mu_b ** 2
+    cov = box_mean(a * b, k) - mu_a * mu_b
+    s = ((2 * mu_a * mu_b + c1) * (2 * cov + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(s.mean())
+
+def psnr(a, b):
+    mse = float(np.mean((a - b) ** 2))
+    return math.inf if mse == 0 else 10 * math.log10(1.0 / mse)
+
+def gray(pixels):
+    rgb = pixels[..., :3].astype(np.float64)
+    return rgb @ np.array([0.299, 0.587, 0.114])
+
+def load_fens(csv_path, num_fens):
+    if not csv_path:
+        return DEFAULT_FENS[:num_fens]
+    with open(csv_path, 'r') as f:
+        fens = [row['fen'] for row in csv.DictReader(f)]
+    step = max(1, len(fens) // num_fens)
+    return fens[::step][:num_fens]
+
+def render_timed(fpath):
+    start = time.perf_counter()
+    gen.render_still(fpath)
+    return time.perf_counter() - start
+
+def main():
+    argv = sys.argv
+    if "--" in argv: argv = argv[argv.index("--") + 1:]
+    else: argv = []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', type=str, default=None, help="Take FENs from this CSV (default: built-in set)")
+    parser.add_argument('--num_fens', type=int, default=4)
+    parser.add_argument('--samples', type=int, nargs='+', default=[16, 32, 64, 128])
+    parser.add_argument('--noise_thresholds', type=float, nargs='+', default=[0.0, 0.05, 0.01])
+    parser.add_argument('--time_limit', type=float, default=None)
+    parser.add_argument('--reference_samples', type=int, default=1024)
+    parser.add_argument('--resolution', type=int, default=gen.RES)
+    parser.add_argument('--auto_frame', action='store_true')
+    parser.add_argument('--output_dir', type=str, default="renders/sample_benchmark")
+    parser.add_argument('--report', type=str, default=None, help="Append one JSON line per budget here")
+    parser.add_argument('--min_ssim', type=float, default=0.98)
+    parser.add_argument('--min_psnr', type=float, default=35.0)
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    gen.RES = args.resolution
+    scene = bpy.context.scene
+    piece_map = gen.detect_pieces()
+    gen.setup_camera(args.auto_frame, piece_map)
+    fens = load_fens(args.csv, args.num_fens)
+
+    # 1. High-sample references
+    references = []
+    for i, fen in enumerate(fens):
+        gen.apply_fen(fen, piece_map)
+        apply_sampling(scene, args.reference_samples, noise_threshold=0)
+        fpath = os.path.join(args.output_dir, f"reference_{i}.png")
+        seconds = render_timed(fpath)
+        references.append(gray(gen.load_pixels(fpath)))
+        print(f"Reference {i}: {seconds:.1f}s at {args.reference_samples} samples")
+
+    # 2. Every budget against the references
+    results = []
+    for samples in args.samples:
+        for threshold in args.noise_thresholds:
+            apply_sampling(scene, samples, threshold, args.time_limit)
+            seconds, psnrs, ssims = [], [], []
+            for i, fen in enumerate(fens):
+                gen.apply_fen(fen, piece_map)
+                fpath = os.path.join(args.output_dir, f"s{samples}_t{threshold}_{i}.png")
+                seconds.append(render_timed(fpath))
+                image = gray(gen.load_pixels(fpath))
+                psnrs.append(psnr(image, references[i]))
+                ssims.append(ssim(image, references[i]))
+            results.append({
+                'samples': samples,
+                'noise_threshold': threshold,
+                'time_limit': args.time_limit,
+                'resolution': args.resolution,
+                'seconds_per_image': sum(seconds) / len(seconds),
+                'psnr': min(psnrs),
+                'ssim': min(ssims),
+            })
+
+    print("\n" + "="*70)
+    print(f"{'samples':>8} {'threshold':>10} {'s/image':>9} {'PSNR (worst)':>13} {'SSIM (worst)':>13}")
+    print("="*70)
+    for r in results:
+        print(f"{r['samples']:>8} {r['noise_threshold']:>10} {r['seconds_per_image']:>9.2f} "
+              f"{r['psnr']:>13.2f} {r['ssim']:>13.4f}")
+
+    good = [r for r in results if r['ssim'] >= args.min_ssim and r['psnr'] >= args.min_psnr]
+    if good:
+        best = min(good, key=lambda r: r['seconds_per_image'])
+        print(f"\nCheapest budget with SSIM >= {args.min_ssim} and PSNR >= {args.min_psnr}: "
+              f"--samples {best['samples']} --noise_threshold {best['noise_threshold']} "
+              f"({best['seconds_per_image']:.2f}s/image)")
+    else:
+        print("\nNo budget reached the quality bar, try more samples.")
+
+    if args.report:
+        with open(args.report, 'a') as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+if __name__ == "__main__":
+    main()
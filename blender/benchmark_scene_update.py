@@ -0,0 +1,79 @@
+"""
+Scene Update Benchmark
+======================
+Compares the scene-update cost per frame of apply_fen (hide and re-place every
+piece) against apply_fen_incremental (touch only the changed pieces).
+Each frame is followed by a depsgraph evaluation, which is the sync Cycles has
+to do before it can start sampling. Nothing is rendered.
+
+Usage:
+  blender blender/chess-set.blend --background --python blender/benchmark_scene_update.py -- \
+      --csv pgn_data/game9/game9_converted.csv --limit 500 [--reorder]
+"""
+
+import bpy
+import sys
+import os
+import csv
+import time
+import argparse
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from generate_cyclegan_data import detect_pieces, apply_fen, apply_fen_incremental, reorder_fens
+
+def time_frames(fens, piece_map, place):
+    """Seconds per frame and objects touched per frame"""
+    depsgraph = bpy.context.evaluated_depsgraph_get()
+    seconds = []
+    touched = []
+    for fen in fens:
+        start = time.perf_counter()
+        n = place(fen, piece_map)
+        depsgraph.update()
+        seconds.append(time.perf_counter() - start)
+        touched.append(len(piece_map) if n is None else n)
+    return seconds, touched
+
+def summarize(label, seconds, touched):
+    ms = sorted(s * 1000 for s in seconds)
+    mean = sum(ms) / len(ms)
+    p95 = ms[int(0.95 * (len(ms) - 1))]
+    print(f"  {label:<12} mean {mean:7.2f} ms   p95 {p95:7.2f} ms   "
+          f"objects touched/frame {sum(touched) / len(touched):5.1f}")
+    return mean
+
+def main():
+    argv = sys.argv
+    if "--" in argv: argv = argv[argv.index("--") + 1:]
+    else: argv = []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--csv', type=str, required=True)
+    parser.add_argument('--limit', type=int, default=500)
+    parser.add_argument('--reorder', action='store_true',
+                        help="Also time the incremental mode on the nearest-neighbour order")
+    args = parser.parse_args(argv)
+
+    fens = []
+    with open(args.csv, 'r') as f:
+        for row in csv.DictReader(f):
+            if len(fens) >= args.limit: break
+            if not fens or row['fen'] != fens[-1]:
+                fens.append(row['fen'])
+
+    piece_map = detect_pieces()
+    print(f"\nScene update per frame over {len(fens)} positions ({len(piece_map)} pieces)")
+
+    full = summarize("full", *time_frames(fens, piece_map, apply_fen))
+
+    apply_fen(fens[0], piece_map)
+    delta = summarize("incremental", *time_frames(fens, piece_map, apply_fen_incremental))
+    print(f"  speedup      {full / delta:.1f}x")
+
+    if args.reorder:
+        ordered = [fens[i] for i in reorder_fens(fens)]
+        apply_fen(ordered[0], piece_map)
+        summarize("reordered", *time_frames(ordered, piece_map, apply_fen_incremental))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Board Geometry (Calibrated)
+===========================
+Calibrated board coordinates of chess-set.blend plus the FEN, sprite naming
+and camera math that only need them. No bpy import, so tools outside Blender can use it too.
+"""
+
+# ==========================
+# CALIBRATED CONSTANTS
+# Constants derived from the diagnostic run
+BOARD_MIN_X = -21.8222
+BOARD_MAX_X = -2.1417
+BOARD_MIN_Y = -8.6489  # (Calculated from Max Y - Width)
+BOARD_MAX_Y = 11.0316
+BOARD_Z = 0.7043
+
+TOTAL_WIDTH = 19.6805
+SQUARE_SIZE = 2.4601  # Total Width / 8
+
+def get_square_center(file_idx, rank_idx):
+    """
+    file_idx: 0 (a) to 7 (h)
+    rank_idx: 0 (1) to 7 (8)
+    """
+    # X Axis: Maps a..h
+    # path generally goes from negative (a) to positive (h)
+    center_x = BOARD_MIN_X + (file_idx * SQUARE_SIZE) + (SQUARE_SIZE / 2)
+    
+    # Y Axis: Maps 1..8
+    # In Blender, positive Y is "up" (black), negative Y is "down" (white)
+    center_y = BOARD_MIN_Y + (rank_idx * SQUARE_SIZE) + (SQUARE_SIZE / 2)
+    
+    return center_x, center_y, BOARD_Z
+
+PIECE_TYPES = "PNBRQKpnbrqk"
+
+def sprite_name(ptype, square):
+    """File name of a sprite in the atlas (render_atlas.py writes it, sprite_compositor.py reads it)"""
+    # Color prefix keeps names unique on case-insensitive filesystems
+    return f"{'w' if ptype.isupper() else 'b'}{ptype.upper()}_{square:02d}.png"
+
+def parse_fen(fen):
+    board_fen = fen.split()[0]
+    ranks = board_fen.split('/')
+    position = {} 
+    for r_idx, rank in enumerate(ranks):
+        f_idx = 0
+        real_rank = 7 - r_idx # 0 to 7 (where 7 is rank 8)
+        for char in rank:
+            if char.isdigit():
+                f_idx += int(char)
+            else:
+                position[(f_idx, real_rank)] = char
+                f_idx += 1
+    return position
+
+def fit_camera_height(half_extent, lens, sensor_width, margin=0.05, piece_height=0.0, square_size=SQUARE_SIZE):
+    """
+    Height above the board plane for a top-down camera so the board
+    (half_extent from its center to an edge, plus margin) fills the frame.
+    The tops of pieces standing on the edge squares are kept inside as well,
+    they are closer to the camera and project further out.
+    """
+    tan_half_fov = sensor_width / (2.0 * lens)
+    points = [(half_extent, 0.0)]
+    if piece_height > 0:
+        points.append((half_extent - square_size / 2, piece_height))
+    return max(z + d * (1 + margin) / tan_half_fov for d, z in points)
@@ -9,6 +9,17 @@ from mathutils import Vector, Matrix
 import sys
 import argparse
 import os
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from render_worker import serve
+from render_output import add_output_args, needs_finalize, master_path, partial_path, finalize
+from board_geometry import fit_camera_height
+from sampling import add_sampling_args, apply_sampling
+from render_metadata import GeometryWriter, camera_intrinsics, camera_extrinsics, square_corners
+from profiler import StageProfiler, add_profile_args, process_age
+from piece_pool import link_duplicate
+import chess_sets
 
 # ==========================
 # CONFIG
@@ -20,6 +31,21 @@ LENS = 50
 RES = 800 # original was 1024
 SAMPLES = 128
 OUT_DIR = "//renders"
+SIDE_ANGLE_DEGREES = 35       # Tilt of the east/west views
+AUTO_FRAME = False            # --auto_frame: fit the camera height to the board instead of DESIRED_CAMERA_HEIGHT
+FRAME_MARGIN = 0.04
+
+# Stage timings (--profile)
+profiler = StageProfiler()
+
+# view: (tilt from vertical in degrees, XY direction of the camera from the board center)
+VIEWS = {
+    'black': (DESIRED_ANGLE_DEGREES, (0, -1)),
+    'white': (DESIRED_ANGLE_DEGREES, (0, 1)),
+    'overhead': (0, (0, -1)),
+    'east': (SIDE_ANGLE_DEGREES, (1, 0)),
+    'west': (SIDE_ANGLE_DEGREES, (-1, 0)),
+}
 
 def get_board_info():
     """Get board dimensions"""
@@ -75,15 +101,7 @@ def detect_starting_positions(board_info):
         if obj.type != 'MESH': continue
         
         name = obj.name
-        piece_type = None
-        
-        if name in ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'A(texture)']: piece_type = 'P'
-        elif name in ['B.001', 'C.001', 'D.001', 'E.001', 'F.001', 'G.001', 'H.001', 'A(textures)']: piece_type = 'p'
-        elif 'rook' in name.lower(): piece_type = 'R' if 'white' in name.lower() else 'r'
-        elif 'knight' in name.lower(): piece_type = 'N' if 'white' in name.lower() else 'n'
-        elif 'bitshop' in name.lower() or 'bishop' in name.lower(): piece_type = 'B' if 'white' in name.lower() else 'b'
-        elif 'queen' in name.lower(): piece_type = 'Q' if 'white' in name.lower() else 'q'
-        elif 'king' in name.lower(): piece_type = 'K' if 'white' in name.lower() else 'k'
+        piece_type = chess_sets.piece_type(name)  # Object name mapping of chess-set.blend
         
         if piece_type:
             square = position_to_square(obj.location, board_info)
@@ -112,12 +130,29 @@ def parse_fen(fen):
                 file_idx += 1
     return position
 
+def spawn_piece(starting_pieces, piece_type):
+    """
+    Linked duplicate of a piece_type piece for promotions, added to starting_pieces
+    with the template's start square so the displacement math below applies
+    unchanged. Returns its name, or None if there is no such piece at all.
+    """
+    template = next((name for name, info in starting_pieces.items() if info['piece_type'] == piece_type), None)
+    if template is None:
+        return None
+    dup = link_duplicate(bpy.data.objects[template])
+    info = starting_pieces[template]
+    starting_pieces[dup.name] = {'square': info['square'], 'piece_type': piece_type,
+                                 'start_pos': info['start_pos'].copy()}
+    return dup.name
+
 def apply_fen(fen, starting_pieces, board_info):
+    """Returns {(file_idx, rank_idx): piece_type} of the pieces actually placed"""
     print(f"APPLYING FEN: {fen}")
     target_position = parse_fen(fen)
     square_size = board_info['square_size']
     
     pieces_used = set()
+    placed = {}
     
     for target_square, piece_type in target_position.items():
         candidates = []
@@ -128,13 +163,20 @@ def apply_fen(fen, starting_pieces, board_info):
                 dist = abs((ord(target_square[0]) - ord(from_square[0]))) + abs((int(target_square[1]) - int(from_square[1])))
                 candidates.append((dist, piece_name, from_square))
         
-        if not candidates: continue
+        if not candidates:
+            # Promotion: extend the pool with a linked duplicate (kept for later jobs)
+            piece_name = spawn_piece(starting_pieces, piece_type)
+            if piece_name is None: continue
+            candidates.append((0, piece_name, starting_pieces[piece_name]['square']))
         
         candidates.sort()
         _, piece_name, from_square = candidates[0]
         
         obj = bpy.data.objects.get(piece_name)
         if obj:
+            # Start from the detected square so repeated calls (worker mode) don't accumulate
+            obj.location = starting_pieces[piece_name]['start_pos'].copy()
+
             # Calculate displacement
             file_diff = (ord(target_square[0]) - ord('a')) - (ord(from_square[0]) - ord('a'))
             rank_diff = (int(target_square[1]) - 1) - (int(from_square[1]) - 1)
@@ -144,6 +186,7 @@ def apply_fen(fen, starting_pieces, board_info):
             obj.hide_render = False
             obj.hide_viewport = False
             pieces_used.add(piece_name)
+            placed[(ord(target_square[0]) - ord('a'), int(target_square[1]) - 1)] = piece_type
     
     for piece_name in starting_pieces.keys():
         if piece_name not in pieces_used:
@@ -151,37 +194,28 @@ def apply_fen(fen, starting_pieces, board_info):
             if obj:
                 obj.hide_render = True
                 obj.hide_viewport = True
+    return placed
 
-def render_all_views(board_info, view='black', output_name="render"):
-    """
-    Render ONLY the requested view (White or Black) with the correct angle.
-    Forces camera to look at the center of the board.
-    """
-    print("\n" + "="*70)
-    print(f"RENDERING ({view.upper()} VIEW)")
-    print("="*70)
-    
-    center = board_info['center']
-    scale_factor = board_info['scale_factor']
-
-    # Calculate height and distance according to the CONFIG
-    camera_height = DESIRED_CAMERA_HEIGHT * scale_factor
-    angle_radians = math.radians(DESIRED_ANGLE_DEGREES)
-    # Calculate the horizontal offset backwards to get the angle (if the angle is 0, the distance will be 0)
-    horizontal_offset = camera_height * math.tan(angle_radians)
+def square_centers(board_info):
+    """(64, 3) square centers in rank * 8 + file order, same mapping as position_to_square"""
+    square_size = board_info['square_size']
+    plane_min = board_info['plane_min']
+    plane_max = board_info['plane_max']
+    return [(plane_min.x + (7 - f + 0.5) * square_size, plane_max.y - (r + 0.5) * square_size, plane_max.z)
+            for r in range(8) for f in range(8)]
 
-    # 1. Clear old cameras
-    for obj in bpy.data.objects:
-        if obj.type == "CAMERA":
-            bpy.data.objects.remove(obj, do_unlink=True)
+def setup_render(board_info):
+    """Lighting and render settings, done once per process"""
+    center = board_info['center']
+    camera_height = DESIRED_CAMERA_HEIGHT * board_info['scale_factor']
 
-    # 2. Lighting (if none)
+    # Lighting (if none)
     if not any(o.type == "LIGHT" for o in bpy.data.objects):
         light_height = center.z + camera_height * 2
         bpy.ops.object.light_add(type="SUN", location=(center.x, center.y, light_height))
         bpy.context.active_object.data.energy = 4.0
 
-    # 3. Render settings
+    # Render settings
     scene = bpy.context.scene
     scene.render.engine = "CYCLES"
     scene.cycles.samples = SAMPLES
@@ -194,19 +228,40 @@ def render_all_views(board_info, view='black', output_name="render"):
         scene.cycles.device = 'GPU'
     except:
         pass
-    
-    # 4. Setup camera
+
+    # Old cameras from the .blend file; ours are created per view in get_camera
+    for obj in bpy.data.objects:
+        if obj.type == "CAMERA":
+            bpy.data.objects.remove(obj, do_unlink=True)
+
+def get_camera(board_info, view, cameras):
+    """
+    Camera for a view, created on first use and kept in `cameras` so later
+    jobs only switch scene.camera.
+    """
+    if view in cameras:
+        return cameras[view]
+
+    center = board_info['center']
+    scale_factor = board_info['scale_factor']
+
+    # Calculate height and distance according to the CONFIG
+    camera_height = DESIRED_CAMERA_HEIGHT * scale_factor
+    if AUTO_FRAME:
+        half_extent = max(board_info['plane_max'].x - board_info['plane_min'].x,
+                          board_info['plane_max'].y - board_info['plane_min'].y) / 2
+        camera_height = fit_camera_height(half_extent, LENS, 36.0, FRAME_MARGIN,
+                                          square_size=board_info['square_size'])
+    tilt_degrees, (dir_x, dir_y) = VIEWS[view]
+    # Calculate the horizontal offset backwards to get the angle (if the angle is 0, the distance will be 0)
+    horizontal_offset = camera_height * math.tan(math.radians(tilt_degrees))
+
     camera_z = center.z + camera_height
-    
-    if view == 'white':
-        # White: Camera at positive Y, looking back
-        cam_loc = (center.x, center.y + horizontal_offset, camera_z)
-    else:
-        # Black: Camera at negative Y, looking forward
-        cam_loc = (center.x, center.y - horizontal_offset, camera_z)
+    cam_loc = (center.x + dir_x * horizontal_offset, center.y + dir_y * horizontal_offset, camera_z)
 
     bpy.ops.object.camera_add(location=cam_loc)
     cam = bpy.context.active_object
+    cam.name = f"cam_{view}"
 
     # --- Critical fix: Make the camera look at the center ---
     # This is what fixes the gray and out-of-focus images
@@ -218,38 +273,112 @@ def render_all_views(board_info, view='black', output_name="render"):
          cam.rotation_euler.z += math.radians(180)
 
     cam.data.lens = LENS
-    bpy.context.scene.camera = cam
+    cam.data.sensor_width = 36.0  # fit_camera_height assumes it
+    cameras[view] = cam
+    return cam
 
-    # 5. Save the file with the correct name
-    if not output_name.lower().endswith('.png'):
-        output_name += ".png"
+def view_output_path(output_name, view, num_views):
+    """OUT_DIR/<name>.png for a single view, OUT_DIR/<name>_<view>.png for several"""
+    if output_name.lower().endswith('.png'):
+        output_name = output_name[:-4]
+    if num_views > 1:
+        output_name = f"{output_name}_{view}"
+    return os.path.join(OUT_DIR, output_name + ".png")
+
+def render_all_views(board_info, views=('black',), output_name="render", output_paths=None, cameras=None,
+                     output_args=None, geometry=None, placed=None):
+    """
+    Render every requested view of the current position. Each view has its own
+    camera looking at the center of the board; the scene is not touched between views.
+    Outputs are named after the job (output_name) unless output_paths maps a view to a path.
+    output_args (--output_size/--quality/--master_dir) writes the final size and
+    format straight from the render (see render_output.py).
+    geometry(path) returns the GeometryWriter for an image (or None), placed is
+    the apply_fen result recorded with it.
+    Returns the written paths in view order.
+    """
+    if isinstance(views, str):
+        views = [views]
+    output_paths = output_paths or {}
+    cameras = {} if cameras is None else cameras
+    scene = bpy.context.scene
+
+    written = []
+    for view in views:
+        print("\n" + "="*70)
+        print(f"RENDERING ({view.upper()} VIEW)")
+        print("="*70)
+
+        with profiler.stage('camera'):
+            scene.camera = get_camera(board_info, view, cameras)
+
+        # Save the file with the correct name
+        full_path = output_paths.get(view) or view_output_path(output_name, view, len(views))
+        output_size = output_args.output_size if output_args else None
+        partial = partial_path(full_path)
+        target = partial
+        if needs_finalize(full_path, output_size):
+            target = master_path(full_path, output_args.master_dir if output_args else None)
+        scene.render.filepath = target
         
-    full_path = os.path.join(OUT_DIR, output_name)
-    scene.render.filepath = full_path
-    
-    print(f"  Rendering to: {full_path}...")
-    bpy.ops.render.render(write_still=True)
-    print(f"  ✓ Saved!")
+        print(f"  Rendering to: {full_path}...")
+        profiler.render(write_still=True)
+        if target != partial:
+            with profiler.stage('finalize'):
+                finalize(target, partial, output_size,
+                         output_args.quality if output_args else 90,
+                         keep_master=bool(output_args and output_args.master_dir))
+        os.replace(partial, full_path)
+        print("  ✓ Saved!")
+        written.append(full_path)
+
+        writer = geometry(full_path) if geometry else None
+        if writer:
+            size = output_size or RES
+            with profiler.stage('geometry'):
+                writer.add(full_path, camera_intrinsics(scene.camera.data, size, size), camera_extrinsics(scene.camera),
+                           square_corners(square_centers(board_info), board_info['square_size']),
+                           placed or {}, size, size)
+    return written
 
 def main():
+    start_time = time.time()
+    startup = process_age()
     argv = sys.argv
     if "--" in argv: argv = argv[argv.index("--") + 1:]
     else: argv = []
     
     parser = argparse.ArgumentParser()
-    parser.add_argument('--fen', type=str, required=True)
+    parser.add_argument('--fen', type=str)
     parser.add_argument('--resolution', type=int, default=1024)
     parser.add_argument('--samples', type=int, default=128)
-    parser.add_argument('--view', type=str, default='black', choices=['white', 'black'])
+    parser.add_argument('--view', type=str, nargs='+', default=['black'], choices=list(VIEWS),
+                        help="One or more views, all rendered after a single apply_fen")
     parser.add_argument('--output_name', type=str, default="render_output")
+    parser.add_argument('--worker', action='store_true',
+                        help="Keep the scene loaded and read FEN jobs from stdin (see render_worker.py)")
+    add_output_args(parser)
+    add_sampling_args(parser)
+    parser.add_argument('--auto_frame', action='store_true',
+                        help="Fit the camera height to the board bounds so the board fills the frame")
+    parser.add_argument('--no_geometry', action='store_true',
+                        help="Don't write the geometry sidecar (camera matrices, square quads, pieces)")
+    add_profile_args(parser)
 
     args = parser.parse_args(argv)
-    global RES, SAMPLES, OUT_DIR
+    if not args.worker and not args.fen:
+        parser.error("--fen is required unless --worker is set")
+    global RES, SAMPLES, OUT_DIR, AUTO_FRAME
+    AUTO_FRAME = args.auto_frame
     RES = args.resolution
     SAMPLES = args.samples
     OUT_DIR = "./renders"
 
-    board_info = get_board_info()
+    profiler.path = args.profile
+    if startup is not None:
+        profiler.add('startup', startup)
+    with profiler.stage('board_info'):
+        board_info = get_board_info()
 
     # Rotate the plane
     plane = bpy.data.objects.get("Black & white")
@@ -268,9 +397,58 @@ def main():
         rotated_offset = rot_matrix @ offset
         plane.location = center + rotated_offset
         
-    starting_pieces = detect_starting_positions(board_info)
-    apply_fen(args.fen, starting_pieces, board_info)
-    render_all_views(board_info, view=args.view, output_name=args.output_name)
+    with profiler.stage('detect_pieces'):
+        starting_pieces = detect_starting_positions(board_info)
+    with profiler.stage('scene_setup'):
+        setup_render(board_info)
+        apply_sampling(bpy.context.scene, SAMPLES, args.noise_threshold, args.time_limit)
+    profiler.flush_job("setup")
+    cameras = {}
+
+    # One geometry file per output directory: geometry_<pid>.npz for a worker
+    writers = {}
+    def geometry(path, name=f"geometry_{os.getpid()}.npz"):
+        if args.no_geometry:
+            return None
+        output_dir = os.path.dirname(os.path.abspath(path))
+        if output_dir not in writers:
+            writers[output_dir] = GeometryWriter(os.path.join(output_dir, name))
+        return writers[output_dir]
+
+    if args.worker:
+        def render_job(job):
+            # 'views' (list) or 'view'; 'outputs' maps view -> path, 'output' is the path of a single view
+            views = job.get('views') or job.get('view') or args.view
+            if isinstance(views, str):
+                views = [views]
+            output_paths = job.get('outputs') or {}
+            if job.get('output'):
+                output_paths = {views[0]: job['output']}
+
+            with profiler.stage('apply_fen'):
+                placed = apply_fen(job['fen'], starting_pieces, board_info)
+            written = render_all_views(board_info, views,
+                                       output_name=job.get('output_name', job.get('id') or args.output_name),
+                                       output_paths=output_paths,
+                                       cameras=cameras,
+                                       output_args=args,
+                                       geometry=geometry,
+                                       placed=placed)
+            profiler.flush_job(job.get('id') or os.path.basename(written[0]), images=len(written))
+            return written
+
+        serve(render_job, setup_seconds=time.time() - start_time)
+        for writer in writers.values():
+            writer.flush()
+        return
+
+    with profiler.stage('apply_fen'):
+        placed = apply_fen(args.fen, starting_pieces, board_info)
+    written = render_all_views(board_info, args.view, output_name=args.output_name, cameras=cameras, output_args=args,
+                               geometry=lambda path: geometry(path, f"geometry_{args.output_name}.npz"), placed=placed)
+    profiler.flush_job(args.output_name, images=len(written))
+    for writer in writers.values():
+        writer.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""
+Chess Set Registry
+==================
+Describes each chess set the renderers can use: the .blend it lives in, how
+its object names map to pieces, and where its board is. The default set is the
+one in the open scene (chess-set.blend, calibrated in board_geometry.py);
+extra sets come from a JSON file:
+
+  {
+    "staunton": {
+      "file": "assets/staunton.blend",
+      "objects": {"Pawn_W.001": "P", ...},          # exact object names (optional)
+      "keywords": [["rook", "R"], ["knight", "N"]],  # substring -> white letter, in order
+      "white": "white",                              # names containing this are white pieces
+      "board": {"min_x": -1, "max_x": 1, "min_y": -1, "max_y": 1, "z": 0.05},
+      "board_objects": ["Board"],                    # replace our board (optional)
+      "scale": null                                  # default: our board width / its board width
+    }
+  }
+
+A set is only linked (bpy.data.libraries.load) when a job asks for it, once
+per worker. Its meshes stay library data shared by every piece; the pieces
+are local objects using them, moved and scaled onto our board. Materials get
+one local copy each (library data is read-only, the randomizer tints them).
+Switching sets hides the previous set's objects instead of removing them.
+"""
+
+import bpy
+import os
+import json
+
+from board_geometry import BOARD_MIN_X, BOARD_MAX_X, BOARD_MIN_Y, BOARD_MAX_Y, BOARD_Z
+
+DEFAULT_SET_NAME = "default"
+
+DEFAULT_SET = {
+    'file': None,  # Already in the scene
+    'objects': {
+        'A(texture)': 'P', 'B': 'P', 'C': 'P', 'D': 'P', 'E': 'P', 'F': 'P', 'G': 'P', 'H': 'P',
+        'A(textures)': 'p', 'B.001': 'p', 'C.001': 'p', 'D.001': 'p', 'E.001': 'p', 'F.001': 'p',
+        'G.001': 'p', 'H.001': 'p',
+    },
+    'keywords': [['rook', 'R'], ['knight', 'N'], ['bitshop', 'B'], ['bishop', 'B'], ['queen', 'Q'], ['king', 'K']],
+    'white': 'white',
+    'board': {'min_x': BOARD_MIN_X, 'max_x': BOARD_MAX_X, 'min_y': BOARD_MIN_Y, 'max_y': BOARD_MAX_Y, 'z': BOARD_Z},
+    'board_objects': ["Black & white", "Outer frame"],
+    'scale': 1.0,
+}
+
+def piece_type(name, spec=DEFAULT_SET):
+    """Piece letter of an object name in a set, None for anything that isn't a piece"""
+    if name in spec.get('board_objects', ()):
+        return None
+    if name in spec.get('objects', {}):
+        return spec['objects'][name]
+    lower = name.lower()
+    for keyword, letter in spec.get('keywords', []):
+        if keyword in lower:
+            return letter.upper() if spec.get('white', 'white') in lower else letter.lower()
+    return None
+
+def detect_pieces(objects, spec=DEFAULT_SET):
+    """{object name: {'type', 'obj', 'base_z'}} of the set's pieces among objects"""
+    pieces = {}
+    for obj in objects:
+        if obj.type != 'MESH': continue
+        ptype = piece_type(obj.name, spec)
+        if ptype:
+            # Save the object and its original height (in case it differs between pieces)
+            pieces[obj.name] = {'type': ptype, 'obj': obj, 'base_z': obj.location.z}
+    return pieces
+
+def load_registry(path=None):
+    sets = {DEFAULT_SET_NAME: DEFAULT_SET}
+    if path:
+        with open(path, 'r') as f:
+            sets.update(json.load(f))
+    return sets
+
+
+class SetRegistry:
+    """Per-worker cache of linked sets; activate() returns the piece map of a set"""
+
+    def __init__(self, sets, active=DEFAULT_SET_NAME):
+        self.sets = sets
+        # The scene's own set is always there (and its board is the fallback)
+        self.loaded = {DEFAULT_SET_NAME: self.load(DEFAULT_SET_NAME)}
+        self.active = DEFAULT_SET_NAME
+        self.activate(active)
+
+    def fit(self, spec):
+        """Scale from the set's board to ours, and the set's board geometry"""
+        board = spec['board']
+        ours = DEFAULT_SET['board']
+        scale = spec.get('scale') or (ours['max_x'] - ours['min_x']) / (board['max_x'] - board['min_x'])
+        return scale, board
+
+    def local_materials(self, obj, copies):
+        """
+        Give obj local copies of its library materials (object-linked slots):
+        linked datablocks are read-only, and randomize.py adds tint nodes to them.
+        copies maps each library material to its copy, so pieces keep sharing one.
+        """
+        for slot in obj.material_slots:
+            mat = slot.material
+            if mat is None or mat.library is None:
+                continue
+            if mat not in copies:
+                copies[mat] = mat.copy()
+            slot.link = 'OBJECT'
+            slot.material = copies[mat]
+
+    def place_linked(self, source, name, scale, board, copies):
+        """Local object using the linked object's mesh (and local materials), moved onto our board"""
+        obj = bpy.data.objects.new(name, source.data)
+        self.local_materials(obj, copies)
+        obj.rotation_euler = source.rotation_euler.copy()
+        obj.scale = source.scale * scale
+        obj.location = (BOARD_MIN_X + (source.location.x - board['min_x']) * scale,
+                        BOARD_MIN_Y + (source.location.y - board['min_y']) * scale,
+                        BOARD_Z + (source.location.z - board['z']) * scale)
+        bpy.context.scene.collection.objects.link(obj)
+        return obj
+
+    def load(self, name):
+        spec = self.sets[name]
+        if spec.get('file') is None:
+            pieces = detect_pieces(bpy.data.objects, spec)
+            boards = [bpy.data.objects[n] for n in spec.get('board_objects', []) if n in bpy.data.objects]
+            return {'pieces': pieces, 'boards': boards}
+
+        path = os.path.abspath(spec['file'])
+        wanted = set(spec.get('board_objects', []))
+        with bpy.data.libraries.load(path, link=True) as (data_from, data_to):
+            data_to.objects = [n for n in data_from.objects if n in wanted or piece_type(n, spec)]
+        print(f"Linked chess set '{name}' from {path} ({len(data_to.objects)} objects)")
+
+        scale, board = self.fit(spec)
+        pieces, boards, copies = {}, [], {}
+        for source in data_to.objects:
+            if source is None or source.type != 'MESH':
+                continue
+            obj = self.place_linked(source, f"{name}:{source.name}", scale, board, copies)
+            if source.name in wanted:
+                boards.append(obj)
+            else:
+                pieces[obj.name] = {'type': piece_type(source.name, spec), 'obj': obj, 'base_z': obj.location.z}
+        return {'pieces': pieces, 'boards': boards}
+
+    def boards(self, name):
+        """Board objects shown with a set: its own, or ours for sets that only bring pieces"""
+        return self.loaded[name]['boards'] or self.loaded[DEFAULT_SET_NAME]['boards']
+
+    def activate(self, name):
+        if name not in self.sets:
+            raise KeyError(f"Unknown chess set '{name}' (known: {', '.join(self.sets)})")
+        if name == self.active:
+            return self.loaded[name]['pieces']
+        if name not in self.loaded:
+            self.loaded[name] = self.load(name)
+
+        previous = self.active
+        for obj in self.boards(previous):
+            obj.hide_render = obj.hide_viewport = True
+        for pdata in self.loaded[previous]['pieces'].values():
+            pdata['obj'].hide_render = pdata['obj'].hide_viewport = True
+            pdata['square'] = None
+        for obj in self.boards(name):
+            obj.hide_render = obj.hide_viewport = False
+        self.active = name
+        return self.loaded[name]['pieces']
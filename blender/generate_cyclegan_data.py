@@ -7,87 +7,86 @@ Generates synthetic chess images using EXACT coordinates from diagnostic run.
 import bpy
 import math
 from mathutils import Vector
+from bpy_extras.object_utils import world_to_camera_view
 import sys
 import argparse
 import os
 import csv
-import random
+import time
 
-# ==========================
-# CALIBRATED CONSTANTS
-# Constants derived from the diagnostic run
-BOARD_MIN_X = -21.8222
-BOARD_MAX_X = -2.1417
-BOARD_MIN_Y = -8.6489  # (Calculated from Max Y - Width)
-BOARD_MAX_Y = 11.0316
-BOARD_Z = 0.7043
-
-TOTAL_WIDTH = 19.6805
-SQUARE_SIZE = 2.4601  # Total Width / 8
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from render_worker import serve
+from render_output import add_output_args, needs_finalize, master_path, partial_path, finalize
+from sampling import add_sampling_args, apply_sampling
+from render_metadata import GeometryWriter, camera_intrinsics, camera_extrinsics, square_corners
+import randomize
+from profiler import StageProfiler, add_profile_args, process_age
+from piece_pool import link_duplicate, pool_needs
+import chess_sets
+from board_geometry import (BOARD_MIN_X, BOARD_MAX_X, BOARD_MIN_Y, BOARD_MAX_Y, BOARD_Z,
+                            SQUARE_SIZE, get_square_center, parse_fen, fit_camera_height)
 
 # Camera
 # The board is huge (width 20), so the camera needs to be high
 CAMERA_HEIGHT = 35.0 
 LENS = 50
+FRAME_MARGIN = 0.04  # --auto_frame: border left around the board (fraction of its half width)
 RES = 800
 SAMPLES = 64
 
-def get_square_center(file_idx, rank_idx):
-    """
-    file_idx: 0 (a) to 7 (h)
-    rank_idx: 0 (1) to 7 (8)
-    """
-    # X Axis: Maps a..h
-    # path generally goes from negative (a) to positive (h)
-    center_x = BOARD_MIN_X + (file_idx * SQUARE_SIZE) + (SQUARE_SIZE / 2)
-    
-    # Y Axis: Maps 1..8
-    # In Blender, positive Y is "up" (black), negative Y is "down" (white)
-    center_y = BOARD_MIN_Y + (rank_idx * SQUARE_SIZE) + (SQUARE_SIZE / 2)
-    
-    return center_x, center_y, BOARD_Z
+# Region re-render (--region)
+REGION_MARGIN = 0.02       # Extra border around the changed squares (fraction of the frame)
+MAX_REGION_FRACTION = 0.4  # Bigger regions fall back to a full render
+MAX_SUN_TILT = 30          # Degrees from vertical; longer shadows make a region unsafe
+
+# Stage timings (--profile), render_still reports sync/sampling/denoise/write into it
+profiler = StageProfiler()
 
 def detect_pieces():
-    """Maps piece names to their types"""
-    pieces = {}
-    for obj in bpy.data.objects:
-        if obj.type != 'MESH': continue
+    """Maps piece names to their types (the scene's own set, see chess_sets.py)"""
+    return chess_sets.detect_pieces(bpy.data.objects)
 
-        # Skip the board and frame
-        if "Black & white" in obj.name or "Outer frame" in obj.name: continue
-        
-        name = obj.name
-        ptype = None
-        
-        # Mapping logic
-        if name in ['B', 'C', 'D', 'E', 'F', 'G', 'H', 'A(texture)']: ptype = 'P' # White Pawn
-        elif name in ['B.001', 'C.001', 'D.001', 'E.001', 'F.001', 'G.001', 'H.001', 'A(textures)']: ptype = 'p' # Black Pawn
-        elif 'rook' in name.lower(): ptype = 'R' if 'white' in name.lower() else 'r'
-        elif 'knight' in name.lower(): ptype = 'N' if 'white' in name.lower() else 'n'
-        elif 'bitshop' in name.lower() or 'bishop' in name.lower(): ptype = 'B' if 'white' in name.lower() else 'b'
-        elif 'queen' in name.lower(): ptype = 'Q' if 'white' in name.lower() else 'q'
-        elif 'king' in name.lower(): ptype = 'K' if 'white' in name.lower() else 'k'
-        
-        if ptype:
-            # Save the object and its original height (in case it differs between pieces)
-            pieces[name] = {'type': ptype, 'obj': obj, 'base_z': obj.location.z}
-            
-    return pieces
-
-def parse_fen(fen):
-    board_fen = fen.split()[0]
-    ranks = board_fen.split('/')
-    position = {} 
-    for r_idx, rank in enumerate(ranks):
-        f_idx = 0
-        real_rank = 7 - r_idx # 0 to 7 (where 7 is rank 8)
-        for char in rank:
-            if char.isdigit():
-                f_idx += int(char)
-            else:
-                position[(f_idx, real_rank)] = char
-                f_idx += 1
-    return position
+def hide_piece(pdata):
+    obj = pdata['obj']
+    obj.hide_render = True
+    obj.hide_viewport = True
+    obj.location.x = 100 # Move far away
+    pdata['square'] = None
+
+def place_piece(pdata, square):
+    obj = pdata['obj']
+    tx, ty, tz = get_square_center(*square)
+
+    obj.location.x = tx
+    obj.location.y = ty
+    obj.location.z = pdata['base_z'] # Keep the original height of the piece
+
+    obj.hide_render = False
+    obj.hide_viewport = False
+    pdata['square'] = square
+
+def spawn_piece(piece_map, ptype):
+    """
+    A hidden linked duplicate of a ptype piece, added to piece_map (and so kept
+    for later positions). None if the scene has no piece of that type at all.
+    """
+    template = next((p for p in piece_map.values() if p['type'] == ptype), None)
+    if template is None:
+        return None
+    obj = link_duplicate(template['obj'])
+    pdata = {'type': ptype, 'obj': obj, 'base_z': template['base_z'], 'duplicate': True}
+    piece_map[obj.name] = pdata
+    hide_piece(pdata)
+    return pdata
+
+def ensure_pool(fens, piece_map):
+    """Spawn the duplicates the FEN list needs up front (e.g. before keyframing)"""
+    have = {}
+    for pdata in piece_map.values():
+        have[pdata['type']] = have.get(pdata['type'], 0) + 1
+    for ptype, n in pool_needs(parse_fen(fen) for fen in fens).items():
+        for _ in range(n - have.get(ptype, 0)):
+            spawn_piece(piece_map, ptype)
 
 def apply_fen(fen, piece_map):
     target_pos = parse_fen(fen)
@@ -97,35 +96,118 @@ def apply_fen(fen, piece_map):
     available_pieces = {}
     
     for pname, pdata in piece_map.items():
-        pdata['obj'].hide_render = True
-        pdata['obj'].hide_viewport = True
-        pdata['obj'].location.x = 100 # Move far away
+        hide_piece(pdata)
         
         ptype = pdata['type']
         if ptype not in available_pieces: available_pieces[ptype] = []
         available_pieces[ptype].append(pdata)
 
     # 2. Place pieces
-    for (f_idx, r_idx), ptype in target_pos.items():
-        if ptype not in available_pieces or not available_pieces[ptype]:
-            # If we run out of a certain piece type (happens in promotion sometimes)
-            continue
+    for square, ptype in target_pos.items():
+        if available_pieces.get(ptype):
+            # Take a piece from the pool
+            pdata = available_pieces[ptype].pop()
+        else:
+            # Ran out of this type (promotion): add a linked duplicate to the pool
+            pdata = spawn_piece(piece_map, ptype)
+            if pdata is None:
+                continue
+        place_piece(pdata, square)
 
-        # Take a piece from the pool
-        piece_data = available_pieces[ptype].pop()
-        obj = piece_data['obj']
+def apply_fen_incremental(fen, piece_map):
+    """
+    Same result as apply_fen, but only touches the pieces whose square changed
+    since the previous call (one move = 2-4 objects instead of all 32), so
+    Cycles only re-syncs those objects.
+    Returns the number of objects touched.
+    """
+    if any('square' not in pdata for pdata in piece_map.values()):
+        # No previous placement to diff against
+        apply_fen(fen, piece_map)
+        return len(piece_map)
 
-        # Calculate position
-        tx, ty, tz = get_square_center(f_idx, r_idx)
-        
-        obj.location.x = tx
-        obj.location.y = ty
-        obj.location.z = piece_data['base_z'] # Keep the original height of the piece
-        
-        obj.hide_render = False
-        obj.hide_viewport = False
+    target_pos = parse_fen(fen)
+    on_board = {pdata['square']: pdata for pdata in piece_map.values() if pdata['square'] is not None}
 
-def setup_camera():
+    # 1. Pieces already standing on the right square stay untouched
+    missing = []
+    for square, ptype in target_pos.items():
+        current = on_board.get(square)
+        if current is not None and current['type'] == ptype:
+            del on_board[square]
+        else:
+            missing.append((square, ptype))
+
+    # 2. Whatever is left on the board has to move or disappear
+    displaced = {}
+    for pdata in on_board.values():
+        displaced.setdefault(pdata['type'], []).append(pdata)
+    hidden = {}
+    for pdata in piece_map.values():
+        if pdata['square'] is None:
+            hidden.setdefault(pdata['type'], []).append(pdata)
+
+    touched = 0
+    for square, ptype in missing:
+        candidates = displaced.get(ptype)
+        if candidates:
+            # The nearest displaced piece of this type is the one that moved
+            pdata = min(candidates, key=lambda p: abs(p['square'][0] - square[0]) + abs(p['square'][1] - square[1]))
+            candidates.remove(pdata)
+        elif hidden.get(ptype):
+            pdata = hidden[ptype].pop()
+        else:
+            # Pool for this type is empty (same as apply_fen)
+            pdata = spawn_piece(piece_map, ptype)
+            if pdata is None:
+                continue
+        place_piece(pdata, square)
+        touched += 1
+
+    # 3. Captured pieces
+    for candidates in displaced.values():
+        for pdata in candidates:
+            hide_piece(pdata)
+            touched += 1
+
+    return touched
+
+def board_array(fens):
+    """(N, 64) uint8 array of piece letters, 0 for empty squares"""
+    import numpy as np
+    boards = np.zeros((len(fens), 64), dtype=np.uint8)
+    for i, fen in enumerate(fens):
+        for (f_idx, r_idx), ptype in parse_fen(fen).items():
+            boards[i, r_idx * 8 + f_idx] = ord(ptype)
+    return boards
+
+def reorder_fens(fens):
+    """
+    Greedy nearest-neighbour order over the FEN list: each next position is the
+    remaining one with the fewest changed squares. Returns a list of indices.
+    """
+    import numpy as np
+    if len(fens) < 3:
+        return list(range(len(fens)))
+
+    boards = board_array(fens)
+    remaining = np.ones(len(fens), dtype=bool)
+    order = [0]
+    remaining[0] = False
+    for _ in range(len(fens) - 1):
+        diff = (boards != boards[order[-1]]).sum(axis=1)
+        diff[~remaining] = 65
+        nxt = int(diff.argmin())
+        order.append(nxt)
+        remaining[nxt] = False
+    return order
+
+def setup_camera(auto_frame=False, piece_map=None, margin=FRAME_MARGIN):
+    """
+    Top-down camera and sun. With auto_frame the height is computed from the
+    board bounds so the board fills the frame (minus margin) instead of the
+    fixed CAMERA_HEIGHT, which leaves a wide background border.
+    """
     # Calculate the center of the board for camera positioning
     center_x = (BOARD_MIN_X + BOARD_MAX_X) / 2
     center_y = (BOARD_MIN_Y + BOARD_MAX_Y) / 2
@@ -144,6 +226,13 @@ def setup_camera():
     cam = bpy.context.active_object
     cam.rotation_euler = (0, 0, 0) # Top-down view
     cam.data.lens = LENS
+
+    if auto_frame:
+        piece_height = max((p['obj'].dimensions.z for p in piece_map.values()), default=0.0) if piece_map else 0.0
+        half_extent = max(BOARD_MAX_X - BOARD_MIN_X, BOARD_MAX_Y - BOARD_MIN_Y) / 2
+        camera_z = BOARD_Z + fit_camera_height(half_extent, LENS, cam.data.sensor_width, margin, piece_height)
+        cam.location.z = camera_z
+        print(f"Auto-framed camera at height {camera_z:.2f} (fixed height is {CAMERA_HEIGHT})")
     bpy.context.scene.camera = cam
     
     scene = bpy.context.scene
@@ -154,47 +243,407 @@ def setup_camera():
     try: scene.cycles.device = 'GPU'
     except: pass
 
+def render_still(fpath):
+    bpy.context.scene.render.filepath = fpath
+    profiler.render(write_still=True)
+
+def changed_squares(prev_pos, next_pos):
+    return {sq for sq in set(prev_pos) | set(next_pos) if prev_pos.get(sq) != next_pos.get(sq)}
+
+def shadow_reach(piece_height):
+    """
+    Horizontal distance a piece's shadow can reach from its square.
+    None when the lighting is not a near-vertical sun, because then a change can
+    affect pixels far from the changed squares.
+    """
+    down = Vector((0, 0, -1))
+    reach = 0.0
+    for obj in bpy.context.scene.objects:
+        if obj.type != 'LIGHT' or obj.hide_render: continue
+        if obj.data.type != 'SUN': return None
+        tilt = (obj.matrix_world.to_3x3() @ down).angle(down)
+        if tilt > math.radians(MAX_SUN_TILT): return None
+        reach = max(reach, piece_height * math.tan(tilt))
+    return reach
+
+def square_region(squares, piece_height, reach):
+    """Normalized camera-frame box (min_x, min_y, max_x, max_y) covering the squares and the pieces on them"""
+    scene = bpy.context.scene
+    half = SQUARE_SIZE / 2 + reach
+    xs, ys = [], []
+    for f_idx, r_idx in squares:
+        cx, cy, cz = get_square_center(f_idx, r_idx)
+        for dx in (-half, half):
+            for dy in (-half, half):
+                for z in (cz, cz + piece_height):
+                    co = world_to_camera_view(scene, scene.camera, Vector((cx + dx, cy + dy, z)))
+                    xs.append(co.x)
+                    ys.append(co.y)
+    return (max(0.0, min(xs) - REGION_MARGIN), max(0.0, min(ys) - REGION_MARGIN),
+            min(1.0, max(xs) + REGION_MARGIN), min(1.0, max(ys) + REGION_MARGIN))
+
+def load_pixels(fpath):
+    """(H, W, 4) float array, rows bottom to top like the render border"""
+    import numpy as np
+    img = bpy.data.images.load(os.path.abspath(fpath), check_existing=False)
+    w, h = img.size
+    pixels = np.empty(w * h * 4, dtype=np.float32)
+    img.pixels.foreach_get(pixels)
+    bpy.data.images.remove(img)
+    return pixels.reshape(h, w, 4)
+
+def save_pixels(pixels, fpath):
+    h, w = pixels.shape[:2]
+    img = bpy.data.images.new("region_composite", w, h, alpha=True)
+    img.pixels.foreach_set(pixels.ravel())
+    img.filepath_raw = os.path.abspath(fpath)
+    img.file_format = 'PNG'
+    img.save()
+    bpy.data.images.remove(img)
+
+def render_region_frame(fpath, fen, piece_map, state):
+    """
+    --region mode: only re-render the squares that changed since the previous
+    frame (Blender border render) and paste them onto that frame.
+    A move changes 2-4 squares, so most frames sample a small part of the image.
+    Falls back to a full render for the first frame, when the lighting makes the
+    region unsafe, or when the region is too large to be worth it.
+    state carries the previous position and pixels between calls.
+    Returns True if only a region was rendered.
+    """
+    scene = bpy.context.scene
+    position = parse_fen(fen)
+    if 'piece_height' not in state:
+        state['piece_height'] = max(p['obj'].dimensions.z for p in piece_map.values())
+
+    region = None
+    prev = state.get('pixels')
+    if prev is not None and prev.shape[:2] == (scene.render.resolution_y, scene.render.resolution_x):
+        squares = changed_squares(state['position'], position)
+        if not squares:
+            save_pixels(prev, fpath)
+            return True
+        reach = shadow_reach(state['piece_height'])
+        if reach is not None:
+            region = square_region(squares, state['piece_height'], reach)
+            if (region[2] - region[0]) * (region[3] - region[1]) > MAX_REGION_FRACTION:
+                region = None
+
+    if region is None:
+        scene.render.use_border = False
+        render_still(fpath)
+        state['pixels'] = load_pixels(fpath)
+    else:
+        scene.render.use_border = True
+        scene.render.use_crop_to_border = False
+        (scene.render.border_min_x, scene.render.border_min_y,
+         scene.render.border_max_x, scene.render.border_max_y) = region
+        render_still(fpath)
+        scene.render.use_border = False
+
+        # Keep one pixel away from the border edge, the margin covers it
+        h, w = prev.shape[:2]
+        x0, x1 = int(region[0] * w) + 1, int(region[2] * w) - 1
+        y0, y1 = int(region[1] * h) + 1, int(region[3] * h) - 1
+        pixels = prev.copy()
+        pixels[y0:y1, x0:x1] = load_pixels(fpath)[y0:y1, x0:x1]
+        save_pixels(pixels, fpath)
+        state['pixels'] = pixels
+
+    state['position'] = position
+    return region is not None
+
+def placed_pieces(piece_map):
+    """{(file_idx, rank_idx): letter} of the pieces currently on the board"""
+    return {pdata['square']: pdata['type'] for pdata in piece_map.values() if pdata.get('square') is not None}
+
+def record_geometry(writer, fpath, piece_map, size):
+    """Add the current camera and placement of an image to its geometry sidecar"""
+    cam = bpy.context.scene.camera
+    centers = [get_square_center(i % 8, i // 8) for i in range(64)]
+    writer.add(fpath, camera_intrinsics(cam.data, size, size), camera_extrinsics(cam),
+               square_corners(centers, SQUARE_SIZE), placed_pieces(piece_map), size, size)
+
+def keyframe_sequence(fens, piece_map, first_frame=0, on_frame=None):
+    """
+    Turn a FEN list into piece keyframes, one frame per position (frame N = FEN N).
+    Only pieces whose square changed get a key; CONSTANT interpolation holds
+    every other piece where it was.
+    on_frame(frame) is called once each frame's placement is set.
+    Returns the last frame number.
+    """
+    # Every piece must be keyed from the first frame on, so duplicates can't appear mid-sequence
+    ensure_pool(fens, piece_map)
+    frame = first_frame
+    for frame, fen in enumerate(fens, start=first_frame):
+        before = {name: pdata.get('square', False) for name, pdata in piece_map.items()}
+        apply_fen_incremental(fen, piece_map)
+        for name, pdata in piece_map.items():
+            if frame == first_frame or pdata['square'] != before[name]:
+                pdata['obj'].keyframe_insert(data_path="location", frame=frame)
+                pdata['obj'].keyframe_insert(data_path="hide_render", frame=frame)
+        if on_frame:
+            on_frame(frame)
+
+    for pdata in piece_map.values():
+        anim = pdata['obj'].animation_data
+        if anim and anim.action:
+            for fcurve in anim.action.fcurves:
+                for key in fcurve.keyframe_points:
+                    key.interpolation = 'CONSTANT'
+    return frame
+
+def setup_animation(fens, piece_map, output_dir, geometry=None):
+    """Keyframe the game and point the frame pipeline at synthetic_####.png"""
+    scene = bpy.context.scene
+
+    def record_frame(frame):
+        record_geometry(geometry, f"synthetic_{frame:04d}.png", piece_map, RES)
+
+    on_frame = record_frame if geometry is not None else None
+    scene.frame_start = 0
+    scene.frame_end = keyframe_sequence(fens, piece_map, on_frame=on_frame)
+    scene.render.filepath = os.path.join(output_dir, "synthetic_####")
+    scene.render.image_settings.file_format = 'PNG'
+    scene.render.use_file_extension = True
+    scene.render.use_overwrite = False  # A re-run shard skips frames that are already done (the farm deletes truncated ones first)
+    scene.render.use_persistent_data = True  # Keep BVH/textures between frames
+
 def main():
+    global RES, SAMPLES
+    start_time = time.time()
+    startup = process_age()
     argv = sys.argv
     if "--" in argv: argv = argv[argv.index("--") + 1:]
     else: argv = []
     
     parser = argparse.ArgumentParser()
-    parser.add_argument('--csv', type=str, required=True)
+    parser.add_argument('--csv', type=str)
     parser.add_argument('--output_dir', type=str, default="//output")
     parser.add_argument('--limit', type=int, default=2000)
+    parser.add_argument('--resolution', type=int, default=RES)
+    parser.add_argument('--samples', type=int, default=SAMPLES)
+    parser.add_argument('--worker', action='store_true',
+                        help="Keep the scene loaded and read FEN jobs from stdin (see render_worker.py)")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Only move the pieces that changed since the previous position")
+    parser.add_argument('--reorder', action='store_true',
+                        help="Render the CSV positions in nearest-neighbour order (file names are kept)")
+    parser.add_argument('--region', action='store_true',
+                        help="Re-render only the changed squares and composite onto the previous frame")
+    parser.add_argument('--auto_frame', action='store_true',
+                        help="Fit the camera height to the board bounds so the board fills the frame")
+    parser.add_argument('--frame_margin', type=float, default=FRAME_MARGIN)
+    parser.add_argument('--format', type=str, default='png', choices=['png', 'jpg', 'webp'],
+                        help="File format of the CSV mode outputs (worker jobs use their output extension)")
+    add_output_args(parser)
+    add_sampling_args(parser)
+    parser.add_argument('--no_geometry', action='store_true',
+                        help="Don't write the geometry sidecar (camera matrices, square quads, pieces) per job")
+    parser.add_argument('--animate', action='store_true',
+                        help="Keyframe the CSV positions (frame N = synthetic_N) and render them as one animation")
+    parser.add_argument('--frame_start', type=int, default=None, help="First frame to render with --animate")
+    parser.add_argument('--frame_end', type=int, default=None, help="Last frame to render with --animate")
+    parser.add_argument('--save_blend', type=str, default=None,
+                        help="With --animate: save the keyframed scene here instead of rendering, "
+                             "shards can then run 'blender <file> -b -s A -e B -a'")
+    parser.add_argument('--transparent', action='store_true',
+                        help="Render with film transparency and store RGBA (png/webp) so the board can be "
+                             "composited over real backgrounds at load time (cycleGAN --dataset_mode composited)")
+    parser.add_argument('--variants', type=int, default=1,
+                        help="Render this many randomized variants per FEN (lighting, HDRI, tint, camera jitter)")
+    parser.add_argument('--random_spec', type=str, default=None,
+                        help="JSON file with the randomization ranges (see randomize.py for the defaults)")
+    add_profile_args(parser)
+    parser.add_argument('--sets', type=str, default=None,
+                        help="JSON registry of extra chess sets (see chess_sets.py), linked on first use")
+    parser.add_argument('--chess_set', type=str, default=chess_sets.DEFAULT_SET_NAME,
+                        help="Set to render with (worker jobs may pick another with 'set')")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="Seed of the randomization (worker jobs may override 'variants' and 'seed', "
+                             "a job that sets either is randomized)")
     
     args = parser.parse_args(argv)
-    
-    if not os.path.exists(args.output_dir):
-        os.makedirs(args.output_dir)
+    RES = args.resolution
+    SAMPLES = args.samples
+    if not args.worker and not args.csv:
+        parser.error("--csv is required unless --worker is set")
+    if args.animate and (args.worker or args.reorder or args.region):
+        parser.error("--animate renders frames in file order, it can't be combined with --worker/--reorder/--region")
+    if args.animate and (args.output_size or args.format != 'png'):
+        parser.error("--animate writes full-size PNG frames, use resize_images.py on them")
+    if args.transparent and args.format == 'jpg':
+        parser.error("--transparent needs an alpha channel, use --format png or webp")
+    randomized = args.variants > 1 or args.random_spec is not None
+    if randomized and (args.animate or args.region):
+        parser.error("Randomized variants move the camera and lights, they can't be used with --animate/--region")
         
     print(f"DEBUG: Using Calibrated Board: X[{BOARD_MIN_X} to {BOARD_MAX_X}]")
 
-    piece_map = detect_pieces()
-    setup_camera()
+    profiler.path = args.profile
+    if startup is not None:
+        profiler.add('startup', startup)
+    with profiler.stage('detect_pieces'):
+        registry = chess_sets.SetRegistry(chess_sets.load_registry(args.sets), args.chess_set)
+        piece_map = registry.activate(args.chess_set)
+    with profiler.stage('scene_setup'):
+        setup_camera(args.auto_frame, piece_map, args.frame_margin)
+        apply_sampling(bpy.context.scene, SAMPLES, args.noise_threshold, args.time_limit)
+        if args.transparent:
+            bpy.context.scene.render.film_transparent = True
+            bpy.context.scene.render.image_settings.file_format = 'PNG'
+            bpy.context.scene.render.image_settings.color_mode = 'RGBA'
+    spec = randomize.load_spec(args.random_spec)
+    board_center = ((BOARD_MIN_X + BOARD_MAX_X) / 2, (BOARD_MIN_Y + BOARD_MAX_Y) / 2, BOARD_Z)
+    random_state = None
+    def randomizer():
+        """The randomizer state, set up on first use (worker jobs may ask for variants)"""
+        nonlocal random_state
+        if random_state is None:
+            with profiler.stage('randomizer_setup'):
+                random_state = randomize.setup_randomizer(piece_map, board_center, registry.boards(registry.active))
+        return random_state
+
+    if randomized:
+        randomizer()
+    profiler.flush_job("setup")
+
+    def place(fen, piece_map):
+        with profiler.stage('apply_fen'):
+            return (apply_fen_incremental if args.incremental else apply_fen)(fen, piece_map)
+
+    region_state = {}
+    def render_frame(fpath, fen):
+        # Render a full-size PNG master, then write the final size/format from it
+        partial = partial_path(fpath)
+        target = master_path(fpath, args.master_dir) if needs_finalize(fpath, args.output_size) else partial
+        if args.region:
+            render_region_frame(target, fen, piece_map, region_state)
+        else:
+            render_still(target)
+        if target != partial:
+            with profiler.stage('finalize'):
+                finalize(target, partial, args.output_size, args.quality, keep_master=bool(args.master_dir))
+        os.replace(partial, fpath)
+
+    def add_geometry(writer, fpath):
+        with profiler.stage('geometry'):
+            record_geometry(writer, fpath, piece_map, output_size)
+
+    output_size = args.output_size or RES
+    writers = {}
+    def geometry_writer(output_dir, name):
+        if args.no_geometry:
+            return None
+        if output_dir not in writers:
+            writers[output_dir] = GeometryWriter(os.path.join(output_dir, name))
+        return writers[output_dir]
+
+    def render_variants(fpath, fen, variants, seed, writer, randomized=randomized):
+        """
+        The position is already placed: render it once, or once per randomized
+        variant (<name>_v<k><ext>) with the parameters logged next to the images
+        """
+        if not randomized:
+            render_frame(fpath, fen)
+            if writer:
+                add_geometry(writer, fpath)
+            return [fpath]
+
+        base, ext = os.path.splitext(fpath)
+        log_path = os.path.join(os.path.dirname(os.path.abspath(fpath)), "randomization.jsonl")
+        outputs = []
+        try:
+            for k in range(variants):
+                vpath = f"{base}_v{k}{ext}"
+                params = randomize.sample_params(spec, randomize.variant_rng(seed, os.path.basename(fpath), k))
+                randomize.apply_params(randomizer(), params)
+                render_frame(vpath, fen)
+                if writer:
+                    add_geometry(writer, vpath)
+                randomize.record(log_path, vpath, fen, seed, k, params)
+                outputs.append(vpath)
+        finally:
+            # The next job on this worker may not be randomized, it must see the base scene
+            randomize.restore(randomizer())
+        return outputs
+
+    if args.worker:
+        def render_job(job):
+            nonlocal piece_map
+            fpath = job['output']
+            output_dir = os.path.dirname(os.path.abspath(fpath))
+            os.makedirs(output_dir, exist_ok=True)
+            chess_set = job.get('set', args.chess_set)
+            job_randomized = randomized or job.get('variants', 1) > 1 or 'seed' in job
+            if job_randomized and args.region:
+                raise ValueError("Randomized variants can't be rendered by a --region worker")
+            if chess_set != registry.active:
+                with profiler.stage('switch_set'):
+                    piece_map = registry.activate(chess_set)
+                    if random_state is not None:
+                        # The tints still point at the previous set's materials
+                        randomize.set_tint_targets(random_state, piece_map, registry.boards(chess_set))
+                region_state.clear()  # The previous frame shows another set
+            place(job['fen'], piece_map)
+            writer = geometry_writer(output_dir, f"geometry_{os.getpid()}.npz")
+            outputs = render_variants(fpath, job['fen'], job.get('variants', args.variants),
+                                      job.get('seed', args.seed), writer, job_randomized)
+            profiler.flush_job(os.path.basename(fpath), images=len(outputs))
+            return outputs
+
+        serve(render_job, setup_seconds=time.time() - start_time)
+        for writer in writers.values():
+            writer.flush()
+        return
+
+    if not os.path.exists(args.output_dir):
+        os.makedirs(args.output_dir)
     
     print(f"Starting generation from {args.csv}...")
     unique_fens = set()
-    count = 0
+    jobs = []
     
     with open(args.csv, 'r') as f:
         reader = csv.DictReader(f)
         for row in reader:
-            if count >= args.limit: break
+            if len(jobs) >= args.limit: break
             fen = row['fen']
             if fen in unique_fens: continue
             unique_fens.add(fen)
-            
-            apply_fen(fen, piece_map)
-            
-            fname = f"synthetic_{count:04d}.png"
-            fpath = os.path.join(args.output_dir, fname)
-            bpy.context.scene.render.filepath = fpath
-            bpy.ops.render.render(write_still=True)
-            
-            print(f"Saved {fname}")
-            count += 1
+            jobs.append((f"synthetic_{len(jobs):04d}.{args.format}", fen))
+
+    geometry = geometry_writer(args.output_dir, "geometry.npz")
+
+    if args.animate:
+        scene = bpy.context.scene
+        setup_animation([fen for _, fen in jobs], piece_map, args.output_dir, geometry)
+        if geometry:
+            geometry.flush()
+        if args.save_blend:
+            bpy.ops.wm.save_as_mainfile(filepath=os.path.abspath(args.save_blend), copy=True)
+            print(f"Saved animation ({scene.frame_end + 1} frames) to {args.save_blend}")
+            return
+        if args.frame_start is not None: scene.frame_start = args.frame_start
+        if args.frame_end is not None: scene.frame_end = min(args.frame_end, scene.frame_end)
+        print(f"Rendering frames {scene.frame_start}-{scene.frame_end}...")
+        bpy.ops.render.render(animation=True)
+        return
+
+    if args.reorder:
+        jobs = [jobs[i] for i in reorder_fens([fen for _, fen in jobs])]
+
+    for fname, fen in jobs:
+        place(fen, piece_map)
+        
+        fpath = os.path.join(args.output_dir, fname)
+        outputs = render_variants(fpath, fen, args.variants, args.seed, geometry)
+        profiler.flush_job(fname, images=len(outputs))
+        for output in outputs:
+            print(f"Saved {os.path.basename(output)}")
+
+    if geometry:
+        geometry.flush()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""
+Minimal bpy stand-in
+====================
+Enough of bpy for the Python side of the render scripts (FEN parsing, piece
+placement, camera math, job loops, profiling) to run with plain Python, so it
+can be benchmarked and regression-tested on machines without Blender:
+
+  sys.path.insert(0, "blender/offline")
+  import bpy
+  bpy.reset()
+  bpy.data.objects.new("White rook", bpy.data.meshes.new("rook", size=(1, 1, 2)))
+
+Rendering writes an empty file at scene.render.filepath and fires the render
+handlers, nothing is sampled. Anything not listed here is deliberately missing
+and raises AttributeError, like an API that changed.
+"""
+
+import os
+from types import SimpleNamespace
+
+from mathutils import Vector, Matrix, Euler
+
+
+class Mesh:
+    def __init__(self, name, size=(1.0, 1.0, 1.0)):
+        self.name = name
+        self.size = tuple(float(s) for s in size)
+
+
+class CameraData:
+    def __init__(self, name):
+        self.name = name
+        self.lens = 50.0
+        self.sensor_width = 36.0
+        self.sensor_height = 24.0
+        self.sensor_fit = 'AUTO'
+        self.shift_x = 0.0
+        self.shift_y = 0.0
+        self.clip_start = 0.1
+        self.clip_end = 1000.0
+
+
+class LightData:
+    def __init__(self, name, type='POINT'):
+        self.name = name
+        self.type = type
+        self.energy = 10.0
+
+
+class Object:
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data
+        self.type = {Mesh: 'MESH', CameraData: 'CAMERA', LightData: 'LIGHT'}.get(type(data), 'EMPTY')
+        self._location = Vector((0.0, 0.0, 0.0))
+        self._rotation = Euler()
+        self.scale = Vector((1.0, 1.0, 1.0))
+        self.hide_render = False
+        self.hide_viewport = False
+        self.is_shadow_catcher = False
+        self.material_slots = []
+        self.animation_data = None
+
+    location = property(lambda self: self._location,
+                        lambda self, v: setattr(self, '_location', Vector(v)))
+    rotation_euler = property(lambda self: self._rotation,
+                              lambda self, v: setattr(self, '_rotation', Euler(v)))
+
+    @property
+    def dimensions(self):
+        size = self.data.size if isinstance(self.data, Mesh) else (0.0, 0.0, 0.0)
+        return Vector([s * k for s, k in zip(size, self.scale)])
+
+    @property
+    def bound_box(self):
+        """Local corners of a mesh centered on the origin in XY, standing on z = 0"""
+        sx, sy, sz = self.data.size if isinstance(self.data, Mesh) else (0.0, 0.0, 0.0)
+        return [(x, y, z) for x in (-sx / 2, sx / 2) for y in (-sy / 2, sy / 2) for z in (0.0, sz)]
+
+    @property
+    def matrix_world(self):
+        rot = self._rotation.to_matrix().to_4x4()
+        scale = Matrix([[self.scale.x, 0, 0, 0], [0, self.scale.y, 0, 0], [0, 0, self.scale.z, 0], [0, 0, 0, 1]])
+        return Matrix.Translation(self._location) @ rot @ scale
+
+    @matrix_world.setter
+    def matrix_world(self, matrix):
+        import numpy as np
+        m = np.array(matrix)
+        self._location = Vector(m[:3, 3])
+        r = m[:3, :3] / np.linalg.norm(m[:3, :3], axis=0)
+        # XYZ Euler from R = Rz @ Ry @ Rx
+        self._rotation = Euler((np.arctan2(r[2, 1], r[2, 2]), np.arcsin(-np.clip(r[2, 0], -1, 1)),
+                                np.arctan2(r[1, 0], r[0, 0])))
+
+    def copy(self):
+        dup = Object(self.name, self.data)
+        dup.location = self.location.copy()
+        dup.rotation_euler = self.rotation_euler.copy()
+        dup.scale = self.scale.copy()
+        dup.material_slots = list(self.material_slots)
+        return dup
+
+    @property
+    def users_collection(self):
+        return []
+
+    def animation_data_clear(self):
+        self.animation_data = None
+
+    def keyframe_insert(self, data_path, frame=None):
+        pass
+
+
+class Collection:
+    """bpy.data.<collection>: name lookup, iteration, new/remove"""
+
+    def __init__(self, factory=None):
+        self._items = {}
+        self._factory = factory
+
+    def __iter__(self): return iter(list(self._items.values()))
+    def __len__(self): return len(self._items)
+    def __contains__(self, name): return name in self._items
+    def __getitem__(self, name): return self._items[name]
+    def get(self, name, default=None): return self._items.get(name, default)
+    def values(self): return list(self._items.values())
+
+    def unique_name(self, name):
+        if name not in self._items:
+            return name
+        i = 1
+        while f"{name}.{i:03d}" in self._items:
+            i += 1
+        return f"{name}.{i:03d}"
+
+    def new(self, name, *args, **kwargs):
+        item = self._factory(self.unique_name(name), *args, **kwargs)
+        self._items[item.name] = item
+        return item
+
+    def link(self, item):
+        item.name = self.unique_name(item.name)
+        self._items[item.name] = item
+
+    def remove(self, item, do_unlink=True):
+        self._items.pop(item.name, None)
+
+
+class Depsgraph:
+    def update(self):
+        pass
+
+
+def _scene():
+    render = SimpleNamespace(
+        engine='CYCLES', filepath="", resolution_x=1920, resolution_y=1080, resolution_percentage=100,
+        film_transparent=False, use_border=False, use_crop_to_border=False,
+        border_min_x=0.0, border_min_y=0.0, border_max_x=1.0, border_max_y=1.0,
+        image_settings=SimpleNamespace(file_format='PNG', color_mode='RGB', quality=90),
+    )
+    cycles = SimpleNamespace(samples=128, device='CPU', use_adaptive_sampling=True, adaptive_threshold=0.01,
+                             adaptive_min_samples=0, time_limit=0.0, use_denoising=True)
+    scene = SimpleNamespace(name="Scene", render=render, cycles=cycles, camera=None, world=None,
+                            frame_start=1, frame_end=250, frame_current=1)
+    scene.objects = data.objects
+    scene.collection = SimpleNamespace(objects=data.objects)
+    scene.frame_set = lambda frame: setattr(scene, 'frame_current', frame)
+    return scene
+
+
+def _add_object(name, object_data, location=(0, 0, 0), rotation=(0, 0, 0)):
+    obj = data.objects.new(name, object_data)
+    obj.location = location
+    obj.rotation_euler = rotation
+    context.active_object = obj
+    return obj
+
+
+def _camera_add(location=(0, 0, 0), rotation=(0, 0, 0), **kwargs):
+    _add_object("Camera", data.cameras.new("Camera"), location, rotation)
+    return {'FINISHED'}
+
+
+def _light_add(type='POINT', location=(0, 0, 0), rotation=(0, 0, 0), **kwargs):
+    _add_object(type.title(), data.lights.new(type.title(), type=type), location, rotation)
+    return {'FINISHED'}
+
+
+def _render(write_still=False, animation=False, **kwargs):
+    scene = context.scene
+    for handler in app.handlers.render_pre:
+        handler(scene)
+    samples = scene.cycles.samples
+    for handler in app.handlers.render_stats:
+        handler(f"Rendering | Sample {samples}/{samples}")
+    if scene.cycles.use_denoising:
+        for handler in app.handlers.render_stats:
+            handler("Rendering | Denoising")
+    for handler in app.handlers.render_post:
+        handler(scene)
+    if write_still and scene.render.filepath:
+        path = os.path.abspath(scene.render.filepath)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        open(path, 'wb').close()
+        for handler in app.handlers.render_write:
+            handler(scene)
+    return {'FINISHED'}
+
+
+def reset():
+    """Empty scene, as after opening a new .blend"""
+    global data, context
+    data = SimpleNamespace(
+        objects=Collection(Object),
+        meshes=Collection(Mesh),
+        cameras=Collection(CameraData),
+        lights=Collection(LightData),
+    )
+    context = SimpleNamespace(active_object=None, evaluated_depsgraph_get=Depsgraph)
+    context.scene = _scene()
+    for handlers in vars(app.handlers).values():
+        handlers.clear()
+
+
+app = SimpleNamespace(
+    version=(0, 0, 0),
+    background=True,
+    handlers=SimpleNamespace(render_pre=[], render_post=[], render_stats=[], render_write=[],
+                             render_init=[], render_complete=[], render_cancel=[]),
+)
+ops = SimpleNamespace(
+    object=SimpleNamespace(camera_add=_camera_add, light_add=_light_add),
+    render=SimpleNamespace(render=_render),
+)
+types = SimpleNamespace(Object=Object, Mesh=Mesh, Camera=CameraData, Light=LightData)
+data = context = None
+reset()
@@ -0,0 +1,23 @@
+"""world_to_camera_view for the offline bpy stand-in (perspective cameras)"""
+
+import numpy as np
+
+from mathutils import Vector
+
+def world_to_camera_view(scene, obj, coord):
+    """Normalized (x, y) in the frame (0..1, origin bottom-left) and depth, like bpy_extras"""
+    cam = obj.data
+    local = np.linalg.inv(np.array(obj.matrix_world)) @ np.append(np.array(coord, dtype=np.float64), 1.0)
+    depth = -local[2]
+    w = scene.render.resolution_x
+    h = scene.render.resolution_y
+    if cam.sensor_fit == 'VERTICAL':
+        sensor, ref = cam.sensor_height, h
+    elif cam.sensor_fit == 'HORIZONTAL':
+        sensor, ref = cam.sensor_width, w
+    else:
+        sensor, ref = cam.sensor_width, max(w, h)
+    f = cam.lens / sensor * ref
+    x = 0.5 + cam.shift_x * ref / w + f * local[0] / depth / w
+    y = 0.5 + cam.shift_y * ref / h + f * local[1] / depth / h
+    return Vector((x, y, depth))
@@ -0,0 +1,112 @@
+"""
+Minimal mathutils stand-in (Vector, Matrix, Euler) for running the render
+scripts' Python logic without Blender, see offline/bpy/__init__.py.
+Only what the scripts in blender/ use is implemented.
+"""
+
+import math
+
+import numpy as np
+
+
+class Vector:
+    def __init__(self, values=(0.0, 0.0, 0.0)):
+        self._v = np.array(values, dtype=np.float64)
+
+    x = property(lambda self: self._v[0], lambda self, v: self._v.__setitem__(0, v))
+    y = property(lambda self: self._v[1], lambda self, v: self._v.__setitem__(1, v))
+    z = property(lambda self: self._v[2], lambda self, v: self._v.__setitem__(2, v))
+
+    def __len__(self): return len(self._v)
+    def __iter__(self): return iter(float(v) for v in self._v)
+    def __getitem__(self, i): return float(self._v[i]) if isinstance(i, int) else tuple(float(v) for v in self._v[i])
+    def __setitem__(self, i, v): self._v[i] = v
+    def __array__(self, dtype=None, copy=None): return self._v.astype(dtype) if dtype else self._v.copy()
+    def __repr__(self): return f"Vector({tuple(self)})"
+
+    def __add__(self, other): return Vector(self._v + np.asarray(other, dtype=np.float64))
+    def __sub__(self, other): return Vector(self._v - np.asarray(other, dtype=np.float64))
+    def __neg__(self): return Vector(-self._v)
+    def __mul__(self, k): return Vector(self._v * k)
+    __rmul__ = __mul__
+    def __truediv__(self, k): return Vector(self._v / k)
+    def __eq__(self, other): return np.allclose(self._v, np.asarray(other, dtype=np.float64))
+
+    @property
+    def length(self): return float(np.linalg.norm(self._v))
+    def copy(self): return Vector(self._v)
+    def dot(self, other): return float(self._v @ np.asarray(other, dtype=np.float64))
+    def normalized(self): return Vector(self._v / np.linalg.norm(self._v))
+
+
+class Matrix:
+    def __init__(self, rows=None):
+        self._m = np.identity(4) if rows is None else np.array(rows, dtype=np.float64)
+
+    @classmethod
+    def Identity(cls, size): return cls(np.identity(size))
+
+    @classmethod
+    def Translation(cls, vector):
+        m = np.identity(4)
+        m[:3, 3] = list(vector)[:3]
+        return cls(m)
+
+    @classmethod
+    def Rotation(cls, angle, size, axis):
+        c, s = math.cos(angle), math.sin(angle)
+        r = {'X': [[1, 0, 0], [0, c, -s], [0, s, c]],
+             'Y': [[c, 0, s], [0, 1, 0], [-s, 0, c]],
+             'Z': [[c, -s, 0], [s, c, 0], [0, 0, 1]]}[axis]
+        m = np.identity(size)
+        m[:3, :3] = r
+        return cls(m)
+
+    def __len__(self): return len(self._m)
+    def __iter__(self): return iter(Vector(row) for row in self._m)
+    def __getitem__(self, i): return Vector(self._m[i])
+    def __array__(self, dtype=None, copy=None): return self._m.astype(dtype) if dtype else self._m.copy()
+    def __repr__(self): return f"Matrix({self._m.tolist()})"
+
+    def __matmul__(self, other):
+        if isinstance(other, Matrix):
+            return Matrix(self._m @ other._m)
+        v = np.asarray(other, dtype=np.float64)
+        if len(v) == 3 and len(self._m) == 4:
+            return Vector((self._m @ np.append(v, 1.0))[:3])
+        return Vector(self._m @ v)
+
+    @property
+    def translation(self): return Vector(self._m[:3, 3])
+
+    @translation.setter
+    def translation(self, v): self._m[:3, 3] = list(v)[:3]
+
+    def copy(self): return Matrix(self._m)
+    def inverted(self): return Matrix(np.linalg.inv(self._m))
+    def to_3x3(self): return Matrix(self._m[:3, :3])
+
+    def to_4x4(self):
+        m = np.identity(4)
+        n = min(len(self._m), 4)
+        m[:n, :n] = self._m[:n, :n]
+        return Matrix(m)
+
+
+class Euler:
+    """XYZ Euler angles"""
+
+    def __init__(self, angles=(0.0, 0.0, 0.0), order='XYZ'):
+        self.x, self.y, self.z = (float(a) for a in angles)
+        self.order = order
+
+    def __iter__(self): return iter((self.x, self.y, self.z))
+    def __getitem__(self, i): return (self.x, self.y, self.z)[i]
+    def __repr__(self): return f"Euler({(self.x, self.y, self.z)})"
+    def copy(self): return Euler(tuple(self))
+
+    def to_matrix(self):
+        rx = Matrix.Rotation(self.x, 3, 'X')
+        ry = Matrix.Rotation(self.y, 3, 'Y')
+        rz = Matrix.Rotation(self.z, 3, 'Z')
+        return rz @ ry @ rx
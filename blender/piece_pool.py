@@ -0,0 +1,32 @@
+"""
+Piece Pool
+==========
+chess-set.blend has the 32 pieces of the starting position, so a promotion
+(a third knight, a second queen) used to be skipped. Extra pieces are linked
+duplicates of an existing piece of the same type (like Alt+D): a new object
+that shares the mesh and materials, so each one costs an object, not a copy
+of the geometry. The callers keep the duplicates in their piece maps, hidden
+when unused, so a worker creates each one once and reuses it for every later job.
+"""
+
+import bpy
+
+def link_duplicate(obj):
+    """New object sharing obj's mesh/material data, linked into the same collections"""
+    dup = obj.copy()  # Object.copy() shares obj.data
+    dup.animation_data_clear()
+    for collection in obj.users_collection or [bpy.context.scene.collection]:
+        collection.objects.link(dup)
+    print(f"  + linked duplicate {dup.name} of {obj.name}")
+    return dup
+
+def pool_needs(boards):
+    """Largest count of each piece letter on any single board ({square: letter} dicts)"""
+    needs = {}
+    for board in boards:
+        counts = {}
+        for ptype in board.values():
+            counts[ptype] = counts.get(ptype, 0) + 1
+        for ptype, n in counts.items():
+            needs[ptype] = max(needs.get(ptype, 0), n)
+    return needs
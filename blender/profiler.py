@@ -0,0 +1,102 @@
+"""
+Render Stage Profiler
+=====================
+Per-stage wall time of the render scripts, one JSON line per job (--profile PATH):
+
+  {"job": "synthetic_0001.png", "stages": {"apply_fen": 0.004, "sync": 0.21, "sampling": 3.9,
+   "denoise": 0.35, "write": 0.05, "finalize": 0.02, "geometry": 0.001}, "total": 4.54}
+
+The setup line ("job": "setup") has "startup" (process start to script start,
+which is mostly Blender launch + .blend load), "detect_pieces" and the scene setup.
+Inside bpy.ops.render.render the split comes from the render handlers:
+  sync      call -> first "Sample" status (depsgraph/BVH/scene sync, kernel load)
+  sampling  -> first "Denois" status (or the end of the render without a denoiser)
+  denoise   -> render_post
+  write     render_post -> the call returns (image save)
+"""
+
+import os
+import json
+import time
+from contextlib import contextmanager
+
+def process_age():
+    """Seconds since this process started, None where /proc is not available"""
+    try:
+        with open("/proc/self/stat", 'r') as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime", 'r') as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class StageProfiler:
+    """Accumulates stage times for the current job; a profiler without a path only times"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.stages = {}
+        self.marks = {}
+        self.handlers_installed = False
+
+    def add(self, name, seconds):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - start)
+
+    def on_stats(self, *args):
+        stats = str(args[-1]) if args else ""
+        now = time.perf_counter()
+        if "Sample" in stats:
+            self.marks.setdefault('sampling', now)
+        if "Denois" in stats:
+            self.marks.setdefault('denoise', now)
+
+    def on_post(self, *args):
+        self.marks.setdefault('post', time.perf_counter())
+
+    def install_handlers(self):
+        import bpy
+        bpy.app.handlers.render_stats.append(self.on_stats)
+        bpy.app.handlers.render_post.append(self.on_post)
+        self.handlers_installed = True
+
+    def render(self, **kwargs):
+        """bpy.ops.render.render(**kwargs), split into sync/sampling/denoise/write"""
+        import bpy
+        if not self.handlers_installed:
+            self.install_handlers()
+        self.marks = {}
+        start = time.perf_counter()
+        bpy.ops.render.render(**kwargs)
+        end = time.perf_counter()
+
+        post = self.marks.get('post', end)
+        sampling = min(self.marks.get('sampling', start), post)
+        denoise = min(self.marks.get('denoise', post), post)
+        self.add('sync', sampling - start)
+        self.add('sampling', denoise - sampling)
+        self.add('denoise', post - denoise)
+        self.add('write', end - post)
+
+    def flush_job(self, job, **extra):
+        """Write the stages of the finished job and start a new one"""
+        if self.path:
+            record = {'job': job, 'stages': {k: round(v, 6) for k, v in self.stages.items()},
+                      'total': round(sum(self.stages.values()), 6)}
+            record.update(extra)
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(record) + "\n")
+        self.stages = {}
+
+def add_profile_args(parser):
+    parser.add_argument('--profile', type=str, default=None,
+                        help="Append per-stage timings (JSON line per job) to this file")
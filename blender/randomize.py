@@ -0,0 +1,214 @@
+"""
+Domain Randomization
+====================
+Renders K variants of a position inside one Blender session: after a single
+apply_fen, each variant re-samples sun angle/energy, HDRI, board and piece
+tint and camera height/tilt/yaw from a seeded spec, and the parameters are
+recorded per image (randomization.jsonl next to the images).
+
+Spec (JSON, every key optional, [min, max] ranges):
+  {
+    "sun_tilt_deg": [0, 35], "sun_azimuth_deg": [0, 360], "sun_energy": [2.0, 5.0],
+    "hdris": ["hdri/room.exr", ...], "hdri_strength": [0.3, 1.2],
+    "board_tint": 0.1, "piece_tint": 0.1,
+    "camera_height_scale": [0.9, 1.1], "camera_tilt_deg": [0, 15], "camera_yaw_deg": [-5, 5]
+  }
+Tints are the maximum relative change per RGB channel. Each image gets its own
+random.Random seeded from (seed, image name, variant), so any single variant
+can be reproduced without re-rendering the rest.
+"""
+
+import bpy
+import os
+import json
+import math
+import random
+from mathutils import Matrix, Vector
+
+from chess_sets import DEFAULT_SET
+
+DEFAULT_SPEC = {
+    'sun_tilt_deg': [0, 35],
+    'sun_azimuth_deg': [0, 360],
+    'sun_energy': [2.0, 5.0],
+    'hdris': [],
+    'hdri_strength': [0.3, 1.2],
+    'board_tint': 0.1,
+    'piece_tint': 0.1,
+    'camera_height_scale': [0.9, 1.1],
+    'camera_tilt_deg': [0, 15],
+    'camera_yaw_deg': [-5, 5],
+}
+
+TINT_NODE = "random_tint"
+HDRI_NODE = "random_hdri"
+
+def load_spec(path=None):
+    spec = dict(DEFAULT_SPEC)
+    if path:
+        with open(path, 'r') as f:
+            spec.update(json.load(f))
+    return spec
+
+def sample_params(spec, rng):
+    """One variant's parameters, plain floats/strings so they can go to JSON"""
+    def uniform(key):
+        low, high = spec[key]
+        return rng.uniform(low, high)
+
+    def tint(key):
+        return [1.0 + rng.uniform(-spec[key], spec[key]) for _ in range(3)]
+
+    params = {
+        'sun_tilt_deg': uniform('sun_tilt_deg'),
+        'sun_azimuth_deg': uniform('sun_azimuth_deg'),
+        'sun_energy': uniform('sun_energy'),
+        'hdri': rng.choice(spec['hdris']) if spec['hdris'] else None,
+        'hdri_strength': uniform('hdri_strength'),
+        'board_tint': tint('board_tint'),
+        'piece_tint': tint('piece_tint'),
+        'camera_height_scale': uniform('camera_height_scale'),
+        'camera_tilt_deg': uniform('camera_tilt_deg'),
+        'camera_yaw_deg': uniform('camera_yaw_deg'),
+    }
+    return params
+
+def variant_rng(seed, image_name, variant):
+    return random.Random(f"{seed}:{image_name}:{variant}")
+
+def add_tint_node(mat):
+    """Multiply the material's base color by a tint color we can change per variant"""
+    nodes, links = mat.node_tree.nodes, mat.node_tree.links
+    if TINT_NODE in nodes:
+        return nodes[TINT_NODE]
+    bsdf = next((n for n in nodes if n.type == 'BSDF_PRINCIPLED'), None)
+    if bsdf is None:
+        return None
+
+    tint = nodes.new('ShaderNodeMixRGB')
+    tint.name = TINT_NODE
+    tint.blend_type = 'MULTIPLY'
+    tint.inputs['Fac'].default_value = 1.0
+    tint.inputs['Color2'].default_value = (1, 1, 1, 1)
+
+    base = bsdf.inputs['Base Color']
+    if base.is_linked:
+        links.new(base.links[0].from_socket, tint.inputs['Color1'])
+    else:
+        tint.inputs['Color1'].default_value = base.default_value[:]
+    links.new(tint.outputs['Color'], base)
+    return tint
+
+def object_materials(objects):
+    mats = []
+    for obj in objects:
+        for slot in obj.material_slots:
+            if slot.material and slot.material.use_nodes and slot.material not in mats:
+                mats.append(slot.material)
+    return mats
+
+def set_tint_targets(state, piece_map, boards=None):
+    """Point the board/piece tints at a (new) chess set; boards default to the scene's own board"""
+    if boards is None:
+        boards = [bpy.data.objects[name] for name in DEFAULT_SET['board_objects'] if name in bpy.data.objects]
+    pieces = [pdata['obj'] for pdata in piece_map.values()]
+    state['board_tints'] = [n for n in map(add_tint_node, object_materials(boards)) if n]
+    state['piece_tints'] = [n for n in map(add_tint_node, object_materials(pieces)) if n]
+
+def setup_randomizer(piece_map, board_center, boards=None):
+    """
+    Prepare the scene once: tint nodes on board/piece materials, an environment
+    texture on the world, and the base camera/sun to jitter around.
+    """
+    scene = bpy.context.scene
+    if scene.world is None:
+        scene.world = bpy.data.worlds.new("World")
+    scene.world.use_nodes = True
+
+    sun = next((o for o in scene.objects if o.type == 'LIGHT' and o.data.type == 'SUN'), None)
+    background = next((n for n in scene.world.node_tree.nodes if n.type == 'BACKGROUND'), None)
+    state = {
+        'sun': sun,
+        'base_sun': (sun.rotation_euler.copy(), sun.data.energy) if sun is not None else None,
+        'base_background': None,
+        'camera': scene.camera,
+        'base_camera': scene.camera.matrix_world.copy(),
+        'center': Vector(board_center),
+        'hdri_images': {},
+    }
+    if background is not None:
+        color = background.inputs['Color']
+        state['base_background'] = (color.links[0].from_socket if color.is_linked else None,
+                                    color.default_value[:], background.inputs['Strength'].default_value)
+    set_tint_targets(state, piece_map, boards)
+    return state
+
+def set_hdri(state, path, strength):
+    nodes = bpy.context.scene.world.node_tree.nodes
+    links = bpy.context.scene.world.node_tree.links
+    background = next((n for n in nodes if n.type == 'BACKGROUND'), None)
+    if background is None:
+        return
+
+    env = nodes.get(HDRI_NODE)
+    if path is None:
+        if env is not None and env.outputs['Color'].is_linked:
+            links.remove(env.outputs['Color'].links[0])
+        return
+    if env is None:
+        env = nodes.new('ShaderNodeTexEnvironment')
+        env.name = HDRI_NODE
+    if path not in state['hdri_images']:
+        state['hdri_images'][path] = bpy.data.images.load(os.path.abspath(path), check_existing=True)
+    env.image = state['hdri_images'][path]
+    links.new(env.outputs['Color'], background.inputs['Color'])
+    background.inputs['Strength'].default_value = strength
+
+def apply_params(state, params):
+    if state['sun'] is not None:
+        state['sun'].rotation_euler = (math.radians(params['sun_tilt_deg']), 0,
+                                       math.radians(params['sun_azimuth_deg']))
+        state['sun'].data.energy = params['sun_energy']
+
+    set_hdri(state, params['hdri'], params['hdri_strength'])
+
+    for node in state['board_tints']:
+        node.inputs['Color2'].default_value = (*params['board_tint'], 1)
+    for node in state['piece_tints']:
+        node.inputs['Color2'].default_value = (*params['piece_tint'], 1)
+
+    # Camera: scale the distance to the board center, tilt it toward the white
+    # side, then yaw the whole rig around the vertical axis through the center
+    center = state['center']
+    base = state['base_camera']
+    distance = (base.translation - center).length * params['camera_height_scale']
+    tilt = math.radians(params['camera_tilt_deg'])
+    location = center + Vector((0, -distance * math.sin(tilt), distance * math.cos(tilt)))
+    look = (center - location).to_track_quat("-Z", "Y").to_matrix().to_4x4()
+    rig = Matrix.Translation(location) @ look
+    yaw = Matrix.Translation(center) @ Matrix.Rotation(math.radians(params['camera_yaw_deg']), 4, 'Z') @ Matrix.Translation(-center)
+    state['camera'].matrix_world = yaw @ rig
+
+def restore(state):
+    """Undo apply_params: base camera, sun and world background, neutral tints"""
+    state['camera'].matrix_world = state['base_camera']
+    if state['sun'] is not None:
+        state['sun'].rotation_euler, state['sun'].data.energy = state['base_sun']
+
+    set_hdri(state, None, None)
+    nodes = bpy.context.scene.world.node_tree.nodes
+    background = next((n for n in nodes if n.type == 'BACKGROUND'), None)
+    if background is not None and state['base_background'] is not None:
+        socket, color, strength = state['base_background']
+        if socket is not None:
+            bpy.context.scene.world.node_tree.links.new(socket, background.inputs['Color'])
+        background.inputs['Color'].default_value = color
+        background.inputs['Strength'].default_value = strength
+
+    for node in state['board_tints'] + state['piece_tints']:
+        node.inputs['Color2'].default_value = (1, 1, 1, 1)
+
+def record(log_path, image_path, fen, seed, variant, params):
+    with open(log_path, 'a') as f:
+        f.write(json.dumps({'image': os.path.basename(image_path), 'fen': fen, 'seed': seed,
+                            'variant': variant, 'params': params}) + "\n")
@@ -0,0 +1,115 @@
+"""
+Sprite Atlas Renderer
+=====================
+One-time job for scripts/sprite_compositor.py: renders, for the fixed
+generate_cyclegan_data.py camera,
+  plate.png                   the empty board (opaque)
+  sprites/<w|b><P>_<sq>.png   every piece type x color on every square, alone, as
+                              RGBA with the board as a shadow catcher (so the
+                              piece's shadow is kept in the alpha channel)
+  atlas.json                  resolution, camera matrices and the camera depth
+                              of each square (for back-to-front compositing)
+Square index is rank * 8 + file (a1 = 0), like the geometry sidecar.
+
+Existing sprites are skipped, so an interrupted run can simply be restarted.
+
+Usage:
+  blender blender/chess-set.blend --background --python blender/render_atlas.py -- \
+      --output_dir renders/atlas --resolution 512 --samples 64 [--auto_frame]
+"""
+
+import bpy
+import sys
+import os
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import generate_cyclegan_data as gen
+from sampling import add_sampling_args, apply_sampling
+from render_metadata import camera_intrinsics, camera_extrinsics
+from board_geometry import PIECE_TYPES, get_square_center, sprite_name
+from chess_sets import DEFAULT_SET
+
+def set_shadow_catcher(enabled):
+    """The board only receives shadows (alpha) instead of being drawn"""
+    scene = bpy.context.scene
+    scene.render.film_transparent = enabled
+    scene.render.image_settings.color_mode = 'RGBA' if enabled else 'RGB'
+    for name in DEFAULT_SET['board_objects']:
+        if name in bpy.data.objects:
+            bpy.data.objects[name].is_shadow_catcher = enabled
+
+def main():
+    start_time = time.time()
+    argv = sys.argv
+    if "--" in argv: argv = argv[argv.index("--") + 1:]
+    else: argv = []
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--output_dir', type=str, default="renders/atlas")
+    parser.add_argument('--resolution', type=int, default=gen.RES)
+    parser.add_argument('--samples', type=int, default=gen.SAMPLES)
+    parser.add_argument('--auto_frame', action='store_true')
+    parser.add_argument('--frame_margin', type=float, default=gen.FRAME_MARGIN)
+    parser.add_argument('--types', type=str, default=PIECE_TYPES, help="Piece letters to render (default: all 12)")
+    add_sampling_args(parser)
+    args = parser.parse_args(argv)
+
+    gen.RES = args.resolution
+    gen.SAMPLES = args.samples
+    sprite_dir = os.path.join(args.output_dir, "sprites")
+    os.makedirs(sprite_dir, exist_ok=True)
+
+    scene = bpy.context.scene
+    piece_map = gen.detect_pieces()
+    gen.setup_camera(args.auto_frame, piece_map, args.frame_margin)
+    apply_sampling(scene, args.samples, args.noise_threshold, args.time_limit)
+    scene.render.image_settings.file_format = 'PNG'
+
+    # One representative object per piece type
+    models = {}
+    for pdata in piece_map.values():
+        gen.hide_piece(pdata)
+        models.setdefault(pdata['type'], pdata)
+    missing = [t for t in args.types if t not in models]
+    if missing:
+        print(f"WARNING: no object found for {''.join(missing)}, skipping")
+
+    # 1. Empty board
+    cam = scene.camera
+    K = camera_intrinsics(cam.data, args.resolution, args.resolution)
+    RT = camera_extrinsics(cam)
+    centers = np.array([get_square_center(i % 8, i // 8) for i in range(64)])
+    depth = (centers @ RT[:, :3].T + RT[:, 3])[:, 2]
+    with open(os.path.join(args.output_dir, "atlas.json"), 'w') as f:
+        json.dump({'resolution': args.resolution, 'samples': args.samples,
+                   'K': K.tolist(), 'RT': RT.tolist(), 'depth': depth.tolist()}, f)
+
+    set_shadow_catcher(False)
+    gen.render_still(os.path.join(args.output_dir, "plate.png"))
+
+    # 2. Every piece on every square
+    set_shadow_catcher(True)
+    rendered = 0
+    for ptype in args.types:
+        if ptype not in models:
+            continue
+        pdata = models[ptype]
+        for square in range(64):
+            fpath = os.path.join(sprite_dir, sprite_name(ptype, square))
+            if os.path.exists(fpath):
+                continue
+            gen.place_piece(pdata, (square % 8, square // 8))
+            gen.render_still(fpath)
+            rendered += 1
+        gen.hide_piece(pdata)
+        print(f"Rendered {ptype} on all squares ({time.time() - start_time:.0f}s)")
+
+    print(f"Atlas done: {rendered} new sprites in {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Render Geometry Sidecar
+=======================
+Camera matrices, projected square quads and the placed pieces for every
+rendered image, so cropping / per-square evaluation / occlusion masks never
+have to detect the board in an image that Blender already fully describes.
+
+Rows are collected per job and written as one columnar .npz file next to the
+images (geometry.npz for a CSV run, geometry_<pid>.npz per worker):
+
+  image   (N,)          file name of the image
+  K       (N, 3, 3)     intrinsics in output pixels
+  RT      (N, 3, 4)     world -> camera (OpenCV convention: x right, y down, z forward)
+  quads   (N, 64, 4, 2) pixel corners of each square, index rank * 8 + file (a1 = 0)
+  board   (N, 64)       ASCII piece letter on each square (0 = empty), as placed in the scene
+  size    (N, 2)        image width, height
+
+Only numpy is needed (no bpy), load_geometry works outside Blender.
+"""
+
+import os
+import glob
+
+import numpy as np
+
+FLUSH_EVERY = 200  # Rows between rewrites of the .npz, so a crash loses little
+
+# Blender cameras look down -Z with +Y up; OpenCV looks down +Z with +Y down
+BLENDER_TO_CV = np.diag([1.0, -1.0, -1.0])
+
+def camera_intrinsics(cam_data, width, height):
+    """K in pixels for an output image of width x height (follows Blender's sensor fit rules)"""
+    if cam_data.sensor_fit == 'VERTICAL':
+        sensor, size_ref = cam_data.sensor_height, height
+    elif cam_data.sensor_fit == 'HORIZONTAL':
+        sensor, size_ref = cam_data.sensor_width, width
+    else:
+        sensor, size_ref = cam_data.sensor_width, max(width, height)
+    f_px = cam_data.lens / sensor * size_ref
+    cx = width / 2 - cam_data.shift_x * size_ref
+    cy = height / 2 + cam_data.shift_y * size_ref
+    return np.array([[f_px, 0, cx], [0, f_px, cy], [0, 0, 1]], dtype=np.float64)
+
+def camera_extrinsics(cam):
+    """[R|T] mapping world points to OpenCV camera coordinates"""
+    world = np.array(cam.matrix_world, dtype=np.float64)
+    rot = world[:3, :3] / np.linalg.norm(world[:3, :3], axis=0)  # Drop object scale
+    r_world2cam = BLENDER_TO_CV @ rot.T
+    t = -r_world2cam @ world[:3, 3]
+    return np.hstack([r_world2cam, t[:, None]])
+
+def project(K, RT, points):
+    """(..., 3) world points -> (..., 2) pixel coordinates (origin top-left)"""
+    pts = np.asarray(points, dtype=np.float64)
+    cam = pts @ RT[:, :3].T + RT[:, 3]
+    pix = cam @ K.T
+    return pix[..., :2] / pix[..., 2:3]
+
+def square_corners(centers, square_size):
+    """(64, 3) square centers -> (64, 4, 3) corners, counter-clockwise seen from above"""
+    centers = np.asarray(centers, dtype=np.float64)
+    half = square_size / 2
+    offsets = np.array([[-half, -half, 0], [half, -half, 0], [half, half, 0], [-half, half, 0]])
+    return centers[:, None, :] + offsets[None, :, :]
+
+def board_codes(placed):
+    """{(file_idx, rank_idx): letter} -> (64,) uint8"""
+    board = np.zeros(64, dtype=np.uint8)
+    for (f_idx, r_idx), ptype in placed.items():
+        board[r_idx * 8 + f_idx] = ord(ptype)
+    return board
+
+
+class GeometryWriter:
+    """Collects one row per image and writes them as a single columnar .npz"""
+
+    def __init__(self, path, flush_every=FLUSH_EVERY):
+        self.path = path
+        self.flush_every = flush_every
+        self.rows = {'image': [], 'K': [], 'RT': [], 'quads': [], 'board': [], 'size': []}
+        self.unflushed = 0
+
+    def add(self, image_path, K, RT, corners, placed, width, height):
+        self.rows['image'].append(os.path.basename(image_path))
+        self.rows['K'].append(K)
+        self.rows['RT'].append(RT)
+        self.rows['quads'].append(project(K, RT, corners).astype(np.float32))
+        self.rows['board'].append(board_codes(placed))
+        self.rows['size'].append((width, height))
+        self.unflushed += 1
+        if self.unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        if not self.rows['image']:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(
+                f,
+                image=np.array(self.rows['image']),
+                K=np.array(self.rows['K'], dtype=np.float32),
+                RT=np.array(self.rows['RT'], dtype=np.float32),
+                quads=np.array(self.rows['quads'], dtype=np.float32),
+                board=np.array(self.rows['board'], dtype=np.uint8),
+                size=np.array(self.rows['size'], dtype=np.int32),
+            )
+        os.replace(tmp, self.path)
+        self.unflushed = 0
+
+def load_geometry(directory):
+    """Concatenate every geometry*.npz in a directory into one dict of arrays"""
+    parts = [np.load(p) for p in sorted(glob.glob(os.path.join(directory, "geometry*.npz")))]
+    if not parts:
+        return None
+    return {key: np.concatenate([p[key] for p in parts]) for key in parts[0].files}
@@ -0,0 +1,61 @@
+"""
+Render Output Stage
+===================
+Writes the training-ready image from inside the Blender worker: the full-size
+lossless render is scaled to the training size and saved as JPEG/WebP in the
+same process, right after rendering. This replaces the separate
+scripts/resize_images.py pass over trainA.
+
+The full-size PNG ("master") is removed afterwards unless a master directory
+is given.
+
+Every image is written to a .partial file next to its final name and renamed
+into place once complete, so a crash never leaves a truncated image behind
+that a resume would take for a finished one.
+"""
+
+import bpy
+import os
+
+FILE_FORMATS = {'.png': 'PNG', '.jpg': 'JPEG', '.jpeg': 'JPEG', '.webp': 'WEBP'}
+
+def needs_finalize(final_path, output_size):
+    """False when the render itself is already the final file"""
+    return output_size is not None or os.path.splitext(final_path)[1].lower() != '.png'
+
+def partial_path(final_path):
+    """Where an image is written before it is renamed to final_path"""
+    stem, ext = os.path.splitext(os.path.basename(final_path))
+    return os.path.join(os.path.dirname(final_path), f".{stem}.partial{ext}")
+
+def master_path(final_path, master_dir=None):
+    """Where the full-size PNG is rendered before the final image is written"""
+    name = os.path.splitext(os.path.basename(final_path))[0] + ".png"
+    if master_dir:
+        os.makedirs(master_dir, exist_ok=True)
+        return os.path.join(master_dir, name)
+    return os.path.join(os.path.dirname(final_path), ".master_" + name)
+
+def finalize(master, final_path, output_size=None, quality=90, keep_master=False):
+    """Scale the master render to output_size x output_size and save it in the final format"""
+    ext = os.path.splitext(final_path)[1].lower()
+    if ext not in FILE_FORMATS:
+        raise ValueError(f"Unsupported output format: {final_path}")
+
+    img = bpy.data.images.load(os.path.abspath(master), check_existing=False)
+    if output_size and tuple(img.size) != (output_size, output_size):
+        img.scale(output_size, output_size)
+    img.file_format = FILE_FORMATS[ext]
+    img.save(filepath=os.path.abspath(final_path), quality=quality)
+    bpy.data.images.remove(img)
+
+    if not keep_master:
+        os.remove(master)
+    return final_path
+
+def add_output_args(parser):
+    parser.add_argument('--output_size', type=int, default=None,
+                        help="Write the final image at this size (square), e.g. 256 for training")
+    parser.add_argument('--quality', type=int, default=90, help="JPEG/WebP quality of the final image")
+    parser.add_argument('--master_dir', type=str, default=None,
+                        help="Keep the full-size lossless PNG renders in this directory")
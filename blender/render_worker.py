@@ -0,0 +1,59 @@
+"""
+Render Worker Loop
+==================
+Shared job loop for the --worker mode of the Blender scripts.
+
+The .blend file, piece detection and camera/light setup happen once; after that
+the worker reads FEN jobs as JSON lines from stdin and streams one result line
+per job back on stdout. Blender prints its own log lines to stdout as well, so
+every result line starts with RESULT_PREFIX.
+
+Job line:    {"id": "...", "fen": "...", "output": "renders/x.png", ...}
+Result line: @@RESULT {"id": "...", "status": "ok", "outputs": [...], "seconds": 1.23}
+
+An empty stdin (EOF) or a line containing just "quit" stops the worker.
+"""
+
+import sys
+import json
+import time
+
+RESULT_PREFIX = "@@RESULT "
+
+def report(result):
+    """Write one result line and flush so the client sees it immediately"""
+    sys.stdout.write(RESULT_PREFIX + json.dumps(result) + "\n")
+    sys.stdout.flush()
+
+def read_jobs(stream=None):
+    """Yield job dicts from a stream of JSON lines"""
+    stream = stream or sys.stdin
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        if line == "quit":
+            break
+        try:
+            yield json.loads(line)
+        except ValueError:
+            report({'status': 'error', 'error': f"Bad job line: {line[:80]}"})
+
+def serve(render_job, setup_seconds=0.0):
+    """
+    Run jobs until stdin closes.
+    render_job(job) must return the list of written output paths.
+    """
+    report({'status': 'ready', 'setup_seconds': round(setup_seconds, 3)})
+
+    for job in read_jobs():
+        start = time.time()
+        result = {'id': job.get('id')}
+        try:
+            result['outputs'] = render_job(job)
+            result['status'] = 'ok'
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+        result['seconds'] = round(time.time() - start, 3)
+        report(result)
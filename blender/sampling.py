@@ -0,0 +1,25 @@
+"""
+Cycles Sample Budget
+====================
+Adaptive sampling options shared by the render scripts. Instead of a fixed
+sample count per image, Cycles stops a pixel once its noise is below the
+threshold and stops the image at the time limit; --samples becomes the cap.
+Use benchmark_samples.py to pick the cheapest budget that still matches a
+high-sample reference.
+"""
+
+def add_sampling_args(parser):
+    parser.add_argument('--noise_threshold', type=float, default=None,
+                        help="Adaptive sampling noise threshold (e.g. 0.01-0.1), --samples becomes the maximum")
+    parser.add_argument('--time_limit', type=float, default=None,
+                        help="Maximum render seconds per image (Cycles time limit)")
+
+def apply_sampling(scene, samples, noise_threshold=None, time_limit=None):
+    """Leaves the .blend file's adaptive sampling setting alone when no threshold is given"""
+    scene.cycles.samples = samples
+    if noise_threshold is not None:
+        scene.cycles.use_adaptive_sampling = noise_threshold > 0
+        if noise_threshold > 0:
+            scene.cycles.adaptive_threshold = noise_threshold
+            scene.cycles.adaptive_min_samples = 0  # Automatic
+    scene.cycles.time_limit = time_limit or 0.0
@@ -0,0 +1,172 @@
+"""
+FEN -> ControlNet conditioning maps, without Blender or Canny
+Rasterizes positions straight from the calibrated board geometry (or the
+camera matrices exported with each render in geometry.npz):
+
+  segmentation  (B, H, W) uint8  0 = off the board, 1 = empty square, 2-13 = piece class (PIECE_CLASSES)
+  footprints    (B, H, W) bool   disc under every piece on the board plane
+  grid          (H, W)    bool   board grid lines (the same for every position)
+
+The pixel -> square lookup is computed once per camera, after that a batch is
+one table lookup, so thousands of positions per second come straight from a CSV.
+"""
+
+import os
+import sys
+import csv
+import argparse
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blender"))
+from board_geometry import (BOARD_MIN_X, BOARD_MAX_X, BOARD_MIN_Y, BOARD_MAX_Y, BOARD_Z, SQUARE_SIZE,
+                            get_square_center, parse_fen, fit_camera_height)
+from render_metadata import BLENDER_TO_CV, project, square_corners, load_geometry
+
+PIECE_CLASSES = "PNBRQKpnbrqk"
+FOOTPRINT_RADIUS = 0.35  # Fraction of a square
+
+# Same camera as generate_cyclegan_data.py
+CAMERA_HEIGHT = 35.0
+LENS = 50
+SENSOR_WIDTH = 36
+
+# Colors for the segmentation PNG (index = class)
+PALETTE = np.array([
+    [0, 0, 0], [128, 128, 128],
+    [255, 255, 255], [255, 220, 180], [255, 180, 120], [255, 140, 60], [255, 100, 0], [255, 0, 0],
+    [0, 255, 255], [0, 200, 255], [0, 150, 255], [0, 100, 255], [0, 50, 255], [0, 0, 255],
+], dtype=np.uint8)
+
+def default_camera(size, auto_frame=False, margin=0.04):
+    """K and RT of the top-down render camera for a size x size image"""
+    center = np.array([(BOARD_MIN_X + BOARD_MAX_X) / 2, (BOARD_MIN_Y + BOARD_MAX_Y) / 2, CAMERA_HEIGHT])
+    if auto_frame:
+        half_extent = max(BOARD_MAX_X - BOARD_MIN_X, BOARD_MAX_Y - BOARD_MIN_Y) / 2
+        center[2] = BOARD_Z + fit_camera_height(half_extent, LENS, SENSOR_WIDTH, margin)
+    f_px = LENS / SENSOR_WIDTH * size
+    K = np.array([[f_px, 0, size / 2], [0, f_px, size / 2], [0, 0, 1]])
+    RT = np.hstack([BLENDER_TO_CV, (-BLENDER_TO_CV @ center)[:, None]])
+    return K, RT
+
+def camera_from_geometry(directory, image_name):
+    """K, RT and size of one rendered image from its geometry sidecar"""
+    geometry = load_geometry(directory)
+    if geometry is None:
+        raise FileNotFoundError(f"No geometry*.npz in {directory}")
+    idx = np.nonzero(geometry['image'] == image_name)[0]
+    if len(idx) == 0:
+        raise KeyError(f"{image_name} is not in the geometry of {directory}")
+    i = idx[0]
+    return geometry['K'][i].astype(np.float64), geometry['RT'][i].astype(np.float64), tuple(geometry['size'][i])
+
+def board_classes(fens):
+    """(B, 64) uint8 class per square (1 = empty, 2-13 = piece), index rank * 8 + file"""
+    classes = np.ones((len(fens), 64), dtype=np.uint8)
+    for i, fen in enumerate(fens):
+        for (f_idx, r_idx), ptype in parse_fen(fen).items():
+            classes[i, r_idx * 8 + f_idx] = 2 + PIECE_CLASSES.index(ptype)
+    return classes
+
+def inside_quads(quads, width, height):
+    """(H, W) int16 index of the convex quad each pixel center falls in, 64 where none"""
+    ys, xs = np.mgrid[0:height, 0:width].astype(np.float32) + 0.5
+    lookup = np.full((height, width), 64, dtype=np.int16)
+    for idx, quad in enumerate(quads):
+        inside = np.ones((height, width), dtype=bool)
+        (ax, ay), (bx, by) = quad[1] - quad[0], quad[2] - quad[1]
+        sign = np.sign(ax * by - ay * bx)  # Winding of the projected polygon
+        for a, b in zip(quad, np.roll(quad, -1, axis=0)):
+            inside &= sign * ((b[0] - a[0]) * (ys - a[1]) - (b[1] - a[1]) * (xs - a[0])) >= 0
+        lookup[inside] = idx
+    return lookup
+
+
+class Rasterizer:
+    """Per-camera lookup tables; call maps() with batches of FENs"""
+
+    def __init__(self, K, RT, width, height=None, footprint_radius=FOOTPRINT_RADIUS, grid_width=2):
+        self.width, self.height = width, height or width
+        centers = np.array([get_square_center(i % 8, i // 8) for i in range(64)])
+        self.quads = project(K, RT, square_corners(centers, SQUARE_SIZE))
+        self.square_of_pixel = inside_quads(self.quads, self.width, self.height)
+
+        # Footprint discs as 32-gons on the board plane
+        angles = np.linspace(0, 2 * np.pi, 32, endpoint=False)
+        r = footprint_radius * SQUARE_SIZE
+        ring = np.stack([np.cos(angles) * r, np.sin(angles) * r, np.zeros_like(angles)], axis=1)
+        discs = project(K, RT, centers[:, None, :] + ring[None, :, :])
+        self.footprint_of_pixel = inside_quads(discs, self.width, self.height)
+
+        # Grid corner (f, r) is the lower-left corner of square (f, r), r/f = 8 closes the board
+        corners = np.array([[BOARD_MIN_X + f * SQUARE_SIZE, BOARD_MIN_Y + r * SQUARE_SIZE, BOARD_Z]
+                            for r in range(9) for f in range(9)]).reshape(9, 9, 3)
+        points = project(K, RT, corners)
+        grid = Image.new('L', (self.width, self.height), 0)
+        draw = ImageDraw.Draw(grid)
+        for i in range(9):
+            draw.line([tuple(points[i, 0]), tuple(points[i, 8])], fill=255, width=grid_width)
+            draw.line([tuple(points[0, i]), tuple(points[8, i])], fill=255, width=grid_width)
+        self.grid = np.asarray(grid) > 0
+
+    def maps(self, fens):
+        classes = board_classes(fens)
+        # Column 64 is "outside every square": 0 for segmentation, False for footprints
+        table = np.concatenate([classes, np.zeros((len(fens), 1), dtype=np.uint8)], axis=1)
+        return {'segmentation': table[:, self.square_of_pixel],
+                'footprints': (table >= 2)[:, self.footprint_of_pixel],
+                'grid': self.grid}
+
+def control_image(segmentation, grid):
+    """RGB conditioning image: class colors with the grid lines drawn on top"""
+    rgb = PALETTE[segmentation]
+    rgb[grid] = (64, 255, 64)
+    return Image.fromarray(rgb)
+
+def main():
+    parser = argparse.ArgumentParser(description="Rasterize FENs into ControlNet conditioning maps")
+    parser.add_argument('--csv', type=str, required=True)
+    parser.add_argument('--output_dir', type=str, default="controlNet/conditioning")
+    parser.add_argument('--size', type=int, default=512)
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--batch_size', type=int, default=256)
+    parser.add_argument('--auto_frame', action='store_true', help="Match renders made with --auto_frame")
+    parser.add_argument('--geometry', type=str, nargs=2, metavar=('DIR', 'IMAGE'), default=None,
+                        help="Use the camera of this rendered image instead of the default one")
+    parser.add_argument('--npz', action='store_true', help="Write one maps.npz instead of PNGs")
+    args = parser.parse_args()
+
+    if args.geometry:
+        K, RT, (width, height) = camera_from_geometry(*args.geometry)
+    else:
+        K, RT = default_camera(args.size, args.auto_frame)
+        width = height = args.size
+    rasterizer = Rasterizer(K, RT, width, height)
+
+    with open(args.csv, 'r') as f:
+        fens = [row['fen'] for row in csv.DictReader(f)]
+    if args.limit:
+        fens = fens[:args.limit]
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    segmentations, footprints = [], []
+    for start in range(0, len(fens), args.batch_size):
+        maps = rasterizer.maps(fens[start:start + args.batch_size])
+        if args.npz:
+            segmentations.append(maps['segmentation'])
+            footprints.append(maps['footprints'])
+            continue
+        for i, (seg, foot) in enumerate(zip(maps['segmentation'], maps['footprints'])):
+            name = f"position_{start + i:05d}"
+            control_image(seg, rasterizer.grid).save(os.path.join(args.output_dir, f"{name}_control.png"))
+            Image.fromarray(foot.astype(np.uint8) * 255).save(os.path.join(args.output_dir, f"{name}_footprint.png"))
+
+    if args.npz and fens:
+        np.savez_compressed(os.path.join(args.output_dir, "maps.npz"), fen=np.array(fens),
+                            segmentation=np.concatenate(segmentations), footprints=np.concatenate(footprints),
+                            grid=rasterizer.grid)
+    print(f"✅ Rasterized {len(fens)} positions to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
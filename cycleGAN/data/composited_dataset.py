@@ -0,0 +1,122 @@
+"""Dataset class that composites transparent renders over real backgrounds at load time.
+
+Domain A are RGBA renders (blender/generate_cyclegan_data.py --transparent). Each time a render is loaded it is
+alpha-blended over a random crop of a real photo, so every epoch sees the board on new backgrounds and nothing
+is written to disk. The crops are decoded once, when the dataset is created, into a pool of --bg_pool_size
+images, so a sample costs one render decode and one alpha blend. Domain B (real images) is loaded as in 'unaligned'.
+
+Compositing happens per sample in __getitem__ on purpose, not on the collated batch: the random crop/flip of
+get_transform must see the composited image (cropping render and background apart would misalign them), the
+blend is a single C call (Image.alpha_composite), and the DataLoader workers already run samples in parallel.
+scripts/composite_backgrounds.py is the batch-vectorized version for writing a fixed composited set.
+
+Example:
+    python train.py --dataroot ./datasets/chess_data --name chess_cyclegan --model cycle_gan \
+        --dataset_mode composited --bg_pool_size 512
+"""
+
+import os
+import random
+from data.base_dataset import BaseDataset, get_transform
+from data.image_folder import make_dataset
+from PIL import Image
+
+
+class CompositedDataset(BaseDataset):
+    """Unaligned dataset whose domain-A images get a random real background every time they are loaded."""
+
+    @staticmethod
+    def modify_commandline_options(parser, is_train):
+        """Add the compositing options.
+
+        Parameters:
+            parser          -- original option parser
+            is_train (bool) -- whether training phase or test phase.
+
+        Returns:
+            the modified parser.
+        """
+        parser.add_argument("--background_dir", type=str, default=None, help="photos the background crops are cut from. Default: [dataroot]/[phase]B")
+        parser.add_argument("--bg_pool_size", type=int, default=512, help="number of background crops kept decoded in memory")
+        parser.add_argument("--bg_min_scale", type=float, default=0.5, help="smallest crop side, as a fraction of the shorter photo side")
+        return parser
+
+    def __init__(self, opt):
+        """Initialize this dataset class and decode the background pool.
+
+        Parameters:
+            opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseDataset.__init__(self, opt)
+        self.dir_A = os.path.join(opt.dataroot, opt.phase + "A")
+        self.dir_B = os.path.join(opt.dataroot, opt.phase + "B")
+        self.A_paths = sorted(make_dataset(self.dir_A, opt.max_dataset_size))
+        self.B_paths = sorted(make_dataset(self.dir_B, opt.max_dataset_size))
+        self.A_size = len(self.A_paths)
+        self.B_size = len(self.B_paths)
+        btoA = self.opt.direction == "BtoA"
+        input_nc = self.opt.output_nc if btoA else self.opt.input_nc
+        output_nc = self.opt.input_nc if btoA else self.opt.output_nc
+        self.transform_A = get_transform(self.opt, grayscale=(input_nc == 1))
+        self.transform_B = get_transform(self.opt, grayscale=(output_nc == 1))
+
+        # Renders share one size, so the crops are cut at that size and need no resize per sample
+        with Image.open(self.A_paths[0]) as img:
+            self.bg_size = img.size
+        self.backgrounds = self.load_backgrounds(opt.background_dir or self.dir_B, opt.bg_pool_size, opt.bg_min_scale)
+
+    def load_backgrounds(self, background_dir, count, min_scale):
+        """Decode `count` random crops of the photos in background_dir, each photo is opened once."""
+        paths = sorted(make_dataset(background_dir))
+        if not paths:
+            raise FileNotFoundError(f"No background images in {background_dir}")
+        random.shuffle(paths)
+        per_photo = -(-count // len(paths))
+        crops = []
+        for path in paths:
+            with Image.open(path) as img:
+                img = img.convert("RGB")
+                w, h = img.size
+                for _ in range(min(per_photo, count - len(crops))):
+                    side = int(min(w, h) * random.uniform(min_scale, 1.0))
+                    x, y = random.randint(0, w - side), random.randint(0, h - side)
+                    crops.append(img.crop((x, y, x + side, y + side)).resize(self.bg_size, Image.BILINEAR).convert("RGBA"))
+            if len(crops) == count:
+                break
+        print(f"Composited dataset: {len(crops)} background crops from {background_dir}")
+        return crops
+
+    def composite(self, A_img):
+        """Alpha-blend an RGBA render over a random background crop."""
+        background = random.choice(self.backgrounds)
+        if background.size != A_img.size:
+            background = background.resize(A_img.size, Image.BILINEAR)
+        return Image.alpha_composite(background, A_img).convert("RGB")
+
+    def __getitem__(self, index):
+        """Return a data point and its metadata information.
+
+        Parameters:
+            index (int)      -- a random integer for data indexing
+
+        Returns a dictionary that contains A, B, A_paths and B_paths
+            A (tensor)       -- an image in the input domain, composited over a random background
+            B (tensor)       -- its corresponding image in the target domain
+            A_paths (str)    -- image paths
+            B_paths (str)    -- image paths
+        """
+        A_path = self.A_paths[index % self.A_size]
+        if self.opt.serial_batches:
+            index_B = index % self.B_size
+        else:
+            index_B = random.randint(0, self.B_size - 1)
+        B_path = self.B_paths[index_B]
+        A_img = self.composite(Image.open(A_path).convert("RGBA"))
+        B_img = Image.open(B_path).convert("RGB")
+        A = self.transform_A(A_img)
+        B = self.transform_B(B_img)
+        return {"A": A, "B": B, "A_paths": A_path, "B_paths": B_path}
+
+    def __len__(self):
+        """Return the total number of images in the dataset: the larger of the two domains."""
+        return max(self.A_size, self.B_size)
@@ -0,0 +1,139 @@
+"""Dataset class that tails a growing domain-A image set while it is still being rendered.
+
+The synthetic images (domain A) come from the render farm (scripts/batch_render_all.py), which can keep
+running while this dataset trains on what already exists. New images are picked up at the start of every
+epoch, either by scanning the render output directory or by reading the farm's render manifest
+(render_manifest.sqlite, only jobs marked 'done'). Domain B (real images) is loaded once, as in 'unaligned'.
+
+Training starts once the pool holds at least --min_pool_size images; until then the loader polls every
+--poll_interval seconds.
+
+Example:
+    python train.py --dataroot ./datasets/chess_data --name chess_cyclegan --model cycle_gan \
+        --dataset_mode streaming --stream_dir ../renders --min_pool_size 500
+"""
+
+import os
+import time
+import random
+import sqlite3
+from data.base_dataset import BaseDataset, get_transform
+from data.image_folder import make_dataset, is_image_file
+from PIL import Image
+
+
+class StreamingDataset(BaseDataset):
+    """Unaligned dataset whose domain A grows while training runs.
+
+    Call refresh() to add the images that appeared since the last call; train.py does so before every epoch.
+    With the default (non-persistent) DataLoader workers, each epoch sees the refreshed list. Under DDP the
+    DistributedSampler fixes the epoch length at startup, so new images are sampled but epochs don't grow.
+    """
+
+    @staticmethod
+    def modify_commandline_options(parser, is_train):
+        """Add the streaming options.
+
+        Parameters:
+            parser          -- original option parser
+            is_train (bool) -- whether training phase or test phase.
+
+        Returns:
+            the modified parser.
+        """
+        parser.add_argument("--stream_dir", type=str, default=None, help="directory the renders land in (searched recursively, hidden files and folders are skipped). Default: [dataroot]/[phase]A")
+        parser.add_argument("--manifest", type=str, default=None, help="render_manifest.sqlite of the render farm; if set, domain A is read from its finished jobs instead of scanning --stream_dir")
+        parser.add_argument("--min_pool_size", type=int, default=100, help="number of domain-A images to wait for before training starts")
+        parser.add_argument("--poll_interval", type=float, default=30.0, help="seconds between checks for new images while waiting for --min_pool_size")
+        return parser
+
+    def __init__(self, opt):
+        """Initialize this dataset class and wait for the minimum pool size.
+
+        Parameters:
+            opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseDataset.__init__(self, opt)
+        self.dir_A = opt.stream_dir or os.path.join(opt.dataroot, opt.phase + "A")
+        self.dir_B = os.path.join(opt.dataroot, opt.phase + "B")
+        self.A_paths = []
+        self.A_seen = set()
+        self.B_paths = sorted(make_dataset(self.dir_B, opt.max_dataset_size))
+        self.B_size = len(self.B_paths)
+        btoA = self.opt.direction == "BtoA"
+        input_nc = self.opt.output_nc if btoA else self.opt.input_nc
+        output_nc = self.opt.input_nc if btoA else self.opt.output_nc
+        self.transform_A = get_transform(self.opt, grayscale=(input_nc == 1))
+        self.transform_B = get_transform(self.opt, grayscale=(output_nc == 1))
+
+        self.refresh()
+        while len(self.A_paths) < min(opt.min_pool_size, opt.max_dataset_size):
+            print(f"Waiting for renders: {len(self.A_paths)}/{opt.min_pool_size} domain-A images in {opt.manifest or self.dir_A}")
+            time.sleep(opt.poll_interval)
+            self.refresh()
+
+    def find_A(self):
+        """Paths of the domain-A images that currently exist, in the order they were found."""
+        if self.opt.manifest:
+            # A short-lived connection per call: the dataset is pickled into the loader workers
+            db = sqlite3.connect(f"file:{self.opt.manifest}?mode=ro", uri=True)
+            try:
+                rows = db.execute("SELECT output FROM jobs WHERE status = 'done' ORDER BY updated").fetchall()
+            finally:
+                db.close()
+            return [path for (path,) in rows if os.path.exists(path)]
+
+        paths = []
+        if not os.path.isdir(self.dir_A):
+            return paths
+        for root, dirs, fnames in os.walk(self.dir_A, followlinks=True):
+            # Skip the render cache and the farm's in-progress '.<name>.partial<ext>' files
+            dirs[:] = sorted(d for d in dirs if not d.startswith("."))
+            paths.extend(os.path.join(root, fname) for fname in sorted(fnames) if is_image_file(fname) and not fname.startswith("."))
+        return paths
+
+    def refresh(self):
+        """Add the domain-A images rendered since the last call.
+
+        Returns:
+            the number of images added.
+        """
+        added = 0
+        for path in self.find_A():
+            if len(self.A_paths) >= self.opt.max_dataset_size:
+                break
+            if path not in self.A_seen:
+                self.A_seen.add(path)
+                self.A_paths.append(path)
+                added += 1
+        if added:
+            print(f"Streaming dataset: +{added} domain-A images ({len(self.A_paths)} total)")
+        return added
+
+    def __getitem__(self, index):
+        """Return a data point and its metadata information.
+
+        Parameters:
+            index (int)      -- a random integer for data indexing
+
+        Returns a dictionary that contains A, B, A_paths and B_paths
+            A (tensor)       -- an image in the input domain
+            B (tensor)       -- its corresponding image in the target domain
+            A_paths (str)    -- image paths
+            B_paths (str)    -- image paths
+        """
+        A_path = self.A_paths[index % len(self.A_paths)]
+        if self.opt.serial_batches:
+            index_B = index % self.B_size
+        else:
+            index_B = random.randint(0, self.B_size - 1)
+        B_path = self.B_paths[index_B]
+        A_img = Image.open(A_path).convert("RGB")
+        B_img = Image.open(B_path).convert("RGB")
+        A = self.transform_A(A_img)
+        B = self.transform_B(B_img)
+        return {"A": A, "B": B, "A_paths": A_path, "B_paths": B_path}
+
+    def __len__(self):
+        """Return the current number of images: the larger of the domain-A pool and domain B."""
+        return max(len(self.A_paths), self.B_size)
@@ -46,6 +46,9 @@ if __name__ == "__main__":
         # Set epoch for DistributedSampler
         if hasattr(dataset, "set_epoch"):
             dataset.set_epoch(epoch)
+        # Streaming datasets (--dataset_mode streaming) pick up the images rendered since the last epoch
+        if hasattr(dataset.dataset, "refresh"):
+            dataset.dataset.refresh()
 
         for i, data in enumerate(dataset):  # inner loop within one epoch
             iter_start_time = time.time()  # timer for computation per iteration
@@ -1,6 +1,6 @@
 import os
-import subprocess
-import sys
+
+from pgn_ingest import ingest
 
 # List of game IDs to convert
 games_to_convert = [9, 10, 11, 12, 13]
@@ -8,22 +8,12 @@ games_to_convert = [9, 10, 11, 12, 13]
 def convert_all():
     print("--- Starting Batch Conversion (PGN -> CSV) ---")
 
-    # Check where the converter script is located
-    # Try to find it in the scripts folder or the root folder
-    if os.path.exists("scripts/pgn_to_csv.py"):
-        converter_script = "scripts/pgn_to_csv.py"
-    elif os.path.exists("pgn_to_csv.py"):
-        converter_script = "pgn_to_csv.py"
-    else:
-        print("❌ Error: Could not find 'pgn_to_csv.py' in root or scripts folder.")
-        return
-
-    print(f"DEBUG: Found converter script at: {converter_script}")
-
     for game_id in games_to_convert:
-        # Path definitions
+        # Path definitions (a game{id}.pgn.zst next to it works as well)
         pgn_file = f"pgn_data/game{game_id}/game{game_id}.pgn"
         output_csv = f"pgn_data/game{game_id}/game{game_id}_converted.csv"
+        if not os.path.exists(pgn_file) and os.path.exists(pgn_file + ".zst"):
+            pgn_file += ".zst"
 
         # Check if the PGN file exists
         if not os.path.exists(pgn_file):
@@ -32,17 +22,13 @@ def convert_all():
             
         print(f"Converting Game {game_id}...")
 
-        # Build the command
-        cmd = [sys.executable, converter_script, pgn_file, output_csv]
-
-        # Run with error checking
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode == 0:
+        # In-process: writes the compact store (game{id}_converted.pos/.idx) and the CSV
+        try:
+            ingest(pgn_file, os.path.splitext(output_csv)[0], csv_path=output_csv)
             print(f"✅ Game {game_id} converted successfully.")
-        else:
+        except (OSError, ValueError) as e:
             print(f"❌ Failed to convert Game {game_id}.")
-            print(f"   Error: {result.stderr}")
+            print(f"   Error: {e}")
 
 if __name__ == "__main__":
     convert_all()
\ No newline at end of file
@@ -1,15 +1,42 @@
 import os
+import csv
+import time
+import queue
+import argparse
+import threading
 import subprocess
 
-# Definitions   
+from render_worker_client import RenderWorker, WorkerError
+from render_cache import RenderCache, settings_digest, link_or_copy
+from render_manifest import RenderManifest
+from position_store import is_store, iter_fens
+
+# Definitions
 BLENDER_PATH = "/Applications/Blender.app/Contents/MacOS/Blender"
 BLEND_FILE = "blender/chess-set.blend"
 SCRIPT_FILE = "blender/generate_cyclegan_data.py"
 OUTPUT_BASE = "/Users/romigandler/Desktop/CS/Deep Learning/Project3/renders"
 LIMIT = 3000  # Maximum images per game
+RESOLUTION = 800
+SAMPLES = 64
+NOISE_THRESHOLD = None  # Adaptive sampling (SAMPLES becomes the cap), pick it with blender/benchmark_samples.py
+VIEW = "overhead"  # generate_cyclegan_data.py always renders top-down
+OUTPUT_SIZE = 256  # Final training size written by the worker (None = keep RESOLUTION)
+OUTPUT_EXT = ".jpg"
+AUTO_FRAME = True  # Board fills the frame, so a small RESOLUTION still resolves the squares
+CACHE_DIR = os.path.join(OUTPUT_BASE, ".render_cache")
+MANIFEST_PATH = os.path.join(OUTPUT_BASE, "render_manifest.sqlite")
+
+# Render farm
+THREADS_PER_WORKER = 4  # Cycles threads per Blender process, workers = cores // this
+JOB_TIMEOUT = 300       # Seconds before a silent worker is considered hung
+MAX_ATTEMPTS = 3        # Tries per position before giving up on it
+SHARD_FRAMES = 50       # Frames per shard in --animation mode
 
 # List of tasks to perform
-# Each task is: (folder_name_to_create, path_to_csv_file)
+# Each task is: (folder_name_to_create, path_to_csv_file), the path can also be a
+# position store from pgn_ingest.py (e.g. "pgn_data/lichess/lichess_2024_01.pos"). LIMIT takes
+# positions in file order, for big pools pick a render list with select_positions.py instead.
 tasks = [
     # --- Group 1: Games that arrived as PGN (after conversion) ---
     ("trainA_game9",  "pgn_data/game9/game9_converted.csv"),
@@ -25,41 +52,408 @@ tasks = [
     ("trainA_game7", "labeled_chess_data/game7_per_frame/game7.csv")
 ]
 
-def run_renders():
-    print(f"--- Starting Batch Render for {len(tasks)} games ---")
-    print("Go grab a coffee, this will take a while... ☕")
-    
-    for folder_name, csv_path in tasks:
-        full_output_dir = os.path.join(OUTPUT_BASE, folder_name)
-        
-        print(f"\n🎥 Rendering: {folder_name}")
-        print(f"   Input: {csv_path}")
+def default_worker_count(threads_per_worker=THREADS_PER_WORKER):
+    return max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+def read_task_fens(csv_path, limit=LIMIT):
+    """
+    Unique FENs of one task CSV in file order (same dedup as generate_cyclegan_data.py).
+    csv_path may also be a position store written by pgn_ingest.py (<stem>.pos).
+    """
+    unique_fens = set()
+    fens = []
+    for fen in task_rows(csv_path):
+        if len(fens) >= limit: break
+        if fen in unique_fens: continue
+        unique_fens.add(fen)
+        fens.append(fen)
+    return fens
+
+def task_rows(path):
+    if is_store(path):
+        yield from iter_fens(path)
+        return
+    with open(path, 'r') as f:
+        for row in csv.DictReader(f):
+            yield row['fen']
 
+def read_task_jobs(limit=LIMIT):
+    """
+    Read the FENs of every task CSV into one flat list of {'id', 'fen', 'output'}.
+    Same naming and per-CSV dedup as generate_cyclegan_data.py's CSV mode.
+    """
+    entries = []
+    for folder_name, csv_path in tasks:
         # Check if the input exists
         if not os.path.exists(csv_path):
             print(f"❌ Error: CSV file not found: {csv_path}. Skipping.")
             continue
 
-        # Build the command for Blender
+        full_output_dir = os.path.join(OUTPUT_BASE, folder_name)
+        fens = read_task_fens(csv_path, limit)
+        for i, fen in enumerate(fens):
+            fname = f"synthetic_{i:04d}{OUTPUT_EXT}"
+            entries.append({'id': f"{folder_name}/{fname}", 'fen': fen,
+                            'output': os.path.join(full_output_dir, fname)})
+        print(f"   {folder_name}: {len(fens)} positions")
+    return entries
+
+def collect_jobs(entries, cache=None, manifest=None):
+    """
+    Turn entries into farm jobs. With a cache, boards already rendered are
+    linked right away and a board that repeats across games is rendered once,
+    the other outputs become 'followers'.
+    """
+    jobs = []
+    pending = {}
+    for entry in entries:
+        key = None
+        if cache is not None:
+            key = cache.key(entry['fen'], VIEW, RESOLUTION, SAMPLES, OUTPUT_EXT, OUTPUT_SIZE)
+            if cache.serve(key, entry['output']):
+                if manifest is not None:
+                    manifest.done(entry['id'], 0.0, entry['output'])
+                continue
+            if key in pending:
+                pending[key]['followers'].append(entry)
+                continue
+
+        job = dict(entry, attempts=0, key=key, followers=[])
+        if key is not None:
+            pending[key] = job
+        jobs.append(job)
+    return jobs
+
+def finish_job(job, cache, manifest=None, seconds=0.0):
+    """Record a rendered job, add it to the cache and link its duplicates"""
+    if manifest is not None:
+        manifest.done(job['id'], seconds, job['output'])
+    if cache is None:
+        return
+    cache.store(job['key'], job['output'])
+    for follower in job['followers']:
+        link_or_copy(job['output'], follower['output'])
+        cache.hits += 1
+        if manifest is not None:
+            manifest.done(follower['id'], 0.0, follower['output'])
+
+def worker_args():
+    args = ["--resolution", str(RESOLUTION), "--samples", str(SAMPLES), "--incremental"]
+    if OUTPUT_SIZE:
+        args += ["--output_size", str(OUTPUT_SIZE)]
+    if AUTO_FRAME:
+        args += ["--auto_frame"]
+    if NOISE_THRESHOLD is not None:
+        args += ["--noise_threshold", str(NOISE_THRESHOLD)]
+    return args
+
+def worker_loop(index, job_queue, stats, failed, timeout, threads_per_worker, cache=None, manifest=None):
+    """
+    One thread per Blender process. Every thread pulls from the same queue, so a
+    fast worker simply takes more jobs (no static split per game).
+    """
+    name = f"worker{index}"
+    blender_args = ["--threads", str(threads_per_worker)]
+    worker = None
+    my_stats = stats[name]
+
+    while True:
+        try:
+            job = job_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        if manifest is not None:
+            manifest.running(job['id'])
+        try:
+            if worker is None:
+                worker = RenderWorker(BLENDER_PATH, BLEND_FILE, SCRIPT_FILE, name=name,
+                                      extra_args=worker_args(),
+                                      blender_args=blender_args)
+                worker.start(timeout=timeout)
+            result = worker.render({k: job[k] for k in ('id', 'fen', 'output')}, timeout=timeout)
+        except WorkerError as e:
+            # Hung or crashed Blender: kill it, requeue the job, start a fresh one
+            print(f"⚠️ {e} (job {job['id']}). Restarting {name}.")
+            if worker is not None:
+                worker.kill()
+            worker = None
+            my_stats['restarts'] += 1
+            result = {'status': 'error', 'error': str(e)}
+
+        if result['status'] == 'ok':
+            try:
+                finish_job(job, cache, manifest, result['seconds'])
+            except Exception as e:
+                # E.g. the output is missing: retry the job rather than lose this thread
+                result = {'status': 'error', 'error': f"Recording the output failed: {e}"}
+            else:
+                my_stats['done'] += 1
+                my_stats['seconds'] += result['seconds']
+                continue
+
+        job['attempts'] += 1
+        give_up = job['attempts'] >= MAX_ATTEMPTS
+        if manifest is not None:
+            manifest.failed(job['id'], result.get('error'), final=give_up)
+        if not give_up:
+            job_queue.put(job)
+        else:
+            print(f"❌ Giving up on {job['id']}: {result.get('error')}")
+            failed.append(job)
+
+    if worker is not None:
+        worker.close()
+
+def bake_animation(folder_name, csv_path, limit=LIMIT):
+    """Keyframe one game into <output>/animation.blend (one short Blender run, nothing rendered)"""
+    output_dir = os.path.join(OUTPUT_BASE, folder_name)
+    baked = os.path.join(output_dir, "animation.blend")
+    cmd = [
+        BLENDER_PATH,
+        BLEND_FILE,
+        "--background",
+        "--python", SCRIPT_FILE,
+        "--",
+        "--csv", csv_path,
+        "--output_dir", output_dir,
+        "--limit", str(limit),
+        "--resolution", str(RESOLUTION),
+        "--samples", str(SAMPLES),
+        *(["--auto_frame"] if AUTO_FRAME else []),
+        "--animate",
+        "--save_blend", baked
+    ]
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    return baked
+
+PNG_END = b"IEND\xaeB`\x82"  # Last bytes of every complete PNG
+
+def frame_path(output_dir, frame):
+    return os.path.join(output_dir, f"synthetic_{frame:04d}.png")
+
+def complete_frames(shard):
+    """
+    Frames of the shard that were written in full. Truncated frames (a killed
+    render) are deleted, the baked scene would otherwise skip them as done.
+    """
+    done = set()
+    for frame in range(shard['start'], shard['end'] + 1):
+        path = frame_path(shard['output_dir'], frame)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            f.seek(max(0, os.path.getsize(path) - len(PNG_END)))
+            if f.read() == PNG_END:
+                done.add(frame)
+                continue
+        os.remove(path)
+    return done
+
+def shard_loop(index, shard_queue, stats, failed, timeout, threads_per_worker):
+    """Render frame ranges of baked animations with Blender's own frame pipeline"""
+    name = f"worker{index}"
+    my_stats = stats[name]
+
+    while True:
+        try:
+            shard = shard_queue.get_nowait()
+        except queue.Empty:
+            break
+
+        frames = shard['end'] - shard['start'] + 1
+        before = complete_frames(shard)
+        if len(before) == frames:
+            continue
         cmd = [
             BLENDER_PATH,
-            BLEND_FILE,
+            shard['blend'],
             "--background",
-            "--python", SCRIPT_FILE,
-            "--",
-            "--csv", csv_path,
-            "--output_dir", full_output_dir,
-            "--limit", str(LIMIT)
+            "--threads", str(threads_per_worker),
+            "--render-output", os.path.join(shard['output_dir'], "synthetic_####"),
+            "--frame-start", str(shard['start']),
+            "--frame-end", str(shard['end']),
+            "--render-anim"
         ]
+        start = time.time()
+        error = None
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                           timeout=timeout * (frames - len(before)))
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            error = e
+        # Only frames written by this run count, the scene skipped the ones already there
+        written = complete_frames(shard)
+        my_stats['done'] += len(written - before)
+        my_stats['seconds'] += time.time() - start
+        if error is None and len(written) < frames:
+            error = f"{frames - len(written)} frames missing"
+        if error is None:
+            continue
+
+        # The baked scene skips finished frames, so a retry only renders the rest
+        print(f"⚠️ {name}: {shard['id']} failed ({error}).")
+        my_stats['restarts'] += 1
+        shard['attempts'] += 1
+        if shard['attempts'] < MAX_ATTEMPTS:
+            shard_queue.put(shard)
+        else:
+            failed.append(shard)
+
+def print_report(stats, wall_seconds):
+    print("\n--- Throughput per worker ---")
+    total = 0
+    for name, s in sorted(stats.items()):
+        total += s['done']
+        rate = 60.0 * s['done'] / s['seconds'] if s['seconds'] else 0.0
+        print(f"   {name}: {s['done']} positions, {rate:.1f} pos/min while rendering, "
+              f"{s['restarts']} restarts")
+    overall = 60.0 * total / wall_seconds if wall_seconds else 0.0
+    print(f"   TOTAL: {total} positions in {wall_seconds / 60:.1f} min ({overall:.1f} pos/min)")
+
+def run_renders(num_workers=None, timeout=JOB_TIMEOUT, threads_per_worker=THREADS_PER_WORKER,
+                limit=LIMIT, use_cache=True, manifest_path=MANIFEST_PATH, resume=False, verify=False):
+    """
+    Render every task (skipping outputs the manifest already has as done), or
+    with resume=True only re-queue the manifest's pending/failed/missing jobs
+    without reading the CSVs again.
+    """
+    num_workers = num_workers or default_worker_count(threads_per_worker)
+
+    settings = settings_digest(BLEND_FILE, SCRIPT_FILE, *worker_args())
+    cache = RenderCache(CACHE_DIR, settings) if use_cache else None
+    manifest = RenderManifest(manifest_path)
+    if resume:
+        entries = manifest.unfinished(verify)
+        if cache is not None:
+            for entry in entries:
+                if entry.get('changed'):
+                    cache.evict(cache.key(entry['fen'], VIEW, RESOLUTION, SAMPLES, OUTPUT_EXT, OUTPUT_SIZE),
+                                entry['output'])
+        if any(s != settings for s in manifest.settings()):
+            print("⚠️ Render settings changed since the manifest was written, resumed jobs use the new ones.")
+        manifest.register(entries, VIEW, settings)
+        print(f"--- Resuming {len(entries)} unfinished jobs from {manifest_path} ---")
+    else:
+        print(f"--- Starting Batch Render for {len(tasks)} games ---")
+        entries = manifest.register(read_task_jobs(limit), VIEW, settings)
+    jobs = collect_jobs(entries, cache, manifest)
+    print(f"--- {len(jobs)} positions across {num_workers} Blender workers ---")
+    print("Go grab a coffee, this will take a while... ☕")
+
+    job_queue = queue.Queue()
+    for job in jobs:
+        job_queue.put(job)
 
-        # Run the command
+    stats = {f"worker{i}": {'done': 0, 'seconds': 0.0, 'restarts': 0} for i in range(num_workers)}
+    failed = []
+    start = time.time()
+
+    threads = [
+        threading.Thread(target=worker_loop,
+                         args=(i, job_queue, stats, failed, timeout, threads_per_worker, cache, manifest))
+        for i in range(num_workers)
+    ]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    print_report(stats, time.time() - start)
+    if cache is not None:
+        cache.report()
+    manifest.report()
+    manifest.close()
+    if failed:
+        print(f"❌ {len(failed)} positions failed after {MAX_ATTEMPTS} attempts, "
+              f"run 'python scripts/batch_render_all.py resume' to retry them.")
+    else:
+        print("\n🎉 ALL RENDERS COMPLETE! 🎉")
+
+def run_animation_renders(num_workers=None, timeout=JOB_TIMEOUT, threads_per_worker=THREADS_PER_WORKER,
+                          limit=LIMIT, shard_frames=SHARD_FRAMES):
+    """
+    Each game becomes one keyframed animation; the farm then splits the work
+    by frame range instead of by position.
+    """
+    num_workers = num_workers or default_worker_count(threads_per_worker)
+
+    print(f"--- Baking {len(tasks)} games into animations ---")
+    shard_queue = queue.Queue()
+    total_shards = 0
+    failed_games = []
+    for folder_name, csv_path in tasks:
+        if not os.path.exists(csv_path):
+            print(f"❌ Error: CSV file not found: {csv_path}. Skipping.")
+            continue
+        num_frames = len(read_task_fens(csv_path, limit))
         try:
-            subprocess.run(cmd, check=True)
-            print(f"✅ Finished {folder_name}")
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Failed to render {folder_name}. Error: {e}")
+            baked = bake_animation(folder_name, csv_path, limit)
+        except (subprocess.CalledProcessError, OSError) as e:
+            # One bad game shouldn't stop the others
+            print(f"❌ {folder_name}: baking the animation failed ({e}). Skipping.")
+            failed_games.append(folder_name)
+            continue
+        print(f"   {folder_name}: {num_frames} frames")
+        for start in range(0, num_frames, shard_frames):
+            end = min(start + shard_frames, num_frames) - 1
+            shard_queue.put({
+                'id': f"{folder_name}[{start}-{end}]",
+                'blend': baked,
+                'output_dir': os.path.join(OUTPUT_BASE, folder_name),
+                'start': start,
+                'end': end,
+                'attempts': 0,
+            })
+            total_shards += 1
 
-    print("\n🎉 ALL RENDERS COMPLETE! 🎉")
+    print(f"--- {total_shards} shards across {num_workers} Blender workers ---")
+    stats = {f"worker{i}": {'done': 0, 'seconds': 0.0, 'restarts': 0} for i in range(num_workers)}
+    failed = []
+    start = time.time()
+
+    threads = [
+        threading.Thread(target=shard_loop,
+                         args=(i, shard_queue, stats, failed, timeout, threads_per_worker))
+        for i in range(num_workers)
+    ]
+    for t in threads: t.start()
+    for t in threads: t.join()
+
+    print_report(stats, time.time() - start)
+    if failed_games:
+        print(f"❌ {len(failed_games)} games could not be baked: {', '.join(failed_games)}")
+    if failed:
+        print(f"❌ {len(failed)} shards failed after {MAX_ATTEMPTS} attempts.")
+    if not failed and not failed_games:
+        print("\n🎉 ALL RENDERS COMPLETE! 🎉")
 
 if __name__ == "__main__":
-    run_renders()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    parser.add_argument('command', nargs='?', default='run', choices=['run', 'resume', 'status'],
+                        help="run: render all tasks (skips finished jobs), resume: re-queue only the "
+                             "manifest's missing/failed jobs, status: print the manifest counts")
+    parser.add_argument('--manifest', type=str, default=MANIFEST_PATH)
+    parser.add_argument('--verify', action='store_true',
+                        help="With resume: also re-render finished jobs whose output checksum changed")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Blender processes (default: cpu_count // threads_per_worker)")
+    parser.add_argument('--threads_per_worker', type=int, default=THREADS_PER_WORKER)
+    parser.add_argument('--timeout', type=float, default=JOB_TIMEOUT,
+                        help="Seconds per job before the worker is killed and the job retried")
+    parser.add_argument('--limit', type=int, default=LIMIT)
+    parser.add_argument('--no_cache', action='store_true',
+                        help="Render every position even if the same board was rendered before")
+    parser.add_argument('--animation', action='store_true',
+                        help="Render each game as one keyframed animation, sharded by frame range "
+                             "(no cache, full-size PNG frames)")
+    parser.add_argument('--shard_frames', type=int, default=SHARD_FRAMES)
+    args = parser.parse_args()
+
+    if args.command == 'status':
+        RenderManifest(args.manifest).report()
+    elif args.animation:
+        run_animation_renders(args.workers, args.timeout, args.threads_per_worker, args.limit,
+                              args.shard_frames)
+    else:
+        run_renders(args.workers, args.timeout, args.threads_per_worker, args.limit,
+                    use_cache=not args.no_cache, manifest_path=args.manifest,
+                    resume=args.command == 'resume', verify=args.verify)
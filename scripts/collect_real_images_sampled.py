@@ -1,7 +1,8 @@
 import os
-import shutil
 import csv
-from tqdm import tqdm
+import argparse
+
+from place_files import place_files, add_place_args, THREADS
 
 # --- CONFIGURATION ---
 
@@ -18,13 +19,14 @@ DEST_DIR = "dataset/trainB"
 # Sampling rate for the MASSIVE folders only (1 every 50)
 STEP = 50
 
-def collect_all_real_data():
+def collect_all_real_data(mode='hardlink', threads=THREADS):
     # Ensure destination exists
     if not os.path.exists(DEST_DIR):
         os.makedirs(DEST_DIR)
         print(f"Destination folder ready: {DEST_DIR}")
     
     total_copied = 0
+    pairs = []  # (src, dst), placed all at once at the end
 
     # --- PART 1: Process the LABELED Data (Copy ALL via CSV) ---
     print(f"\n--- Processing Labeled Data from: {LABELED_DATA_DIR} ---")
@@ -68,7 +70,7 @@ def collect_all_real_data():
                                 dst_name = f"{game_dir}_{fname}"
                                 dst_path = os.path.join(DEST_DIR, dst_name)
                                 
-                                shutil.copy2(src, dst_path)
+                                pairs.append((src, dst_path))
                                 total_copied += 1
                 except Exception as e:
                     print(f"Error reading CSV in {game_dir}: {e}")
@@ -107,13 +109,19 @@ def collect_all_real_data():
                         dst_name = f"{game_folder}_{img_name}"
                         src = os.path.join(images_path, img_name)
                         
-                        shutil.copy2(src, os.path.join(DEST_DIR, dst_name))
+                        pairs.append((src, os.path.join(DEST_DIR, dst_name)))
                         total_copied += 1
     else:
         print(f"Warning: Directory '{RAW_DATA_DIR}' not found.")
 
+    print(f"\nPlacing {len(pairs)} images ({mode})...")
+    place_files(pairs, DEST_DIR, mode, threads)
+
     print("-" * 30)
     print(f"DONE! Total images in trainB: {total_copied}")
 
 if __name__ == "__main__":
-    collect_all_real_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser()
+    add_place_args(parser)
+    args = parser.parse_args()
+    collect_all_real_data(args.mode, args.threads)
\ No newline at end of file
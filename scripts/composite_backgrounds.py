@@ -0,0 +1,102 @@
+import os
+import argparse
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+# Composites transparent (RGBA) renders from
+#   generate_cyclegan_data.py --transparent
+# over random crops of the real trainB photos, so one render becomes many
+# domain-A samples with different backgrounds. The crops are decoded once into
+# a (N, H, W, 3) array and the blend is vectorized over a whole batch.
+# Training composites at load time instead (cycleGAN --dataset_mode composited),
+# this offline pass is for a fixed composited set, e.g. for FID or previews.
+
+IMAGE_EXTS = ('.jpg', '.jpeg', '.png', '.webp')
+
+def list_images(directory, exts=IMAGE_EXTS):
+    return sorted(os.path.join(directory, f) for f in os.listdir(directory) if f.lower().endswith(exts))
+
+def load_background_crops(background_dir, size, count, rng, min_scale=0.5):
+    """
+    Pre-decode `count` random square crops (side >= min_scale of the shorter
+    image side) from the images in background_dir, resized to size x size.
+    Returns a (count, size, size, 3) uint8 array.
+    """
+    files = list_images(background_dir)
+    if not files:
+        raise FileNotFoundError(f"No background images in {background_dir}")
+
+    crops = np.empty((count, size, size, 3), dtype=np.uint8)
+    per_file = -(-count // len(files))  # Decode each photo once for all its crops
+    i = 0
+    for path in rng.permutation(files):
+        with Image.open(path) as img:
+            img = img.convert('RGB')
+            w, h = img.size
+            for _ in range(per_file):
+                if i == count:
+                    return crops
+                side = int(min(w, h) * rng.uniform(min_scale, 1.0))
+                x, y = rng.integers(0, w - side + 1), rng.integers(0, h - side + 1)
+                crop = img.crop((x, y, x + side, y + side)).resize((size, size), Image.BILINEAR)
+                crops[i] = np.asarray(crop)
+                i += 1
+    return crops[:i]
+
+def load_rgba(paths, size):
+    """(B, size, size, 4) uint8 batch of RGBA renders"""
+    batch = np.empty((len(paths), size, size, 4), dtype=np.uint8)
+    for i, path in enumerate(paths):
+        with Image.open(path) as img:
+            img = img.convert('RGBA')
+            if img.size != (size, size):
+                img = img.resize((size, size), Image.LANCZOS)
+            batch[i] = np.asarray(img)
+    return batch
+
+def composite_batch(foregrounds, backgrounds, rng, indices=None):
+    """
+    Alpha-blend a (B, H, W, 4) RGBA batch over backgrounds picked from a
+    (N, H, W, 3) pool (random unless indices are given). Returns (B, H, W, 3) uint8.
+    """
+    if indices is None:
+        indices = rng.integers(0, len(backgrounds), size=len(foregrounds))
+    alpha = foregrounds[..., 3:4].astype(np.float32) * (1.0 / 255)
+    out = foregrounds[..., :3] * alpha + backgrounds[indices] * (1.0 - alpha)
+    return np.clip(out + 0.5, 0, 255).astype(np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Composite transparent renders over real background crops")
+    parser.add_argument('--renders', type=str, required=True, help="Directory of RGBA renders")
+    parser.add_argument('--backgrounds', type=str, default="dataset/trainB")
+    parser.add_argument('--output_dir', type=str, default="dataset/trainA_composited")
+    parser.add_argument('--per_render', type=int, default=4, help="Composited samples per render")
+    parser.add_argument('--pool_size', type=int, default=512, help="Background crops kept decoded in memory")
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--batch_size', type=int, default=64)
+    parser.add_argument('--quality', type=int, default=90)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print(f"🖼️  Decoding {args.pool_size} background crops from {args.backgrounds}...")
+    backgrounds = load_background_crops(args.backgrounds, args.size, args.pool_size, rng)
+
+    renders = list_images(args.renders, ('.png', '.webp'))
+    print(f"🎨 Compositing {len(renders)} renders x {args.per_render} backgrounds...")
+    for start in tqdm(range(0, len(renders), args.batch_size)):
+        paths = renders[start:start + args.batch_size]
+        foregrounds = load_rgba(paths, args.size)
+        for k in range(args.per_render):
+            for path, image in zip(paths, composite_batch(foregrounds, backgrounds, rng)):
+                name = os.path.splitext(os.path.basename(path))[0] + f"_bg{k}.jpg"
+                Image.fromarray(image).save(os.path.join(args.output_dir, name), "JPEG", quality=args.quality)
+
+    print(f"✅ Wrote {len(renders) * args.per_render} images to {args.output_dir}")
+
+if __name__ == "__main__":
+    main()
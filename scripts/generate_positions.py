@@ -0,0 +1,244 @@
+import os
+import json
+import time
+import random
+import argparse
+import itertools
+from multiprocessing import Pool
+
+import numpy as np
+import chess
+
+from position_store import PIECES, RECORD_SIZE, INDEX_DTYPE, NO_EP, PositionWriter, export_csv, store_paths
+from position_index import square_index
+from pgn_ingest import ordered_imap
+
+# Random legal positions beyond what the PGN games reach, written as a
+# position store (see position_store.py) the render farm reads directly.
+# Each position samples a material configuration that meets the constraints,
+# scatters it over the board (pawns never on the back ranks, required pieces
+# first, forbidden squares skipped) and keeps it if python-chess finds it valid
+# (one king each, the side not to move isn't in check, no impossible checks).
+#
+# Constraints (JSON via --constraints, every key optional, flags override it):
+#   {
+#     "counts": {"Q": [0, 1], "p": [4, 8]},   # per piece letter, default 0..starting count
+#     "total": [10, 24],                      # pieces on the board, kings included
+#     "balance": [-3, 3],                     # white - black material in pawns (P1 N3 B3 R5 Q9)
+#     "phase": "middlegame",                  # any | opening | middlegame | endgame
+#     "require": {"e5": "N"},                 # square -> piece that must be there
+#     "forbid": {"d7": "p", "e4": "Pp"},      # square -> pieces that must not be there
+#     "turn": "w"                             # side to move, random if missing
+#   }
+
+START_COUNTS = {'P': 8, 'N': 2, 'B': 2, 'R': 2, 'Q': 1, 'K': 1}
+VALUES = {'P': 1, 'N': 3, 'B': 3, 'R': 5, 'Q': 9, 'K': 0}
+# Game phase from the non-pawn material: 24 with every piece on the board, 0 with pawns and kings only
+PHASE_WEIGHTS = {'P': 0, 'N': 1, 'B': 1, 'R': 2, 'Q': 4, 'K': 0}
+PHASES = {'any': (0, 99), 'opening': (20, 99), 'middlegame': (8, 19), 'endgame': (0, 7)}
+
+DEFAULT_CONSTRAINTS = {
+    'counts': {},
+    'total': [2, 32],
+    'balance': [-99, 99],
+    'phase': 'any',
+    'require': {},
+    'forbid': {},
+    'turn': None,
+}
+
+BATCH_SIZE = 2000       # Positions per worker task
+MAX_TRIES = 200         # Placement attempts per position before a batch gives up
+STALE_BATCHES = 20      # Batches in a row without a new position before the run gives up
+
+def load_constraints(path=None):
+    constraints = dict(DEFAULT_CONSTRAINTS)
+    if path:
+        with open(path, 'r') as f:
+            constraints.update(json.load(f))
+    return constraints
+
+def count_ranges(constraints):
+    """(low, high) count of every piece letter, raised to what 'require' needs"""
+    ranges = {}
+    for piece in PIECES:
+        start = START_COUNTS[piece.upper()]
+        low, high = constraints['counts'].get(piece, (start, start) if piece in 'Kk' else (0, start))
+        required = sum(1 for p in constraints['require'].values() if p == piece)
+        ranges[piece] = (max(low, required), high)
+    return ranges
+
+def side_configs(ranges, letters):
+    """(n, 5) counts of letters (pawn, knight, bishop, rook, queen of one side) within ranges"""
+    configs = np.array(list(itertools.product(*(range(ranges[p][0], ranges[p][1] + 1) for p in letters))),
+                       dtype=np.int64).reshape(-1, len(letters))
+    # A side can't have more promoted pieces than it lost pawns
+    extra = np.maximum(0, configs[:, 1:] - [START_COUNTS[p.upper()] for p in letters[1:]]).sum(axis=1)
+    return configs[extra <= START_COUNTS['P'] - configs[:, 0]]
+
+def material_configs(constraints, ranges):
+    """
+    Every (white counts, black counts) pair meeting the total, balance and phase
+    constraints, so sampling one never has to be retried.
+    Returns (white configs, black configs, (m, 2) feasible pairs).
+    """
+    white, black = side_configs(ranges, "PNBRQ"), side_configs(ranges, "pnbrq")
+    values = np.array([VALUES[p] for p in "PNBRQ"])
+    weights = np.array([PHASE_WEIGHTS[p] for p in "PNBRQ"])
+    total = 2 + white.sum(axis=1)[:, None] + black.sum(axis=1)[None, :]
+    balance = (white @ values)[:, None] - (black @ values)[None, :]
+    phase = (white @ weights)[:, None] + (black @ weights)[None, :]
+    phase_low, phase_high = PHASES[constraints['phase']]
+    ok = ((constraints['total'][0] <= total) & (total <= constraints['total'][1])
+          & (constraints['balance'][0] <= balance) & (balance <= constraints['balance'][1])
+          & (phase_low <= phase) & (phase <= phase_high))
+    return white, black, np.argwhere(ok)
+
+def sample_counts(configs, rng):
+    """Piece letter -> count of a random feasible material configuration"""
+    white, black, pairs = configs
+    w, b = pairs[rng.randrange(len(pairs))]
+    counts = dict(zip("PNBRQ", white[w].tolist()))
+    counts.update(zip("pnbrq", black[b].tolist()))
+    counts['K'] = counts['k'] = 1
+    return counts
+
+def place(counts, constraints, rng):
+    """{square: piece letter} with the required pieces first, None if a piece has no legal square left"""
+    placement = {square_index(sq): piece for sq, piece in constraints['require'].items()}
+    forbidden = {square_index(sq): pieces for sq, pieces in constraints['forbid'].items()}
+    remaining = dict(counts)
+    for piece in placement.values():
+        remaining[piece] -= 1
+
+    free = [sq for sq in range(64) if sq not in placement]
+    rng.shuffle(free)
+    for piece, n in remaining.items():
+        for _ in range(n):
+            for k, sq in enumerate(free):
+                if piece in forbidden.get(sq, ""):
+                    continue
+                if piece in 'Pp' and sq // 8 in (0, 7):
+                    continue
+                placement[sq] = piece
+                free.pop(k)
+                break
+            else:
+                return None
+    return placement
+
+def generate_batch(task):
+    """(boards, index, tries) of up to `count` valid positions"""
+    batch, count, constraints, seed = task
+    rng = random.Random(f"{seed}:{batch}")
+    configs = material_configs(constraints, count_ranges(constraints))
+    records = np.zeros((count, RECORD_SIZE), dtype=np.uint8)
+    index = np.zeros(count, dtype=INDEX_DTYPE)
+
+    made = tries = 0
+    while made < count and tries < count * MAX_TRIES and len(configs[2]):
+        tries += 1
+        counts = sample_counts(configs, rng)
+        placement = place(counts, constraints, rng)
+        if placement is None:
+            continue
+        board = chess.Board(None)
+        board.set_piece_map({sq: chess.Piece.from_symbol(p) for sq, p in placement.items()})
+        board.turn = {'w': chess.WHITE, 'b': chess.BLACK}.get(constraints['turn'], rng.random() < 0.5)
+        if not board.is_valid():
+            continue
+        for sq, piece in placement.items():
+            records[made, sq] = PIECES.index(piece) + 1
+        index[made] = (batch, 0, board.turn, 0, NO_EP, 0)
+        made += 1
+    return records[:made], index[:made], tries
+
+def parse_range(text):
+    """'3', '2-5' or, with negative bounds, '-3:3' -> [low, high]"""
+    if ':' in text:
+        low, high = text.split(':')
+    elif '-' in text.lstrip('-'):
+        low, high = text.split('-', 1)
+    else:
+        low = high = text
+    return [int(low), int(high)]
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate random legal positions under constraints")
+    parser.add_argument('--count', type=int, required=True, help="Number of distinct positions")
+    parser.add_argument('--output', type=str, required=True, help="Store stem, writes <stem>.pos and <stem>.idx")
+    parser.add_argument('--csv', type=str, default=None, help="Also export the positions as a CSV of FENs")
+    parser.add_argument('--constraints', type=str, default=None, help="JSON file of constraints (see the top of this file)")
+    parser.add_argument('--piece', nargs='+', default=[], metavar="LETTER=RANGE",
+                        help="Count ranges, e.g. Q=0-1 p=4-8 R=2")
+    parser.add_argument('--total', type=str, default=None, help="Pieces on the board, e.g. 10-20")
+    parser.add_argument('--balance', type=str, default=None, help="White - black material, e.g. -3:3")
+    parser.add_argument('--phase', type=str, default=None, choices=list(PHASES))
+    parser.add_argument('--require', nargs='+', default=[], metavar="PIECE@SQUARE", help="e.g. N@e5")
+    parser.add_argument('--forbid', nargs='+', default=[], metavar="PIECE@SQUARE", help="e.g. p@d7")
+    parser.add_argument('--turn', type=str, default=None, choices=['w', 'b'])
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--batch_size', type=int, default=BATCH_SIZE)
+    parser.add_argument('--stale_batches', type=int, default=STALE_BATCHES,
+                        help="Stop after this many batches in a row add no new position")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    constraints = load_constraints(args.constraints)
+    constraints['counts'] = dict(constraints['counts'])
+    for spec in args.piece:
+        piece, _, text = spec.partition('=')
+        constraints['counts'][piece] = parse_range(text)
+    if args.total: constraints['total'] = parse_range(args.total)
+    if args.balance: constraints['balance'] = parse_range(args.balance)
+    if args.phase: constraints['phase'] = args.phase
+    if args.turn: constraints['turn'] = args.turn
+    constraints['require'] = dict(constraints['require'])
+    for term in args.require:
+        piece, square = term.split('@')
+        constraints['require'][square] = piece
+    constraints['forbid'] = dict(constraints['forbid'])
+    for term in args.forbid:
+        piece, square = term.split('@')
+        constraints['forbid'][square] = constraints['forbid'].get(square, "") + piece
+
+    start = time.time()
+    seen = set()
+    tries = stale = 0
+    workers = args.workers or os.cpu_count() or 1
+    tasks = ((batch, args.batch_size, constraints, args.seed) for batch in itertools.count())
+    with PositionWriter(args.output) as writer, Pool(workers) as pool:
+        for boards, index, batch_tries in ordered_imap(pool, generate_batch, tasks, 2 * workers):
+            tries += batch_tries
+            if len(boards) == 0:
+                raise SystemExit(f"❌ No valid position in {batch_tries} tries, the constraints are too strict "
+                                 f"(or contradict each other).")
+            # Positions already generated in an earlier batch are dropped
+            keep = []
+            for i, row in enumerate(boards):
+                key = row.tobytes()
+                if key not in seen:
+                    seen.add(key)
+                    keep.append(i)
+            keep = keep[:args.count - writer.count]
+            writer.write(boards[keep], index[keep])
+            if writer.count >= args.count:
+                break
+            # The constraints may allow fewer distinct boards than --count
+            stale = 0 if keep else stale + 1
+            if stale >= args.stale_batches:
+                print(f"⚠️ No new position in {stale} batches in a row, the constraints only allow "
+                      f"about {writer.count} distinct positions (asked for {args.count}).")
+                break
+        generated = writer.count
+
+    seconds = time.time() - start
+    print(f"Generated {generated} positions in {seconds:.1f}s ({generated / seconds:.0f}/s, "
+          f"{100.0 * generated / max(1, tries):.1f}% of the placements were valid and new)")
+    print(f"Saved to: {' / '.join(store_paths(args.output))}")
+    if args.csv:
+        export_csv(args.output, args.csv)
+        print(f"Saved to: {args.csv}")
+
+if __name__ == "__main__":
+    main()
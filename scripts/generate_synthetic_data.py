@@ -1,79 +1,97 @@
 import os
 import json
-import subprocess
 from tqdm import tqdm
 
+from render_worker_client import RenderWorker, WorkerError
+from render_cache import RenderCache, settings_digest
+
 def generate_synthetic_data():
     metadata_file = "dataset/metadata.json"
     output_dir = "dataset/trainA"
     blender_path = "/Applications/Blender.app/Contents/MacOS/Blender"
     blend_file = "blender/chess-set.blend"
     script_file = "blender/chess_position_api_v2.py"
-    
+    cache_dir = "renders/.cache"
+    resolution, samples = 512, 16
+    output_size = 256 # Final training size, written by the worker (no resize pass)
+    # The first view goes to trainA, any extra view (e.g. "east", "west") to
+    # dataset/trainA_<view>. All views of a position come from one apply_fen.
+    views = ["white"] # Or black, depending on the game.
+
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
-        
+
     if not os.path.exists(metadata_file):
         print(f"Error: {metadata_file} not found. Run prepare_real_data.py first.")
         return
 
     with open(metadata_file, 'r') as f:
         metadata = json.load(f)
-        
+
     print(f"Starting generation of {len(metadata)} synthetic images...")
-    
-    # We will use the overhead view primarily as it matches the real data samples
-    # The script generates 3 images: 1_overhead, 2_east, 3_west (or 2_west, 3_east)
-    # We will rename the 1_overhead.png to match the real image name
-    
-    for entry in tqdm(metadata):
-        image_name = entry['image_path']
-        fen = entry['fen']
-        
-        # Output filename in trainA (matching the name in trainB)
-        target_path = os.path.join(output_dir, image_name)
-        
-        if os.path.exists(target_path):
-            continue
-            
-        # Temporary directory for blender output (it saves to ./renders by default in the script)
-        temp_renders_dir = "renders"
-        if not os.path.exists(temp_renders_dir):
-            os.makedirs(temp_renders_dir)
-            
-        # Run Blender
-        # Note: we use small samples (16) and resolution (512) for speed, 
-        # but you might want to increase them for better quality.
-        cmd = [
-            blender_path,
-            blend_file,
-            "--background",
-            "--python", script_file,
-            "--",
-            "--fen", fen,
-            "--resolution", "512",
-            "--samples", "16",
-            "--view", "white" # Or black, depending on the game. 
+
+    # One Blender process for the whole run: the .blend file, piece detection and
+    # lighting are set up once, then every FEN is sent to it as a job.
+    # Note: we use small samples (16) and resolution (512) for speed,
+    # but you might want to increase them for better quality.
+    worker = RenderWorker(
+        blender_path,
+        blend_file,
+        script_file,
+        extra_args=[
+            "--resolution", str(resolution),
+            "--samples", str(samples),
+            "--output_size", str(output_size),
+            "--view", *views
         ]
-        
-        try:
-            # We use check=True to stop on errors. 
-            # stdout=subprocess.DEVNULL to keep the console clean.
-            subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-            
-            # The script saves 1_overhead.png, 2_east.png, 3_west.png
-            # We want 1_overhead.png
-            overhead_src = os.path.join(temp_renders_dir, "1_overhead.png")
-            if os.path.exists(overhead_src):
-                os.rename(overhead_src, target_path)
-            else:
-                print(f"Warning: 1_overhead.png not found for FEN {fen}")
-                
-        except subprocess.CalledProcessError as e:
-            print(f"Error rendering FEN {fen}: {e}")
+    )
+    # Many frames show the same position, render each board only once
+    cache = RenderCache(cache_dir, settings_digest(blend_file, script_file))
+    ready = worker.start()
+    print(f"Blender worker ready (scene setup {ready['setup_seconds']}s)")
 
+    render_seconds = 0.0
+    rendered = 0
+    try:
+        for entry in tqdm(metadata):
+            image_name = entry['image_path']
+            fen = entry['fen']
+
+            # Output filename in trainA (matching the name in trainB)
+            outputs = {}
+            keys = {}
+            for i, view in enumerate(views):
+                view_dir = output_dir if i == 0 else f"{output_dir}_{view}"
+                target_path = os.path.join(view_dir, image_name)
+                if os.path.exists(target_path):
+                    continue
+                keys[view] = cache.key(fen, view, resolution, samples, os.path.splitext(target_path)[1], output_size)
+                if cache.serve(keys[view], target_path):
+                    continue
+                os.makedirs(view_dir, exist_ok=True)
+                outputs[view] = target_path
+
+            if not outputs:
+                continue
+
+            result = worker.render({'id': image_name, 'fen': fen,
+                                    'views': list(outputs), 'outputs': outputs})
+            if result['status'] != 'ok':
+                print(f"Error rendering FEN {fen}: {result.get('error')}")
+                continue
+            for view, target_path in outputs.items():
+                cache.store(keys[view], target_path)
+            render_seconds += result['seconds']
+            rendered += 1
+    except WorkerError as e:
+        print(f"Blender worker failed: {e}")
+    finally:
+        worker.close()
+
+    if rendered:
+        print(f"Rendered {rendered} images, {render_seconds / rendered:.2f}s per image.")
+    cache.report()
     print("Finished generating synthetic data.")
 
 if __name__ == "__main__":
     generate_synthetic_data()
-
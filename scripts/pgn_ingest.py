@@ -0,0 +1,150 @@
+import io
+import os
+import time
+import argparse
+import collections
+from multiprocessing import Pool
+
+import numpy as np
+import chess
+import chess.pgn
+import zstandard
+
+from position_store import PositionWriter, INDEX_DTYPE, NO_EP, boards_from_masks, export_csv
+
+# Streams a PGN (plain or .pgn.zst) into a position store (see position_store.py).
+# The main process only splits the text at game boundaries, a process pool
+# replays the games and returns packed records, which are written in game order.
+
+GAMES_PER_CHUNK = 256   # Games sent to a worker at once
+CHUNKS_AHEAD = 4        # Chunks queued per worker, bounds memory on huge files
+PROGRESS_EVERY = 50000  # Games between progress lines
+
+def open_pgn(path):
+    """Text stream of a .pgn or .pgn.zst file"""
+    if path.endswith('.zst'):
+        # Lichess dumps are compressed with long windows
+        stream = zstandard.ZstdDecompressor(max_window_size=2 ** 31).stream_reader(open(path, 'rb'), closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', errors='replace')
+    return open(path, encoding='utf-8', errors='replace')
+
+def split_games(f):
+    """Text of each game: a header line after movetext starts the next game"""
+    lines, in_moves = [], False
+    for line in f:
+        if line.startswith('['):
+            if in_moves:
+                yield "".join(lines)
+                lines, in_moves = [], False
+        elif line.strip():
+            in_moves = True
+        lines.append(line)
+    if in_moves:
+        yield "".join(lines)
+
+def game_chunks(f, games_per_chunk=GAMES_PER_CHUNK, max_games=None):
+    """(number of the first game, [game texts]) batches"""
+    chunk, first = [], 0
+    for n, text in enumerate(split_games(f)):
+        if max_games is not None and n >= max_games:
+            break
+        chunk.append(text)
+        if len(chunk) == games_per_chunk:
+            yield first, chunk
+            first, chunk = first + len(chunk), []
+    if chunk:
+        yield first, chunk
+
+def bitboards(board):
+    """12 bitboards in position_store.PIECES order"""
+    white, black = board.occupied_co[chess.WHITE], board.occupied_co[chess.BLACK]
+    types = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    return [t & white for t in types] + [t & black for t in types]
+
+def castling_bits(board):
+    return (board.has_kingside_castling_rights(chess.WHITE) | board.has_queenside_castling_rights(chess.WHITE) << 1
+            | board.has_kingside_castling_rights(chess.BLACK) << 2 | board.has_queenside_castling_rights(chess.BLACK) << 3)
+
+def index_entry(game, board):
+    """Index entry of a board, en passant only when capturable (as board.fen())"""
+    ep = board.ep_square if board.has_legal_en_passant() else NO_EP
+    return game, board.ply(), board.turn, castling_bits(board), ep, board.halfmove_clock
+
+def parse_chunk(chunk):
+    """Every mainline position of a chunk of games, as (boards, index, games, errors)"""
+    first, texts = chunk
+    masks, index, errors = [], [], 0
+    for g, text in enumerate(texts):
+        game = chess.pgn.read_game(io.StringIO(text))
+        if game is None:
+            errors += 1
+            continue
+        if game.errors:
+            errors += 1  # The mainline stops at the bad move, keep what came before (as pgn_to_csv.py)
+        board = game.board()
+        masks.append(bitboards(board))
+        index.append(index_entry(first + g, board))
+        for move in game.mainline_moves():
+            board.push(move)
+            masks.append(bitboards(board))
+            index.append(index_entry(first + g, board))
+
+    masks = np.array(masks, dtype=np.uint64).reshape(-1, 12)
+    return boards_from_masks(masks), np.array(index, dtype=INDEX_DTYPE), len(texts), errors
+
+def ordered_imap(pool, fn, items, ahead):
+    """pool.imap that only reads `ahead` items in advance (imap reads its input to the end)"""
+    pending = collections.deque()
+    for item in items:
+        pending.append(pool.apply_async(fn, (item,)))
+        if len(pending) >= ahead:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+def default_stem(pgn_path):
+    for ext in ('.pgn.zst', '.zst', '.pgn'):
+        if pgn_path.endswith(ext):
+            return pgn_path[:-len(ext)]
+    return pgn_path
+
+def ingest(pgn_path, stem=None, workers=None, games_per_chunk=GAMES_PER_CHUNK, max_games=None, csv_path=None):
+    """Convert a PGN into <stem>.pos/.idx (and optionally a CSV of FENs). Returns the number of positions."""
+    stem = stem or default_stem(pgn_path)
+    workers = workers or os.cpu_count() or 1
+    print(f"Reading PGN: {pgn_path}")
+
+    start = time.time()
+    games = errors = 0
+    next_report = PROGRESS_EVERY
+    with open_pgn(pgn_path) as f, PositionWriter(stem) as writer, Pool(workers) as pool:
+        chunks = game_chunks(f, games_per_chunk, max_games)
+        for boards, index, n_games, n_errors in ordered_imap(pool, parse_chunk, chunks, CHUNKS_AHEAD * workers):
+            writer.write(boards, index)
+            games += n_games
+            errors += n_errors
+            if games >= next_report:
+                rate = games / (time.time() - start)
+                print(f"   {games} games, {writer.count} positions ({rate:.0f} games/s)")
+                next_report += PROGRESS_EVERY
+        positions = writer.count
+
+    print(f"Processed {games} games ({errors} with errors) in {time.time() - start:.1f}s.")
+    print(f"Extracted {positions} positions -> {stem}.pos / {stem}.idx")
+    if csv_path:
+        export_csv(stem, csv_path)
+        print(f"Saved to: {csv_path}")
+    return positions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a .pgn / .pgn.zst into a compact position store")
+    parser.add_argument('pgn_file', help="Input PGN file (.pgn or .pgn.zst)")
+    parser.add_argument('--output', type=str, default=None,
+                        help="Store stem, writes <stem>.pos and <stem>.idx (default: next to the PGN)")
+    parser.add_argument('--workers', type=int, default=None, help="Parser processes (default: all cores)")
+    parser.add_argument('--games_per_chunk', type=int, default=GAMES_PER_CHUNK)
+    parser.add_argument('--max_games', type=int, default=None)
+    parser.add_argument('--csv', type=str, default=None, help="Also export the positions as a CSV of FENs")
+    args = parser.parse_args()
+
+    ingest(args.pgn_file, args.output, args.workers, args.games_per_chunk, args.max_games, args.csv)
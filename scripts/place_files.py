@@ -0,0 +1,40 @@
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+
+from render_cache import link_or_copy
+
+# Puts selected source images into a dataset folder without paying for a copy
+# each time it is rebuilt:
+#   hardlink  same file under a second name, no extra space (copies if src is on another filesystem)
+#   symlink   link to the absolute source path, works across filesystems
+#   copy      real copies, made by a thread pool (the time goes to I/O, not Python)
+# Existing files with the same name are replaced, so re-running is idempotent.
+
+MODES = ['hardlink', 'symlink', 'copy']
+THREADS = 16
+
+def symlink(src, dst):
+    tmp = dst + ".tmp"
+    if os.path.lexists(tmp):
+        os.remove(tmp)
+    os.symlink(os.path.abspath(src), tmp)
+    os.replace(tmp, dst)
+
+def copy(src, dst):
+    tmp = dst + ".tmp"
+    shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+def place_files(pairs, dest_dir, mode='hardlink', threads=THREADS):
+    """Place every (src, dst) pair (dst inside dest_dir) with the given mode"""
+    place = {'hardlink': link_or_copy, 'symlink': symlink, 'copy': copy}[mode]
+    os.makedirs(dest_dir, exist_ok=True)
+    with ThreadPoolExecutor(threads) as pool:
+        # list() re-raises the first error
+        list(pool.map(lambda pair: place(*pair), pairs))
+
+def add_place_args(parser):
+    parser.add_argument('--mode', type=str, default='hardlink', choices=MODES,
+                        help="How images get into the dataset folder (default: hardlink, no extra disk space)")
+    parser.add_argument('--threads', type=int, default=THREADS, help="Threads placing files")
@@ -0,0 +1,312 @@
+import os
+import csv
+import json
+import time
+import sqlite3
+import argparse
+import numpy as np
+
+from position_store import PIECES, RECORD_SIZE, decode_board, encode_board, is_store, open_store
+
+# On-disk index over every position the project has (metadata.json, converted
+# CSVs, position stores, render manifests), for curating test sets of unseen
+# game states. Positions are identified by their board only (side to move,
+# castling and clocks are ignored). The index is a directory of .npy files,
+# memory-mapped on load:
+#   keys.npy      (N,) uint64 Zobrist keys of the distinct boards, sorted
+#   boards.npy    (N, 64) uint8 boards in key order (see position_store.py)
+#   postings.npy  (768, N/8) packed bitmap of the boards with piece p on square s, row (p - 1) * 64 + s
+#   members.npy   (S, N/8) packed bitmap of the boards in each source
+#   rows_<i>.npy  board id of every row of source i, in file order
+#   index.json    the sources (name, path, number of rows)
+# Queries combine the packed bitmaps with numpy bit operations, so they stay in
+# the millisecond range for millions of boards.
+
+ZOBRIST_SEED = 20240611
+CHUNK = 1 << 16
+
+# Zobrist table: one random 64-bit number per (piece code, square), code 0 (empty) hashes to 0
+_ZOBRIST = np.random.default_rng(ZOBRIST_SEED).integers(0, 2 ** 63, size=(13, 64), dtype=np.int64).astype(np.uint64)
+_ZOBRIST[0] = 0
+_SQUARES = np.arange(64)
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.int64)
+
+def board_keys(boards):
+    """(N,) uint64 Zobrist key of each (N, 64) board"""
+    keys = np.empty(len(boards), dtype=np.uint64)
+    for start in range(0, len(boards), CHUNK):
+        chunk = np.asarray(boards[start:start + CHUNK])
+        keys[start:start + CHUNK] = np.bitwise_xor.reduce(_ZOBRIST[chunk, _SQUARES], axis=1)
+    return keys
+
+def square_index(name):
+    """'e5' -> 36 (rank * 8 + file)"""
+    return (int(name[1]) - 1) * 8 + ord(name[0]) - ord('a')
+
+def parse_term(term):
+    """'N@e5' -> (feature row, negated), '!p@d7' negates"""
+    negated = term.startswith('!')
+    piece, square = term.lstrip('!').split('@')
+    if piece not in PIECES or len(square) != 2:
+        raise ValueError(f"Bad query term '{term}', expected e.g. N@e5 or !p@d7")
+    return PIECES.index(piece) * 64 + square_index(square), negated
+
+def popcount(packed):
+    return int(_POPCOUNT[packed].sum())
+
+def read_source(path):
+    """(full FEN of every row, rows) of a metadata .json, .csv, render manifest .sqlite or position store"""
+    if is_store(path):
+        boards, _ = open_store(path)
+        return None, boards
+    if path.endswith('.json'):
+        with open(path, 'r') as f:
+            entries = json.load(f)
+        return [entry['fen'] for entry in entries], entries
+    if path.endswith(('.sqlite', '.db')):
+        db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            rows = db.execute("SELECT fen, id, output, status FROM jobs ORDER BY id").fetchall()
+        finally:
+            db.close()
+        return [row[0] for row in rows], [dict(zip(('fen', 'id', 'output', 'status'), row)) for row in rows]
+    with open(path, 'r') as f:
+        rows = list(csv.DictReader(f))
+    return [row['fen'] for row in rows], rows
+
+def source_boards(path):
+    fens, rows = read_source(path)
+    if fens is None:
+        return np.asarray(rows)
+    # Same placement field -> same board, skip re-encoding repeats (consecutive frames share a FEN)
+    placements = [fen.split()[0] for fen in fens]
+    unique, inverse = np.unique(placements, return_inverse=True) if placements else ([], np.zeros(0, int))
+    encoded = np.stack([encode_board(p) for p in unique]) if len(unique) else np.zeros((0, RECORD_SIZE), np.uint8)
+    return encoded[inverse.ravel()]
+
+def build_index(sources, index_dir):
+    """Index the (name, path) sources into index_dir"""
+    start = time.time()
+    os.makedirs(index_dir, exist_ok=True)
+    per_source = []
+    for name, path in sources:
+        boards = source_boards(path)
+        per_source.append((boards, board_keys(boards)))
+        print(f"   {name}: {len(boards)} rows ({path})")
+
+    all_keys = np.concatenate([keys for _, keys in per_source])
+    keys, first = np.unique(all_keys, return_index=True)
+    boards = np.concatenate([b for b, _ in per_source])[first]
+    n = len(keys)
+    nbytes = (n + 7) // 8
+
+    postings = np.lib.format.open_memmap(os.path.join(index_dir, "postings.npy"), mode='w+',
+                                         dtype=np.uint8, shape=(12 * 64, nbytes))
+    for square in range(64):
+        column = boards[:, square]
+        for code in range(1, 13):
+            postings[(code - 1) * 64 + square] = np.packbits(column == code, bitorder='little')
+    postings.flush()
+
+    members = np.zeros((len(sources), nbytes), dtype=np.uint8)
+    meta = []
+    for i, ((name, path), (_, source_keys)) in enumerate(zip(sources, per_source)):
+        ids = np.searchsorted(keys, source_keys).astype(np.int32)
+        np.save(os.path.join(index_dir, f"rows_{i}.npy"), ids)
+        mask = np.zeros(n, dtype=bool)
+        mask[ids] = True
+        members[i] = np.packbits(mask, bitorder='little')
+        meta.append({'name': name, 'path': os.path.abspath(path), 'rows': len(ids), 'boards': int(mask.sum())})
+
+    np.save(os.path.join(index_dir, "keys.npy"), keys)
+    np.save(os.path.join(index_dir, "boards.npy"), boards)
+    np.save(os.path.join(index_dir, "members.npy"), members)
+    with open(os.path.join(index_dir, "index.json"), 'w') as f:
+        json.dump({'boards': int(n), 'sources': meta}, f, indent=2)
+    print(f"Indexed {len(all_keys)} rows, {n} distinct boards in {time.time() - start:.1f}s -> {index_dir}")
+
+
+class PositionIndex:
+    def __init__(self, index_dir):
+        self.dir = index_dir
+        with open(os.path.join(index_dir, "index.json"), 'r') as f:
+            self.meta = json.load(f)
+        self.sources = [s['name'] for s in self.meta['sources']]
+        self.keys = np.load(os.path.join(index_dir, "keys.npy"), mmap_mode='r')
+        self.boards = np.load(os.path.join(index_dir, "boards.npy"), mmap_mode='r')
+        self.postings = np.load(os.path.join(index_dir, "postings.npy"), mmap_mode='r')
+        self.members = np.load(os.path.join(index_dir, "members.npy"), mmap_mode='r')
+        self.n = len(self.keys)
+
+    def source(self, name):
+        if name not in self.sources:
+            raise KeyError(f"Unknown source '{name}' (known: {', '.join(self.sources)})")
+        return self.sources.index(name)
+
+    def rows(self, name):
+        """Board id of every row of a source"""
+        return np.load(os.path.join(self.dir, f"rows_{self.source(name)}.npy"), mmap_mode='r')
+
+    def lookup(self, fens):
+        """Board id of each FEN, -1 if the board isn't indexed"""
+        boards = np.stack([encode_board(fen) for fen in fens])
+        keys = board_keys(boards)
+        ids = np.minimum(np.searchsorted(self.keys, keys), self.n - 1)
+        found = (self.keys[ids] == keys) & (self.boards[ids] == boards).all(axis=1)
+        return np.where(found, ids, -1)
+
+    def sources_of(self, board_id):
+        byte, bit = divmod(int(board_id), 8)
+        return [name for name, row in zip(self.sources, self.members[:, byte]) if row >> bit & 1]
+
+    def match(self, terms=(), within=(), outside=()):
+        """
+        Packed bitmap of the boards matching every 'N@e5' / '!p@d7' term, present
+        in all `within` sources and in none of the `outside` sources.
+        """
+        packed = np.full(self.members.shape[1], 0xFF, dtype=np.uint8)
+        for term in terms:
+            row, negated = parse_term(term)
+            packed &= ~self.postings[row] if negated else self.postings[row]
+        for name in within:
+            packed &= self.members[self.source(name)]
+        for name in outside:
+            packed &= ~self.members[self.source(name)]
+        # Clear the padding bits after the last board
+        tail = self.n % 8
+        if tail:
+            packed[-1] &= (1 << tail) - 1
+        return packed
+
+    def ids(self, packed):
+        return np.flatnonzero(np.unpackbits(packed, bitorder='little')[:self.n])
+
+    def overlap(self, a, b):
+        """(boards in a, boards in b, boards in both)"""
+        ma, mb = self.members[self.source(a)], self.members[self.source(b)]
+        return popcount(ma), popcount(mb), popcount(ma & mb)
+
+    def test_mask(self, fraction, seed=0):
+        """
+        Boolean test assignment per board. It only depends on the board's key and
+        the seed, so a board keeps its side when the index is rebuilt with more data.
+        """
+        mixed = (self.keys ^ np.uint64(seed * 0x9E3779B97F4A7C15 % 2 ** 64)) * np.uint64(0xBF58476D1CE4E5B9)
+        return (mixed >> np.uint64(11)).astype(np.float64) / 2.0 ** 53 < fraction
+
+
+def write_rows(path, rows, fens, fieldnames=None):
+    """
+    Write a split in the source's format: metadata entries as JSON, CSV/manifest
+    rows as a CSV with the source's columns, store boards as a 'fen' CSV
+    """
+    if path.endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(rows, f, indent=2)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if fieldnames:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writeheader()
+            writer.writerows(rows)
+            return
+        writer = csv.writer(f)
+        writer.writerow(['fen'])
+        writer.writerows([fen] for fen in fens)
+
+def split_source(index, name, fraction, seed, output_prefix, exclude=()):
+    """
+    Split a source's rows into train/test so no board is on both sides. Boards
+    found in any `exclude` source (e.g. what was already trained on) never go to test.
+    """
+    meta = index.meta['sources'][index.source(name)]
+    test = index.test_mask(fraction, seed)
+    for other in exclude:
+        test &= ~np.unpackbits(index.members[index.source(other)], bitorder='little')[:index.n].astype(bool)
+    ids = np.asarray(index.rows(name))
+    row_test = test[ids]
+
+    fens, rows = read_source(meta['path'])
+    fieldnames = None
+    if fens is None:
+        fens = [decode_board(b) for b in rows]
+        rows = fens
+    elif rows and isinstance(rows[0], dict):
+        fieldnames = list(rows[0])
+    ext = ".json" if meta['path'].endswith('.json') else ".csv"
+    for side, mask in (("train", ~row_test), ("test", row_test)):
+        picked = np.flatnonzero(mask)
+        path = f"{output_prefix}_{side}{ext}"
+        write_rows(path, [rows[i] for i in picked], [fens[i] for i in picked], fieldnames)
+        print(f"   {side}: {len(picked)} rows, {len(np.unique(ids[picked]))} boards -> {path}")
+
+def parse_sources(specs):
+    """'name=path' or just 'path' (named after the file)"""
+    sources = []
+    for spec in specs:
+        name, _, path = spec.rpartition('=')
+        sources.append((name or os.path.splitext(os.path.basename(path))[0], path))
+    return sources
+
+def main():
+    parser = argparse.ArgumentParser(description="Index every known position and query it")
+    parser.add_argument('--index', type=str, default="dataset/position_index", help="Index directory")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    build = commands.add_parser('build', help="(Re)build the index")
+    build.add_argument('sources', nargs='+',
+                       help="name=path of metadata .json, .csv, render manifest .sqlite or position store .pos")
+
+    contains = commands.add_parser('contains', help="Which sources contain these positions")
+    contains.add_argument('fens', nargs='+')
+
+    overlap = commands.add_parser('overlap', help="Boards shared by two sources")
+    overlap.add_argument('a')
+    overlap.add_argument('b')
+
+    query = commands.add_parser('query', help="Boards matching piece-square terms, e.g. N@e5 !p@d7")
+    query.add_argument('terms', nargs='*')
+    query.add_argument('--in', dest='within', nargs='+', default=[], help="Only boards in all of these sources")
+    query.add_argument('--not_in', nargs='+', default=[], help="Only boards in none of these sources")
+    query.add_argument('--show', type=int, default=10, help="Number of matching boards to print")
+    query.add_argument('--output', type=str, default=None, help="Write every match to a 'fen' CSV")
+
+    split = commands.add_parser('split', help="Board-disjoint train/test split of a source")
+    split.add_argument('source')
+    split.add_argument('--test_fraction', type=float, default=0.15)
+    split.add_argument('--seed', type=int, default=0)
+    split.add_argument('--exclude', nargs='+', default=[],
+                       help="Sources whose boards must stay out of the test side (e.g. earlier training data)")
+    split.add_argument('--output_prefix', type=str, default=None,
+                       help="Writes <prefix>_train/_test (.json for metadata, .csv otherwise)")
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index(parse_sources(args.sources), args.index)
+        return
+
+    index = PositionIndex(args.index)
+    start = time.perf_counter()
+    if args.command == 'contains':
+        for fen, board_id in zip(args.fens, index.lookup(args.fens)):
+            found = index.sources_of(board_id) if board_id >= 0 else []
+            print(f"{'✅' if found else '❌'} {fen.split()[0]}: {', '.join(found) or 'not indexed'}")
+    elif args.command == 'overlap':
+        in_a, in_b, both = index.overlap(args.a, args.b)
+        print(f"{args.a}: {in_a} boards, {args.b}: {in_b} boards, shared: {both} "
+              f"({100.0 * both / max(1, min(in_a, in_b)):.1f}% of the smaller)")
+    elif args.command == 'query':
+        ids = index.ids(index.match(args.terms, args.within, args.not_in))
+        print(f"{len(ids)} boards match")
+        for board_id in ids[:args.show]:
+            print(f"   {decode_board(index.boards[board_id])}  [{', '.join(index.sources_of(board_id))}]")
+        if args.output:
+            write_rows(args.output, None, [decode_board(index.boards[i]) for i in ids])
+            print(f"Saved to: {args.output}")
+    elif args.command == 'split':
+        split_source(index, args.source, args.test_fraction, args.seed,
+                     args.output_prefix or os.path.join(args.index, args.source), args.exclude)
+    print(f"({1e3 * (time.perf_counter() - start):.1f} ms)")
+
+if __name__ == "__main__":
+    main()
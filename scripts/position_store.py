@@ -0,0 +1,141 @@
+import os
+import csv
+import numpy as np
+
+# Compact position store shared by the PGN ingester and the render farm.
+# A store is two flat files next to each other:
+#   <stem>.pos  N records of 64 uint8 piece codes, square = rank * 8 + file (a1 = 0, h8 = 63),
+#               0 = empty, 1..12 = PIECES[code - 1]
+#   <stem>.idx  N records of INDEX_DTYPE: game number, ply, side to move, castling rights,
+#               en passant square (NO_EP if none) and halfmove clock
+# Both are read with np.memmap, so a store of millions of positions opens instantly.
+# A record gives back the same FEN as board.fen() (en passant only when capturable).
+
+PIECES = "PNBRQKpnbrqk"
+RECORD_SIZE = 64
+INDEX_DTYPE = np.dtype([('game', '<u4'), ('ply', '<u2'), ('turn', 'u1'), ('castling', 'u1'),
+                        ('ep', 'u1'), ('halfmove', '<u2')])
+CASTLING = "KQkq"  # Bit i of 'castling' is CASTLING[i]
+NO_EP = 255
+
+# FEN character -> piece code
+_CODES = {p: i + 1 for i, p in enumerate(PIECES)}
+
+def store_paths(stem):
+    """(.pos, .idx) paths of a store, stem may also be either file"""
+    stem = os.path.splitext(stem)[0] if stem.endswith(('.pos', '.idx')) else stem
+    return stem + ".pos", stem + ".idx"
+
+def is_store(path):
+    return path.endswith(('.pos', '.idx')) or os.path.exists(path + ".pos")
+
+def encode_board(board_fen):
+    """64 piece codes of the placement field of a FEN"""
+    record = np.zeros(RECORD_SIZE, dtype=np.uint8)
+    for rank_idx, rank in enumerate(board_fen.split()[0].split('/')):
+        square = (7 - rank_idx) * 8
+        for char in rank:
+            if char.isdigit():
+                square += int(char)
+            else:
+                record[square] = _CODES[char]
+                square += 1
+    return record
+
+def decode_board(record):
+    """Placement field of a FEN from 64 piece codes"""
+    ranks = []
+    for rank in range(7, -1, -1):
+        row, empty = "", 0
+        for code in record[rank * 8:rank * 8 + 8]:
+            if code == 0:
+                empty += 1
+                continue
+            if empty:
+                row += str(empty)
+                empty = 0
+            row += PIECES[code - 1]
+        ranks.append(row + (str(empty) if empty else ""))
+    return "/".join(ranks)
+
+def square_name(square):
+    return "abcdefgh"[square % 8] + str(square // 8 + 1)
+
+def record_fen(record, entry):
+    """Full FEN of a record and its index entry"""
+    castling = "".join(c for i, c in enumerate(CASTLING) if entry['castling'] >> i & 1) or "-"
+    turn = "w" if entry['turn'] else "b"
+    ep = "-" if entry['ep'] == NO_EP else square_name(int(entry['ep']))
+    return f"{decode_board(record)} {turn} {castling} {ep} {int(entry['halfmove'])} {int(entry['ply']) // 2 + 1}"
+
+def fen_entry(fen, game=0):
+    """Index entry (as a tuple) of a full FEN, missing fields take the FEN defaults"""
+    fields = fen.split() + ["w", "-", "-", "0", "1"][len(fen.split()) - 1:]
+    turn = fields[1] == 'w'
+    castling = sum(1 << i for i, c in enumerate(CASTLING) if c in fields[2])
+    ep = NO_EP if fields[3] == '-' else "abcdefgh".index(fields[3][0]) + 8 * (int(fields[3][1]) - 1)
+    ply = 2 * (int(fields[5]) - 1) + (not turn)
+    return game, ply, turn, castling, ep, int(fields[4])
+
+def boards_from_masks(masks):
+    """(N, 64) piece codes from (N, 12) uint64 bitboards in PIECES order"""
+    masks = np.ascontiguousarray(masks, dtype='<u8')
+    bits = np.unpackbits(masks.view(np.uint8).reshape(len(masks), 12, 8), axis=2, bitorder='little')
+    codes = np.arange(1, 13, dtype=np.uint8)[None, :, None]
+    return (bits * codes).max(axis=1).astype(np.uint8)
+
+
+class PositionWriter:
+    """Appends (boards, index) batches to a store"""
+
+    def __init__(self, stem, append=False):
+        self.pos_path, self.idx_path = store_paths(stem)
+        os.makedirs(os.path.dirname(os.path.abspath(self.pos_path)), exist_ok=True)
+        mode = 'ab' if append else 'wb'
+        self.pos = open(self.pos_path, mode)
+        self.idx = open(self.idx_path, mode)
+        self.count = 0
+
+    def write(self, boards, index):
+        boards = np.ascontiguousarray(boards, dtype=np.uint8)
+        index = np.ascontiguousarray(index, dtype=INDEX_DTYPE)
+        assert boards.shape == (len(index), RECORD_SIZE)
+        self.pos.write(boards.tobytes())
+        self.idx.write(index.tobytes())
+        self.count += len(index)
+
+    def close(self):
+        self.pos.close()
+        self.idx.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_store(stem, mode='r'):
+    """(boards (N, 64) uint8, index (N,) INDEX_DTYPE) memory maps of a store"""
+    pos_path, idx_path = store_paths(stem)
+    if os.path.getsize(pos_path) == 0:
+        return np.zeros((0, RECORD_SIZE), dtype=np.uint8), np.zeros(0, dtype=INDEX_DTYPE)
+    boards = np.memmap(pos_path, dtype=np.uint8, mode=mode).reshape(-1, RECORD_SIZE)
+    index = np.memmap(idx_path, dtype=INDEX_DTYPE, mode=mode)
+    if len(boards) != len(index):
+        raise ValueError(f"{pos_path} has {len(boards)} records but {idx_path} has {len(index)}")
+    return boards, index
+
+def iter_fens(stem, limit=None):
+    """Full FENs of a store in record order"""
+    boards, index = open_store(stem)
+    n = len(index) if limit is None else min(limit, len(index))
+    for i in range(n):
+        yield record_fen(boards[i], index[i])
+
+def export_csv(stem, csv_path, limit=None):
+    """Same layout as pgn_to_csv.py (a single 'fen' column)"""
+    with open(csv_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['fen'])
+        writer.writerows([fen] for fen in iter_fens(stem, limit))
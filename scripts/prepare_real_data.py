@@ -1,9 +1,11 @@
 import os
 import csv
-import shutil
 import json
+import argparse
 
-def prepare_real_data():
+from place_files import place_files, add_place_args, THREADS
+
+def prepare_real_data(mode='hardlink', threads=THREADS):
     base_dir = "Labeled Chess data (PGN games will be added later)-20251211"
     output_dir = "dataset/trainB"
     metadata_file = "dataset/metadata.json"
@@ -12,6 +14,7 @@ def prepare_real_data():
         os.makedirs(output_dir)
         
     metadata = []
+    pairs = []  # (src, dst), placed all at once at the end
     
     # Iterate through each game directory
     for game_dir in os.listdir(base_dir):
@@ -51,7 +54,7 @@ def prepare_real_data():
                     dest_filename = f"{game_dir}_{frame_filename}"
                     dest_path = os.path.join(output_dir, dest_filename)
                     
-                    shutil.copy2(src_path, dest_path)
+                    pairs.append((src_path, dest_path))
                     
                     metadata.append({
                         "image_path": dest_filename,
@@ -63,11 +66,16 @@ def prepare_real_data():
                     # Some frames might not be in the tagged_images if they are outside the set
                     pass
 
+    place_files(pairs, output_dir, mode, threads)
+
     with open(metadata_file, 'w') as f:
         json.dump(metadata, f, indent=4)
         
     print(f"Finished! Processed {len(metadata)} images.")
 
 if __name__ == "__main__":
-    prepare_real_data()
+    parser = argparse.ArgumentParser()
+    add_place_args(parser)
+    args = parser.parse_args()
+    prepare_real_data(args.mode, args.threads)
 
@@ -0,0 +1,116 @@
+import os
+import ast
+import shutil
+import hashlib
+
+# Content-addressed cache of rendered boards.
+# The key covers everything that changes the pixels: the board field of the FEN
+# (side to move, castling etc. are not visible), view, resolution, samples,
+# output format and size, and a hash of the .blend file + render script.
+# A hit is served by hardlinking the cached file to the requested output path.
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def local_imports(script_file):
+    """Modules next to script_file that it imports, directly or through each other"""
+    script_dir = os.path.dirname(os.path.abspath(script_file))
+    found, todo = set(), [os.path.abspath(script_file)]
+    while todo:
+        with open(todo.pop(), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                names = [node.module]
+            else:
+                continue
+            for name in names:
+                path = os.path.join(script_dir, name.split('.')[0] + ".py")
+                if os.path.exists(path) and path not in found:
+                    found.add(path)
+                    todo.append(path)
+    found.discard(os.path.abspath(script_file))
+    return sorted(found)
+
+def settings_digest(blend_file, script_file, *script_args):
+    """
+    Hash of the scene, the script that renders it (with the modules next to it
+    that it imports) and any script flags that change the image. Other scripts
+    in the folder (benchmarks etc.) don't invalidate the cache.
+    """
+    h = hashlib.sha256()
+    for path in [blend_file, script_file] + local_imports(script_file):
+        h.update(file_digest(path).encode())
+    for arg in script_args:
+        h.update(b"\0" + str(arg).encode())
+    return h.hexdigest()
+
+def board_field(fen):
+    return fen.split()[0]
+
+def link_or_copy(src, dst):
+    """Hardlink src to dst (replacing dst); copy if the filesystem can't link"""
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    # rename() is a no-op when both names are links to the same file
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        return
+    tmp = dst + ".tmp"
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+    except OSError:
+        shutil.copy2(src, tmp)
+    os.replace(tmp, dst)
+
+
+class RenderCache:
+    def __init__(self, cache_dir, scene_digest):
+        self.cache_dir = cache_dir
+        self.scene_digest = scene_digest
+        self.hits = 0
+        self.stored = 0
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, fen, view, resolution, samples, ext=".png", output_size=None):
+        raw = "|".join([board_field(fen), view, str(resolution), str(samples),
+                        ext.lower(), str(output_size), self.scene_digest])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def path(self, key, ext=".png"):
+        return os.path.join(self.cache_dir, key[:2], key + ext.lower())
+
+    def serve(self, key, output):
+        """Link the cached image to output. Returns False on a miss."""
+        ext = os.path.splitext(output)[1]
+        cached = self.path(key, ext)
+        if not os.path.exists(cached):
+            return False
+        link_or_copy(cached, output)
+        self.hits += 1
+        return True
+
+    def evict(self, key, output):
+        """Drop the cached image if it is the same file as output (a hardlink changed with it)"""
+        cached = self.path(key, os.path.splitext(output)[1])
+        if os.path.exists(cached) and os.path.exists(output) and os.path.samefile(cached, output):
+            os.remove(cached)
+
+    def store(self, key, output):
+        """Add a freshly rendered image to the cache"""
+        ext = os.path.splitext(output)[1]
+        cached = self.path(key, ext)
+        if os.path.exists(cached) or not os.path.exists(output):
+            return
+        link_or_copy(output, cached)
+        self.stored += 1
+
+    def report(self):
+        print(f"📦 Render cache: {self.hits} renders saved, {self.stored} new entries "
+              f"({self.cache_dir})")
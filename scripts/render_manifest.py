@@ -0,0 +1,125 @@
+import os
+import time
+import sqlite3
+import threading
+
+from render_cache import file_digest
+
+# SQLite manifest of render jobs, so an interrupted farm run can be resumed.
+# One row per output image: FEN, view, settings hash, status, attempts, render
+# duration and the checksum of the finished file. A job is only 'done' once its
+# output was written in full (workers render to a .partial file and rename it),
+# so 'resume' re-queues exactly the jobs that are pending, failed, were running
+# when the run died, or whose output went missing.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id        TEXT PRIMARY KEY,
+    fen       TEXT NOT NULL,
+    view      TEXT NOT NULL,
+    settings  TEXT NOT NULL,
+    output    TEXT NOT NULL,
+    status    TEXT NOT NULL DEFAULT 'pending',
+    attempts  INTEGER NOT NULL DEFAULT 0,
+    duration  REAL,
+    checksum  TEXT,
+    error     TEXT,
+    updated   REAL
+)
+"""
+
+STATUSES = ('pending', 'running', 'done', 'failed')
+
+
+class RenderManifest:
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Shared by the farm threads, every statement goes through the lock
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute(SCHEMA)
+        self.db.commit()
+        self.lock = threading.Lock()
+
+    def execute(self, sql, params=()):
+        with self.lock:
+            rows = self.db.execute(sql, params).fetchall()
+            self.db.commit()
+            return rows
+
+    def register(self, jobs, view, settings):
+        """
+        Add jobs ({'id', 'fen', 'output'}) that aren't in the manifest yet. A job
+        rendered with other settings or for another FEN goes back to pending.
+        Returns the jobs that still have to be rendered.
+        """
+        with self.lock:
+            known = {row[0]: row[1:] for row in self.db.execute(
+                "SELECT id, fen, settings, status, output FROM jobs")}
+            todo = []
+            for job in jobs:
+                row = known.get(job['id'])
+                if row is None:
+                    self.db.execute(
+                        "INSERT INTO jobs (id, fen, view, settings, output, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                        (job['id'], job['fen'], view, settings, job['output'], time.time()))
+                elif row[0] != job['fen'] or row[1] != settings or row[3] != job['output']:
+                    self.db.execute(
+                        "UPDATE jobs SET fen = ?, view = ?, settings = ?, output = ?, status = 'pending', "
+                        "attempts = 0, checksum = NULL, error = NULL, updated = ? WHERE id = ?",
+                        (job['fen'], view, settings, job['output'], time.time(), job['id']))
+                elif row[2] == 'done' and os.path.exists(job['output']):
+                    continue
+                todo.append(job)
+            self.db.commit()
+        return todo
+
+    def unfinished(self, verify=False):
+        """
+        Jobs to re-queue: not done, or done but the output is missing (or, with
+        verify, changed). Changed jobs go back to pending and are marked 'changed'.
+        """
+        jobs = []
+        for job_id, fen, output, status, checksum in self.execute(
+                "SELECT id, fen, output, status, checksum FROM jobs ORDER BY id"):
+            job = {'id': job_id, 'fen': fen, 'output': output}
+            if status == 'done' and os.path.exists(output):
+                if not verify or file_digest(output) == checksum:
+                    continue
+                self.execute("UPDATE jobs SET status = 'pending', checksum = NULL, error = ?, updated = ? "
+                             "WHERE id = ?", ("checksum mismatch", time.time(), job_id))
+                job['changed'] = True
+            jobs.append(job)
+        return jobs
+
+    def settings(self):
+        """Settings hashes the manifest was rendered with"""
+        return [row[0] for row in self.execute("SELECT DISTINCT settings FROM jobs")]
+
+    def running(self, job_id):
+        self.execute("UPDATE jobs SET status = 'running', updated = ? WHERE id = ?", (time.time(), job_id))
+
+    def done(self, job_id, duration, output):
+        self.execute("UPDATE jobs SET status = 'done', duration = ?, checksum = ?, error = NULL, updated = ? "
+                     "WHERE id = ?", (duration, file_digest(output), time.time(), job_id))
+
+    def failed(self, job_id, error, final=False):
+        """One failed attempt; final=True when the farm gives up on the job"""
+        self.execute("UPDATE jobs SET status = ?, attempts = attempts + 1, error = ?, updated = ? WHERE id = ?",
+                     ('failed' if final else 'pending', str(error), time.time(), job_id))
+
+    def counts(self):
+        counts = dict.fromkeys(STATUSES, 0)
+        for status, n in self.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status"):
+            counts[status] = n
+        return counts
+
+    def report(self):
+        counts = self.counts()
+        total_seconds = self.execute("SELECT COALESCE(SUM(duration), 0) FROM jobs WHERE status = 'done'")[0][0]
+        print(f"🗂️  Manifest {self.path}: " + ", ".join(f"{n} {s}" for s, n in counts.items())
+              + f" ({total_seconds / 3600:.1f} render hours recorded)")
+
+    def close(self):
+        self.db.close()
@@ -0,0 +1,109 @@
+import json
+import queue
+import subprocess
+import threading
+
+# Client side of the Blender --worker mode (see blender/render_worker.py).
+# The worker loads the scene once, then reads one JSON job per line on stdin:
+#   {"id": "...", "fen": "...", "output": "renders/x.png"}
+# (generate_cyclegan_data.py also reads optional 'set', 'variants' and 'seed')
+# and answers each with one line on stdout, prefixed so it stands out from
+# Blender's own log lines:
+#   @@RESULT {"id": "...", "status": "ok" | "error", "outputs": [...], "seconds": 1.23}
+# A {"status": "ready"} result is sent once setup is done; closing stdin (or
+# sending "quit") stops the worker. A reader thread collects the result lines,
+# so a hung or crashed Blender shows up as a timeout instead of a blocked read.
+
+# Must match RESULT_PREFIX in blender/render_worker.py
+RESULT_PREFIX = "@@RESULT "
+
+
+class WorkerError(RuntimeError):
+    """The Blender worker died or stopped answering"""
+
+
+class RenderWorker:
+    """
+    Client for a long-running Blender process started with '-- --worker'.
+    The scene is loaded once in start(); each render() call sends one FEN job
+    and waits for its result line.
+    """
+
+    def __init__(self, blender_path, blend_file, script_file, extra_args=(), name="worker",
+                 blender_args=()):
+        self.name = name
+        self.cmd = [
+            blender_path,
+            blend_file,
+            "--background",
+            *blender_args,
+            "--python", script_file,
+            "--",
+            "--worker",
+            *extra_args
+        ]
+        self.proc = None
+        self.results = None
+        self.setup_seconds = None
+
+    def start(self, timeout=None):
+        try:
+            self.proc = subprocess.Popen(
+                self.cmd,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                text=True,
+                bufsize=1
+            )
+        except OSError as e:
+            # Bad BLENDER_PATH, no permission, fork failure
+            raise WorkerError(f"{self.name}: can't start Blender ({e})")
+        self.results = queue.Queue()
+        threading.Thread(target=self._pump, daemon=True).start()
+
+        ready = self._next_result(timeout)
+        self.setup_seconds = ready.get('setup_seconds')
+        return ready
+
+    def _pump(self):
+        # Blender logs go to stdout too, keep only our result lines
+        for line in self.proc.stdout:
+            if line.startswith(RESULT_PREFIX):
+                self.results.put(json.loads(line[len(RESULT_PREFIX):]))
+        self.results.put(None)
+
+    def _next_result(self, timeout):
+        try:
+            result = self.results.get(timeout=timeout)
+        except queue.Empty:
+            raise WorkerError(f"{self.name}: no answer after {timeout}s")
+        if result is None:
+            raise WorkerError(f"{self.name}: Blender exited (code {self.proc.poll()})")
+        return result
+
+    def render(self, job, timeout=None):
+        """Send one job dict, return the worker's result dict"""
+        try:
+            self.proc.stdin.write(json.dumps(job) + "\n")
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise WorkerError(f"{self.name}: {e}")
+        return self._next_result(timeout)
+
+    def close(self, timeout=30):
+        if self.proc is None:
+            return
+        try:
+            self.proc.stdin.write("quit\n")
+            self.proc.stdin.close()
+            self.proc.wait(timeout=timeout)
+        except (BrokenPipeError, OSError, subprocess.TimeoutExpired):
+            self.kill()
+        self.proc = None
+
+    def kill(self):
+        if self.proc is not None:
+            self.proc.kill()
+            self.proc.wait()
+            self.proc = None
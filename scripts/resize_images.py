@@ -20,7 +20,11 @@ def resize_images(directory, size=(256, 256)):
                 new_filename = os.path.splitext(filename)[0] + ".jpg"
                 new_filepath = os.path.join(directory, new_filename)
                 
-                img_resized.save(new_filepath, "JPEG", quality=90)
+                # Write a new file and rename it over the old name: trainB entries may be
+                # hardlinks/symlinks to the original frames (place_files.py), which must stay untouched
+                tmp_filepath = new_filepath + ".tmp"
+                img_resized.save(tmp_filepath, "JPEG", quality=90)
+                os.replace(tmp_filepath, new_filepath)
                 
                 # If we changed extension from .png to .jpg, remove original
                 if filename.lower().endswith('.png'):
@@ -30,7 +34,8 @@ def resize_images(directory, size=(256, 256)):
             print(f"Error processing {filename}: {e}")
 
 if __name__ == "__main__":
-    resize_images("dataset/trainA")
+    # trainA is written at training size by the render workers (--output_size),
+    # only the real photos still need resizing.
     resize_images("dataset/trainB")
     print("Resizing complete.")
 
@@ -0,0 +1,147 @@
+import csv
+import time
+import argparse
+import numpy as np
+
+from position_store import PIECES, RECORD_SIZE, INDEX_DTYPE, PositionWriter, encode_board, fen_entry, is_store, open_store, record_fen
+
+# Picks a render list from a large pool of positions (CSVs and/or position
+# stores) so the budget spreads over the board instead of clustering in the
+# openings: greedy maximum coverage of (piece, square) occupancy and material
+# configurations. A feature already covered c times is worth 1 / (1 + c).
+# Rescoring the whole pool for every pick is too slow for a million positions,
+# so each pick uses the stochastic greedy of Mirzasoleiman et al. ("Lazier than
+# lazy greedy"): the best of a random candidate sample, within epsilon of the
+# greedy's coverage guarantee in expectation.
+
+NUM_FEATURES = 12 * 64
+MATERIAL_WEIGHT = 8.0  # A new material configuration is worth this many uncovered (piece, square) pairs
+EPSILON = 0.01         # Stochastic greedy tolerance, smaller = more candidates per pick
+
+def load_pool(paths):
+    """(boards (N, 64) uint8, sources [(path, index or fens)], origin (N, 2) [source, row])"""
+    boards, sources, origin = [], [], []
+    for s, path in enumerate(paths):
+        if is_store(path):
+            b, index = open_store(path)
+            sources.append((path, index))
+        else:
+            with open(path, 'r') as f:
+                fens = [row['fen'] for row in csv.DictReader(f)]
+            b = np.stack([encode_board(fen) for fen in fens]) if fens else np.zeros((0, RECORD_SIZE), np.uint8)
+            sources.append((path, fens))
+        boards.append(np.asarray(b))
+        origin.append(np.stack([np.full(len(b), s), np.arange(len(b))], axis=1))
+        print(f"   {path}: {len(b)} positions")
+    return np.concatenate(boards), sources, np.concatenate(origin)
+
+def unique_boards(boards):
+    """Row indices of the first occurrence of every distinct board"""
+    keys = np.ascontiguousarray(boards).view(np.dtype((np.void, RECORD_SIZE))).ravel()
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first)
+
+def feature_ids(boards):
+    """(N, 64) (piece, square) feature ids, NUM_FEATURES for empty squares"""
+    squares = np.arange(64, dtype=np.int16)
+    return np.where(boards > 0, (boards.astype(np.int16) - 1) * 64 + squares, np.int16(NUM_FEATURES))
+
+def material_ids(boards):
+    """Dense id of each board's material configuration (piece counts, kings excluded)"""
+    counts = np.stack([(boards == code).sum(axis=1) for code in range(1, 13) if PIECES[code - 1] not in 'Kk'], axis=1)
+    signature = (np.minimum(counts, 9) * 10 ** np.arange(counts.shape[1], dtype=np.int64)).sum(axis=1)
+    return np.unique(signature, return_inverse=True)[1].ravel()
+
+def select(boards, budget, material_weight=MATERIAL_WEIGHT, epsilon=EPSILON, seed=0, verbose=True):
+    """
+    Indices into boards of up to `budget` positions, in pick order. Each pick
+    scores a random sample of n / budget * ln(1 / epsilon) candidates at once
+    (the whole pool when it is small enough, which is the exact greedy).
+    """
+    n = len(boards)
+    budget = min(budget, n)
+    if budget == 0:
+        return np.zeros(0, dtype=np.int64)
+    feats = feature_ids(boards)
+    materials = material_ids(boards)
+    covered = np.zeros(NUM_FEATURES + 1, dtype=np.float64)
+    material_covered = np.zeros(materials.max() + 1, dtype=np.float64)
+    available = np.ones(n, dtype=bool)
+    sample = int(np.ceil(n / budget * np.log(1.0 / epsilon)))
+    rng = np.random.default_rng(seed)
+
+    picked = []
+    while len(picked) < budget:
+        if sample >= n - len(picked):
+            candidates = np.flatnonzero(available)
+        else:
+            candidates = rng.integers(0, n, sample)
+            candidates = candidates[available[candidates]]
+            if len(candidates) == 0:
+                continue
+        w = 1.0 / (1.0 + covered)
+        w[NUM_FEATURES] = 0.0
+        gains = w[feats[candidates]].sum(axis=1) + material_weight / (1.0 + material_covered[materials[candidates]])
+        i = candidates[np.argmax(gains)]
+        picked.append(i)
+        available[i] = False
+        covered[feats[i]] += 1
+        material_covered[materials[i]] += 1
+
+    if verbose:
+        squares = (covered[:NUM_FEATURES] > 0).sum()
+        print(f"   {len(picked)} picked ({min(sample, n)} candidates per pick), "
+              f"{squares}/{NUM_FEATURES} (piece, square) pairs and "
+              f"{(material_covered > 0).sum()}/{len(material_covered)} material configurations covered")
+    return np.array(picked, dtype=np.int64)
+
+def selected_fens(picks, sources, origin, boards):
+    for i in picks:
+        s, row = origin[i]
+        rows = sources[s][1]
+        yield rows[row] if isinstance(rows, list) else record_fen(boards[i], rows[row])
+
+def selected_index(picks, sources, origin):
+    """Store index entries of the picks"""
+    index = np.zeros(len(picks), dtype=INDEX_DTYPE)
+    for k, i in enumerate(picks):
+        s, row = origin[i]
+        rows = sources[s][1]
+        if isinstance(rows, list):
+            index[k] = fen_entry(rows[row])
+        else:
+            index[k] = rows[row]
+    return index
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick a render list that covers (piece, square) pairs and material")
+    parser.add_argument('pool', nargs='+', help="CSV files (with a 'fen' column) and/or position stores (.pos)")
+    parser.add_argument('--count', type=int, required=True, help="Size of the render list")
+    parser.add_argument('--output', type=str, required=True,
+                        help="Render list: a CSV with a 'fen' column, or a position store if it ends in .pos")
+    parser.add_argument('--material_weight', type=float, default=MATERIAL_WEIGHT)
+    parser.add_argument('--epsilon', type=float, default=EPSILON)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.time()
+    print("Loading pool...")
+    boards, sources, origin = load_pool(args.pool)
+    keep = unique_boards(boards)
+    print(f"   {len(boards)} positions, {len(keep)} distinct boards ({time.time() - start:.1f}s)")
+
+    picks = keep[select(boards[keep], args.count, args.material_weight, args.epsilon, args.seed)]
+    print(f"Selected {len(picks)} positions in {time.time() - start:.1f}s")
+
+    if args.output.endswith('.pos'):
+        with PositionWriter(args.output) as writer:
+            writer.write(boards[picks], selected_index(picks, sources, origin))
+    else:
+        with open(args.output, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['fen'])
+            writer.writerows([fen] for fen in selected_fens(picks, sources, origin, boards))
+    print(f"Saved to: {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "blender"))
+from board_geometry import PIECE_TYPES, parse_fen, sprite_name
+
+# Builds domain-A boards from FENs without Cycles: the empty-board plate plus
+# one pre-rendered RGBA sprite per piece x square (blender/render_atlas.py),
+# alpha-blended back to front (farthest square from the camera first) so a
+# nearer piece covers the one behind it. Milliseconds per board instead of a
+# render; the Blender path stays the reference for the look.
+
+def load_frame(path, size, mode):
+    with Image.open(path) as img:
+        img = img.convert(mode)
+        if size and img.size != (size, size):
+            img = img.resize((size, size), Image.LANCZOS)
+        return np.asarray(img, dtype=np.float32) / 255.0
+
+
+class SpriteAtlas:
+    """
+    Plate and sprites at one output size. Sprites are cropped to their alpha
+    bounding box and kept premultiplied, so blending is one multiply-add.
+    The cropped atlas is cached as atlas_<size>.npz next to the renders.
+    """
+
+    def __init__(self, atlas_dir, size=None):
+        with open(os.path.join(atlas_dir, "atlas.json"), 'r') as f:
+            info = json.load(f)
+        self.size = size or info['resolution']
+        # Back to front: largest camera depth first
+        self.order = np.argsort(-np.asarray(info['depth']), kind='stable')
+
+        cache = os.path.join(atlas_dir, f"atlas_{self.size}.npz")
+        if not os.path.exists(cache):
+            self.build_cache(atlas_dir, cache)
+        data = np.load(cache)
+        self.plate = data['plate']
+        self.sprites = {}
+        for (code, square, y0, x0, h, w), offset in zip(data['index'], data['offsets']):
+            pixels = data['pixels'][offset:offset + h * w * 4].reshape(h, w, 4)
+            self.sprites[(chr(code), int(square))] = (int(y0), int(x0), pixels)
+
+    def build_cache(self, atlas_dir, cache):
+        print(f"🧩 Cropping sprites from {atlas_dir} at {self.size}px (one time)...")
+        plate = load_frame(os.path.join(atlas_dir, "plate.png"), self.size, 'RGB')
+        index, offsets, chunks, offset = [], [], [], 0
+        for ptype in PIECE_TYPES:
+            for square in range(64):
+                path = os.path.join(atlas_dir, "sprites", sprite_name(ptype, square))
+                if not os.path.exists(path):
+                    continue
+                rgba = load_frame(path, self.size, 'RGBA')
+                ys, xs = np.nonzero(rgba[..., 3] > 1.0 / 255)
+                if len(ys) == 0:
+                    continue
+                y0, y1, x0, x1 = ys.min(), ys.max() + 1, xs.min(), xs.max() + 1
+                patch = rgba[y0:y1, x0:x1].copy()
+                patch[..., :3] *= patch[..., 3:4]  # Premultiply
+                index.append((ord(ptype), square, y0, x0, y1 - y0, x1 - x0))
+                offsets.append(offset)
+                chunks.append(patch.ravel())
+                offset += patch.size
+
+        tmp = cache + ".tmp"
+        with open(tmp, 'wb') as f:
+            np.savez(f, plate=plate, index=np.array(index, dtype=np.int32).reshape(-1, 6),
+                     offsets=np.array(offsets, dtype=np.int64),
+                     pixels=np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.float32))
+        os.replace(tmp, cache)
+
+    def composite(self, fen):
+        """(size, size, 3) uint8 image of the position"""
+        position = {r_idx * 8 + f_idx: ptype for (f_idx, r_idx), ptype in parse_fen(fen).items()}
+        out = self.plate.copy()
+        for square in self.order:
+            sprite = self.sprites.get((position.get(int(square)), int(square)))
+            if sprite is None:
+                continue
+            y0, x0, pixels = sprite
+            region = out[y0:y0 + pixels.shape[0], x0:x0 + pixels.shape[1]]
+            region *= 1.0 - pixels[..., 3:4]
+            region += pixels[..., :3]
+        return (np.clip(out, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+def main():
+    parser = argparse.ArgumentParser(description="Composite synthetic boards from a sprite atlas")
+    parser.add_argument('--atlas', type=str, default="renders/atlas")
+    parser.add_argument('--csv', type=str, required=True)
+    parser.add_argument('--output_dir', type=str, default="dataset/trainA_sprites")
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--size', type=int, default=256)
+    parser.add_argument('--quality', type=int, default=90)
+    args = parser.parse_args()
+
+    atlas = SpriteAtlas(args.atlas, args.size)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    fens, seen = [], set()
+    with open(args.csv, 'r') as f:
+        for row in csv.DictReader(f):
+            if args.limit and len(fens) >= args.limit:
+                break
+            if row['fen'] not in seen:
+                seen.add(row['fen'])
+                fens.append(row['fen'])
+
+    start = time.time()
+    for i, fen in enumerate(tqdm(fens)):
+        image = atlas.composite(fen)
+        Image.fromarray(image).save(os.path.join(args.output_dir, f"sprite_{i:04d}.jpg"), "JPEG", quality=args.quality)
+
+    elapsed = time.time() - start
+    print(f"✅ {len(fens)} boards in {elapsed:.1f}s ({1000 * elapsed / max(1, len(fens)):.1f} ms/board)")
+
+if __name__ == "__main__":
+    main()